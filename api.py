@@ -0,0 +1,313 @@
+"""
+RRG API - headless HTTP/JSON service for RRG coordinates
+
+Serves the same numbers as the Streamlit app (rrg_grid.load_tails: grid
+lookup, else computed from the price panel) for dashboards and alerting
+jobs, without Streamlit.
+
+    GET /rrg?interval=daily&rs=10&mom=10&tail=10&sectors=BANK,ICT
+    GET /rrg?...&format=arrow      (or Accept: application/vnd.apache.arrow.stream)
+    GET /events?interval=daily&since=2025-01-01&sectors=BANK&limit=100
+    GET /metrics                   (Prometheus text: this API and the app replicas)
+    GET /health
+
+Responses carry an ETag derived from the data snapshot and the query, so
+clients polling with If-None-Match get a 304 until new bars are published.
+Encoded responses are cached in-process per ETag, together with their
+gzipped form, so a repeated query costs neither computing nor compressing.
+/events reads the quadrant transitions stored by rrg_events.py, newest
+first, at the app's default periods.
+
+Usage:
+    python api.py                              # http://0.0.0.0:8000
+    python api.py --port 8000 --workers 2
+    uvicorn api:app --host 0.0.0.0 --port 8000    # single worker
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+import numpy as np
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+import perf
+from rrg_engine import MAX_TAIL, data_version
+from rrg_events import WATCH, recent_events
+from rrg_grid import load_tails
+
+try:
+    import pyarrow as pa
+except ImportError:          # Arrow output is optional
+    pa = None
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+INTERVALS = ["monthly", "weekly", "daily", "1h"]
+DEFAULTS = {"rs": 10, "mom": 10, "tail": 10}
+MAX_PERIOD = 250
+MAX_EVENTS = 1000
+DECIMALS = 4                 # JSON values are rounded to this many decimals
+CACHE_ENTRIES = 1024         # encoded responses kept per process
+GZIP_MIN_SIZE = 500
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _int_param(params, name: str, lo: int, hi: int) -> int:
+    raw = params.get(name, DEFAULTS[name])
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        raise BadRequest(f"{name} must be an integer")
+    if not lo <= value <= hi:
+        raise BadRequest(f"{name} must be between {lo} and {hi}")
+    return value
+
+
+def parse_query(params, accept: str = "") -> dict:
+    """Validated, normalised query (also the cache/ETag key)."""
+    interval = params.get("interval", "daily")
+    if interval not in INTERVALS:
+        raise BadRequest(f"interval must be one of {', '.join(INTERVALS)}")
+    fmt = params.get("format") or ("arrow" if ARROW_TYPE in accept else "json")
+    if fmt not in ("json", "arrow"):
+        raise BadRequest("format must be json or arrow")
+    if fmt == "arrow" and pa is None:
+        raise BadRequest("Arrow output needs pyarrow installed")
+    sectors = params.get("sectors")
+    return {
+        "interval": interval,
+        "rs": _int_param(params, "rs", 1, MAX_PERIOD),
+        "mom": _int_param(params, "mom", 1, MAX_PERIOD),
+        "tail": _int_param(params, "tail", 1, MAX_TAIL),
+        "sectors": sorted({s.strip().upper() for s in sectors.split(",") if s.strip()})
+                   if sectors else None,
+        "format": fmt,
+    }
+
+
+def make_etag(query: dict, version: tuple) -> str:
+    key = json.dumps([query, repr(version)], sort_keys=True).encode()
+    return '"' + hashlib.sha1(key).hexdigest()[:20] + '"'
+
+
+# ---------------------------------------------------------------------------
+# Encoding
+# ---------------------------------------------------------------------------
+
+def _select(tails, query: dict):
+    names = tails.symbols if query["sectors"] is None else \
+        [s for s in query["sectors"] if s in tails.symbols]
+    missing = [] if query["sectors"] is None else \
+        [s for s in query["sectors"] if s not in tails.symbols]
+    return names, missing
+
+
+def encode_json(tails, query: dict) -> bytes:
+    names, missing = _select(tails, query)
+    unit = "m" if query["interval"] == "1h" else "D"
+    sectors = {}
+    for name in names:
+        dates, x, y = tails.tail(name, query["tail"])
+        sectors[name] = {
+            "dates": np.datetime_as_string(dates.to_numpy(), unit=unit).tolist(),
+            "rs_ratio": np.round(x, DECIMALS).tolist(),
+            "rs_momentum": np.round(y, DECIMALS).tolist(),
+        }
+    body = {
+        "interval": query["interval"], "rs": query["rs"], "mom": query["mom"],
+        "tail": query["tail"],
+        "as_of": tails.latest.isoformat() if tails.latest is not None else None,
+        "sectors": sectors,
+    }
+    if missing:
+        body["missing"] = missing
+    return json.dumps(body, separators=(",", ":")).encode()
+
+
+def encode_arrow(tails, query: dict) -> bytes:
+    """Long table: sector, date, rs_ratio, rs_momentum (Arrow IPC stream)."""
+    names, _ = _select(tails, query)
+    parts = [tails.tail(name, query["tail"]) for name in names]
+    lengths = [len(p[0]) for p in parts]
+    table = pa.table({
+        "sector": pa.array(np.repeat(names, lengths).tolist(), pa.string()).dictionary_encode(),
+        "date": pa.array(np.concatenate([p[0].to_numpy() for p in parts])
+                         if parts else np.array([], "datetime64[ns]")),
+        "rs_ratio": pa.array(np.concatenate([p[1] for p in parts]) if parts else [], pa.float64()),
+        "rs_momentum": pa.array(np.concatenate([p[2] for p in parts]) if parts else [], pa.float64()),
+    }, metadata={"as_of": str(tails.latest), "interval": query["interval"]})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+# ---------------------------------------------------------------------------
+# Shared in-process cache
+# ---------------------------------------------------------------------------
+
+_responses: OrderedDict = OrderedDict()     # etag -> (body, gzipped body|None, media type)
+_responses_lock = threading.Lock()
+
+
+def _cached(etag: str):
+    with _responses_lock:
+        hit = _responses.get(etag)
+        if hit is not None:
+            _responses.move_to_end(etag)
+        return hit
+
+
+def _remember(etag: str, entry) -> None:
+    with _responses_lock:
+        _responses[etag] = entry
+        while len(_responses) > CACHE_ENTRIES:
+            _responses.popitem(last=False)
+
+
+@perf.timed("api_render")
+def render(query: dict):
+    """Compute and encode a response. Returns (body, gzipped body|None, media type).
+
+    Raises LookupError when there is no data.
+    """
+    tails, error = load_tails(query["interval"], query["rs"], query["mom"])
+    if tails is None or not len(tails):
+        raise LookupError(error or "No sector data found")
+    if query["format"] == "arrow":
+        body, media_type = encode_arrow(tails, query), ARROW_TYPE
+    else:
+        body, media_type = encode_json(tails, query), "application/json"
+    compressed = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+    return body, compressed, media_type
+
+
+# ---------------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------------
+
+def _etags(header: str) -> set[str]:
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+async def rrg(request):
+    try:
+        query = parse_query(request.query_params, request.headers.get("accept", ""))
+    except BadRequest as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    etag = make_etag(query, data_version(query["interval"]))
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag in _etags(request.headers.get("if-none-match", "")):
+        return Response(status_code=304, headers=headers)
+
+    entry = _cached(etag)
+    perf.cache_result("api_response", hit=entry is not None)
+    if entry is None:
+        try:
+            entry = await run_in_threadpool(render, query)
+        except LookupError as e:
+            return JSONResponse({"error": str(e)}, status_code=503)
+        _remember(etag, entry)
+    body, compressed, media_type = entry
+    if compressed is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        # Already compressed - GZipMiddleware leaves responses with Content-Encoding alone
+        body = compressed
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, media_type=media_type, headers=headers)
+
+
+async def events(request):
+    params = request.query_params
+    interval = params.get("interval", "daily")
+    if interval not in WATCH:
+        return JSONResponse({"error": f"interval must be one of {', '.join(WATCH)}"},
+                            status_code=400)
+    try:
+        limit = int(params.get("limit", 100))
+        since = params.get("since")
+        since = pd.Timestamp(since) if since else None
+    except ValueError as e:
+        return JSONResponse({"error": f"Bad parameter: {e}"}, status_code=400)
+    sectors = params.get("sectors")
+    symbols = sorted({s.strip().upper() for s in sectors.split(",") if s.strip()}) \
+        if sectors else None
+    found = await run_in_threadpool(recent_events, interval, since=since, symbols=symbols,
+                                    limit=min(max(limit, 1), MAX_EVENTS))
+    rs, mom = WATCH[interval]
+    return JSONResponse({"interval": interval, "rs": rs, "mom": mom,
+                         "events": found.round(DECIMALS).to_dict("records")})
+
+
+async def metrics(request):
+    """Prometheus text: this worker, plus every snapshot in RRG_METRICS_DIR."""
+    process = perf.process_name("api")
+    perf.write_snapshot(process)
+    snapshots = perf.read_snapshots()
+    snapshots[process] = perf.snapshot()
+    return Response(perf.prometheus_text(snapshots),
+                    media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+async def health(request):
+    return JSONResponse({"status": "ok"})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # Worker processes end with os._exit, so atexit never runs in them
+    perf.remove_snapshot(perf.process_name("api"))
+
+
+app = Starlette(
+    routes=[Route("/rrg", rrg), Route("/events", events), Route("/metrics", metrics),
+            Route("/health", health)],
+    middleware=[Middleware(GZipMiddleware, minimum_size=500)],
+    lifespan=lifespan,
+)
+
+
+def main():
+    import socket
+
+    import uvicorn
+    from uvicorn.supervisors import Multiprocess
+
+    parser = argparse.ArgumentParser(description="RRG HTTP/JSON API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    config = uvicorn.Config("api:app", host=args.host, port=args.port, workers=args.workers,
+                            access_log=False)
+    if args.workers > 1:
+        # uvicorn binds the shared socket with proto 0, so asyncio never enables
+        # TCP_NODELAY and every response waits ~40 ms (Nagle + delayed ACK).
+        # Accepted connections inherit it from the listening socket.
+        sock = config.bind_socket()
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        Multiprocess(config, sockets=[sock]).run()
+    else:
+        uvicorn.Server(config).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,27 +2,29 @@
 TODO
 - default just main sector
 - fix date
-- rrg of US stock
 """
 
 
 import os
-import glob
+import sqlite3
+import time
+from datetime import timedelta
+
 import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
 import streamlit as st
 
+import perf
+
+from rrg_engine import QUADRANTS, data_version, load_history
+from rrg_events import WATCH, recent_events
+from rrg_figure import build_animation, build_figure
+from rrg_grid import load_tails
+from rrg_live import SOURCES, LiveFeed
+from universe import compute_universe_tails, filter_tails, list_universes, universe_version
+
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
-_script_dir = os.path.dirname(os.path.realpath(__file__))
-if os.path.isdir(os.path.join(_script_dir, "data")):
-    BASE_DIR = _script_dir
-else:
-    BASE_DIR = os.getcwd()
-
-CENTER = 100
 
 # Main sectors to show by default (reduced list for better initial view)
 MAIN_SECTORS = [
@@ -30,216 +32,109 @@ MAIN_SECTORS = [
     "FIN", "ICT", "PETRO"
 ]
 
+# With more sectors selected the chart is drawn batched (fixed trace count, no legend)
+LEGEND_MAX_SECTORS = 10
+BATCHED_NOTE = (f"More than {LEGEND_MAX_SECTORS} sectors selected: no legend - each sector is "
+                "named at its latest point; hover a point for details.")
+
+# Replay: the animation shows this many end dates, every ``step`` bars apart
+REPLAY_FRAMES = 60
+
+# Quadrant transitions listed under the chart (stored by rrg_events.py)
+EVENTS_SHOWN = 20
+
+# Live 1h chart while the bar forms (rrg_live.py): "replay" (stand-in feed) or "tradingview"
+LIVE_SOURCE = os.environ.get("RRG_LIVE_SOURCE", "")
+LIVE_REFRESH = 2        # seconds between redraws of the live chart
+
+# Sidebar "Performance" expander with the timings of the current render
+SHOW_PERF_PANEL = os.environ.get("RRG_PERF_PANEL", "1") != "0"
+PERF_PROCESS = perf.process_name("app")
+
+# Stock universes (universe.py) show only the strongest symbols by default
+SECTORS_LABEL = "SET Sectors"
+UNIVERSE_TOP_N = 20
+
 # Default periods per interval
 DEFAULT_PERIODS = {
+    "monthly": {"rs_period": 6, "mom_period": 6, "tail_length": 6},
     "weekly": {"rs_period": 8, "mom_period": 8, "tail_length": 5},
     "daily": {"rs_period": 10, "mom_period": 10, "tail_length": 10},
     "1h": {"rs_period": 10, "mom_period": 10, "tail_length": 20},
 }
 
 # ---------------------------------------------------------------------------
-# RRG computation (JdK style with ema_alpha / Wilder's smoothing)
+# Data loading (cached)
 # ---------------------------------------------------------------------------
 
-def load_csv(path: str, interval: str = "daily") -> pd.Series:
-    """Load a sector CSV and return close prices.
-
-    For weekly: resample daily to weekly (W-FRI) - ต้นตำรับ
-    For daily: no resample (use raw daily)
-    For 1h: no resample (use raw hourly)
+@st.cache_data(max_entries=256)
+def load_all_sectors(interval: str, rs_period: int, mom_period: int, version: tuple):
+    """Load the RRG tails of all sectors. Returns (RRGTails|None, error_msg|None).
+
+    Only the last MAX_TAIL points per sector (the longest tail the UI can
+    draw) and the latest timestamp are returned and cached; full history
+    stays in rrg_engine. ``version`` (the content fingerprint of the
+    interval's published data) is part of the cache key, so results are
+    recomputed as soon as new bars are published and never otherwise.
+    Settings covered by the precomputed grid of the snapshot (rrg_grid.py)
+    are a lookup.
     """
-    df = pd.read_csv(path, parse_dates=["datetime"])
-    df = df.sort_values("datetime").set_index("datetime")
-
-    if interval == "weekly":
-        return df["close"].resample("W-FRI").last().dropna()
-    else:
-        return df["close"].dropna()
+    perf.cache_miss()
+    return load_tails(interval, rs_period, mom_period)
 
 
-def ema_alpha(series: pd.Series, period: int) -> pd.Series:
-    """Wilder's smoothing (RMA) - ต้นตำรับ JdK RRG"""
-    return series.ewm(alpha=1/period, adjust=False).mean()
+@st.cache_data(max_entries=64)
+def load_universe(name: str, interval: str, rs_period: int, mom_period: int, version: tuple):
+    """Tails of every symbol of universe ``name``. Returns (RRGTails|None, error_msg|None).
 
-
-def compute_rrg(sector_close: pd.Series,
-                benchmark_close: pd.Series,
-                rs_period: int,
-                mom_period: int) -> pd.DataFrame:
-    """
-    Compute RS-Ratio and RS-Momentum using JdK methodology.
-    ใช้ ema_alpha (Wilder's smoothing) ตามต้นตำรับ
+    Computed in chunks from the memory-mapped snapshot (see universe.py);
+    ``version`` plays the same role as in ``load_all_sectors``.
     """
-    # Raw relative strength
-    rs = sector_close / benchmark_close
-
-    # RS-Ratio: ใช้ ema_alpha
-    rs_smooth = ema_alpha(rs, rs_period)
-    rs_ratio = CENTER + ((rs - rs_smooth) / rs_smooth) * CENTER
-    
-    # RS-Momentum: ใช้ ema_alpha
-    ratio_smooth = ema_alpha(rs_ratio, mom_period)
-    rs_momentum = CENTER + ((rs_ratio - ratio_smooth) / ratio_smooth) * CENTER
-
-    result = pd.DataFrame({"rs_ratio": rs_ratio, "rs_momentum": rs_momentum})
-    return result.dropna()
-
-
-# ---------------------------------------------------------------------------
-# Data loading (cached)
-# ---------------------------------------------------------------------------
+    perf.cache_miss()
+    universe = list_universes().get(name)
+    if universe is None:
+        return None, f"Unknown universe: {name}"
+    return compute_universe_tails(universe, interval, rs_period, mom_period)
 
-@st.cache_data(ttl=3600)
-def load_all_sectors(interval: str, rs_period: int, mom_period: int):
-    """Load benchmark and all sector RRG data. Returns (dict, error_msg|None)."""
-    # Weekly และ Daily ใช้ data จาก folder "daily"
-    if interval in ["weekly", "daily"]:
-        data_dir = os.path.join(BASE_DIR, "data", "daily")
-    else:
-        data_dir = os.path.join(BASE_DIR, "data", "1h")
-    benchmark_file = os.path.join(data_dir, "SET.csv")
 
-    if not os.path.isfile(benchmark_file):
-        return {}, f"Benchmark file not found: {benchmark_file}"
+@st.cache_data(max_entries=16)
+def load_replay(interval: str, rs_period: int, mom_period: int, version: tuple):
+    """Full RRG history of all sectors for replay. Returns (RRGHistory|None, error_msg|None).
 
-    try:
-        benchmark = load_csv(benchmark_file, interval)
-    except Exception as e:
-        return {}, f"Error loading benchmark: {e}"
-
-    sector_files = sorted(glob.glob(os.path.join(data_dir, "*.csv")))
-    sector_files = [f for f in sector_files if os.path.basename(f) != "SET.csv"]
-
-    sectors = {}
-    errors = []
-    min_rows = rs_period + mom_period + 10
-    for fpath in sector_files:
-        name = os.path.splitext(os.path.basename(fpath))[0]
-        try:
-            close = load_csv(fpath, interval)
-            common = close.index.intersection(benchmark.index)
-            if len(common) < min_rows:
-                continue
-            rrg = compute_rrg(close.loc[common], benchmark.loc[common], rs_period, mom_period)
-            if len(rrg) >= 5:
-                sectors[name] = rrg
-        except Exception as e:
-            errors.append(f"{name}: {e}")
-            continue
-
-    if not sectors and errors:
-        return {}, f"All sectors failed. First errors: {errors[:3]}"
-    return sectors, None
-
-
-# ---------------------------------------------------------------------------
-# Plotly chart
-# ---------------------------------------------------------------------------
-
-COLORS = [
-    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
-    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
-    "#aec7e8", "#ffbb78", "#98df8a", "#ff9896", "#c5b0d5",
-    "#c49c94", "#f7b6d2", "#c7c7c7", "#dbdb8d", "#9edae5",
-]
-
-
-def build_figure(sectors: dict, selected: list[str], tail_length: int,
-                 interval: str = "daily") -> go.Figure:
-    fig = go.Figure()
-
-    color_map = {name: COLORS[i % len(COLORS)] for i, name in enumerate(sorted(sectors.keys()))}
-
-    date_fmt = "%Y-%m-%d %H:%M" if interval == "1h" else "%Y-%m-%d"
-
-    all_x, all_y = [], []
-
-    for name in sorted(selected):
-        rrg = sectors[name]
-        tail = rrg.iloc[-tail_length:]
-        x = tail["rs_ratio"].values
-        y = tail["rs_momentum"].values
-        all_x.extend(x)
-        all_y.extend(y)
-        c = color_map[name]
-        dates = tail.index.strftime(date_fmt).tolist()
-
-        # Tail line
-        fig.add_trace(go.Scatter(
-            x=x, y=y, mode="lines",
-            line=dict(color=c, width=2),
-            name=name, legendgroup=name,
-            showlegend=False,
-            hoverinfo="skip",
-        ))
-
-        # Dots (sized by recency)
-        sizes = np.linspace(5, 12, len(x))
-        hover_text = [f"<b>{name}</b><br>Date: {d}<br>RS-Ratio: {xi:.2f}<br>RS-Mom: {yi:.2f}"
-                      for d, xi, yi in zip(dates, x, y)]
-        fig.add_trace(go.Scatter(
-            x=x, y=y, mode="markers",
-            marker=dict(color=c, size=sizes, line=dict(color="white", width=0.5)),
-            name=name, legendgroup=name,
-            showlegend=True,
-            hovertemplate="%{text}<extra></extra>",
-            text=hover_text,
-        ))
-
-        # Label at latest point
-        fig.add_annotation(
-            x=x[-1], y=y[-1], text=f"<b>{name}</b>",
-            showarrow=False, xshift=10, yshift=8,
-            font=dict(size=10, color=c),
-        )
-
-    # Axis range with padding
-    if all_x and all_y:
-        x_min, x_max = min(all_x), max(all_x)
-        y_min, y_max = min(all_y), max(all_y)
-        x_margin = max((x_max - x_min) * 0.15, 0.5)
-        y_margin = max((y_max - y_min) * 0.15, 0.5)
-        x_lo, x_hi = x_min - x_margin, x_max + x_margin
-        y_lo, y_hi = y_min - y_margin, y_max + y_margin
-    else:
-        x_lo, x_hi, y_lo, y_hi = 96, 104, 96, 104
-
-    # Quadrant shading
-    fig.add_shape(type="rect", x0=CENTER, x1=x_hi, y0=CENTER, y1=y_hi,
-                  fillcolor="green", opacity=0.06, line_width=0, layer="below")
-    fig.add_shape(type="rect", x0=x_lo, x1=CENTER, y0=CENTER, y1=y_hi,
-                  fillcolor="blue", opacity=0.06, line_width=0, layer="below")
-    fig.add_shape(type="rect", x0=x_lo, x1=CENTER, y0=y_lo, y1=CENTER,
-                  fillcolor="red", opacity=0.06, line_width=0, layer="below")
-    fig.add_shape(type="rect", x0=CENTER, x1=x_hi, y0=y_lo, y1=CENTER,
-                  fillcolor="orange", opacity=0.06, line_width=0, layer="below")
-
-    # Quadrant labels
-    fig.add_annotation(x=x_hi, y=y_hi, text="<b>LEADING</b>", showarrow=False,
-                       xanchor="right", yanchor="top", font=dict(size=14, color="green"), opacity=0.5)
-    fig.add_annotation(x=x_lo, y=y_hi, text="<b>IMPROVING</b>", showarrow=False,
-                       xanchor="left", yanchor="top", font=dict(size=14, color="blue"), opacity=0.5)
-    fig.add_annotation(x=x_lo, y=y_lo, text="<b>LAGGING</b>", showarrow=False,
-                       xanchor="left", yanchor="bottom", font=dict(size=14, color="red"), opacity=0.5)
-    fig.add_annotation(x=x_hi, y=y_lo, text="<b>WEAKENING</b>", showarrow=False,
-                       xanchor="right", yanchor="bottom", font=dict(size=14, color="orange"), opacity=0.5)
-
-    # Centre lines
-    fig.add_hline(y=CENTER, line_dash="dash", line_color="grey", line_width=0.8)
-    fig.add_vline(x=CENTER, line_dash="dash", line_color="grey", line_width=0.8)
-
-    fig.update_layout(
-        xaxis_title="RS-Ratio",
-        yaxis_title="RS-Momentum",
-        xaxis=dict(range=[x_lo, x_hi]),
-        yaxis=dict(range=[y_lo, y_hi]),
-        height=700,
-        margin=dict(t=60, b=60, l=60, r=30),
-        legend=dict(font=dict(size=10)),
-        hovermode="closest",
-    )
-
-    return fig
+    Computed once per setting and data version (``version`` as in
+    ``load_all_sectors``); every replayed date is then a slice of it.
+    """
+    perf.cache_miss()
+    return load_history(interval, rs_period, mom_period)
+
+
+@st.cache_resource
+def live_feed(source: str) -> LiveFeed:
+    """One live feed per process, shared by every session."""
+    return LiveFeed(SOURCES[source]()).start()
+
+
+@st.fragment(run_every=LIVE_REFRESH)
+def live_chart(feed: LiveFeed, selected: list[str], rs_period: int, mom_period: int,
+               tail_length: int):
+    """The 1h chart redrawn from the live feed; the figure is rebuilt only when the feed moved."""
+    live_tails, version = feed.tails(rs_period, mom_period)
+    if live_tails is None:
+        st.info(f"Waiting for the live feed{f': {feed.error}' if feed.error else ''}")
+        return
+    shown = [s for s in selected if s in live_tails.symbols]
+    key = (version, tuple(shown), tail_length)
+    cached = st.session_state.get("live_figure")
+    if cached is None or cached[0] != key:
+        fig = build_figure(live_tails, shown, tail_length, "1h",
+                           batched=len(shown) > LEGEND_MAX_SECTORS)
+        cached = st.session_state.live_figure = (key, fig)
+    st.plotly_chart(cached[1], use_container_width=True, key="live_chart")
+    if len(shown) > LEGEND_MAX_SECTORS:
+        st.caption(BATCHED_NOTE)
+    last = f", last at {feed.last_update:%H:%M:%S}" if feed.last_update is not None else ""
+    st.caption(f"Live: bar of {live_tails.latest:%Y-%m-%d %H:%M}, "
+               f"{feed.updates} updates{last}")
 
 
 # ---------------------------------------------------------------------------
@@ -247,7 +142,21 @@ def build_figure(sectors: dict, selected: list[str], tail_length: int,
 # ---------------------------------------------------------------------------
 
 st.set_page_config(page_title="RRG – SET Sectors", layout="wide")
-st.title("Relative Rotation Graph – SET Sectors")
+render_t0 = time.perf_counter()
+perf.start_render()
+st.sidebar.header("Settings")
+
+# Universe selection (only shown when stock universes were imported)
+universes = list_universes()
+universe = None
+if universes:
+    universe_name = st.sidebar.selectbox(
+        "Universe", options=[SECTORS_LABEL] + list(universes),
+        format_func=lambda name: universes[name].title if name in universes else name,
+    )
+    universe = universes.get(universe_name)
+
+st.title(f"Relative Rotation Graph – {universe.title if universe else SECTORS_LABEL}")
 
 # Initialize session state for selected sectors
 if "selected_sectors" not in st.session_state:
@@ -255,11 +164,11 @@ if "selected_sectors" not in st.session_state:
 
 # Sidebar controls
 with st.sidebar:
-    st.header("Settings")
-
     # Interval selection
-    interval = st.radio("Interval", options=["Weekly", "Daily", "1 Hour"], horizontal=True)
-    interval_key = {"Weekly": "weekly", "Daily": "daily", "1 Hour": "1h"}[interval]
+    interval = st.radio("Interval", options=["Monthly", "Weekly", "Daily", "1 Hour"], index=1,
+                        horizontal=True)
+    interval_key = {"Monthly": "monthly", "Weekly": "weekly", "Daily": "daily",
+                    "1 Hour": "1h"}[interval]
 
     # Get default periods for selected interval
     defaults = DEFAULT_PERIODS[interval_key]
@@ -285,7 +194,7 @@ with st.sidebar:
     )
 
     # Tail length
-    tail_units = {"weekly": "weeks", "daily": "days", "1h": "hours"}
+    tail_units = {"monthly": "months", "weekly": "weeks", "daily": "days", "1h": "hours"}
     tail_unit = tail_units[interval_key]
     tail_length = st.slider(
         f"Tail length ({tail_unit})",
@@ -297,34 +206,79 @@ with st.sidebar:
     st.divider()
 
     # Load data with selected parameters
-    sectors, load_error = load_all_sectors(interval_key, rs_period, mom_period)
+    if universe is None:
+        with perf.cache_lookup("load_all_sectors"):
+            tails, load_error = load_all_sectors(interval_key, rs_period, mom_period,
+                                                 data_version(interval_key))
+    else:
+        with perf.cache_lookup("load_universe"):
+            tails, load_error = load_universe(universe.name, interval_key, rs_period,
+                                              mom_period, universe_version(universe, interval_key))
 
-    if not sectors:
+    if not tails:
         st.error(f"No sector data found.\n\n{load_error or 'Unknown error'}")
         st.stop()
-
-    # Sector selection with persistent state
-    all_names = sorted(sectors.keys())
-
-    # Determine default selection
-    if st.session_state.selected_sectors is None:
-        # First time: use main sectors (or all if main sectors not available)
-        default_selection = [s for s in MAIN_SECTORS if s in all_names]
-        if not default_selection:
-            default_selection = all_names
+    latest_date = tails.latest
+
+    if universe is not None:
+        # Filtered before plotting: thousands of tails are neither drawable nor readable
+        top_n = st.slider("Show top", min_value=5, max_value=100, value=UNIVERSE_TOP_N,
+                          help="Ranked by distance from the centre (strength of rotation)")
+        quadrants = st.multiselect("Quadrants", options=QUADRANTS, default=QUADRANTS,
+                                   format_func=str.title)
+        total = len(tails)
+        tails = filter_tails(tails, top_n, quadrants)
+        selected = tails.symbols
+        st.caption(f"{len(selected)} of {total} symbols")
     else:
-        # Keep previous selection, but filter to only available sectors
-        default_selection = [s for s in st.session_state.selected_sectors if s in all_names]
-        if not default_selection:
-            # If none of previous selection available, fallback to main sectors
+        # Sector selection with persistent state
+        all_names = sorted(tails.symbols)
+
+        # Determine default selection
+        if st.session_state.selected_sectors is None:
+            # First time: use main sectors (or all if main sectors not available)
             default_selection = [s for s in MAIN_SECTORS if s in all_names]
             if not default_selection:
                 default_selection = all_names
-
-    selected = st.multiselect("Sectors", options=all_names, default=default_selection)
-
-    # Update session state with current selection
-    st.session_state.selected_sectors = selected
+        else:
+            # Keep previous selection, but filter to only available sectors
+            default_selection = [s for s in st.session_state.selected_sectors if s in all_names]
+            if not default_selection:
+                # If none of previous selection available, fallback to main sectors
+                default_selection = [s for s in MAIN_SECTORS if s in all_names]
+                if not default_selection:
+                    default_selection = all_names
+
+        selected = st.multiselect("Sectors", options=all_names, default=default_selection)
+
+        # Update session state with current selection
+        st.session_state.selected_sectors = selected
+
+    # Replay: the chart as of an earlier end date (sectors only)
+    history = None
+    if universe is None and st.toggle("Replay", help="Show the rotation as of an earlier date"):
+        with perf.cache_lookup("load_replay"):
+            history, replay_error = load_replay(interval_key, rs_period, mom_period,
+                                                data_version(interval_key))
+        if history is None:
+            st.error(f"Replay unavailable.\n\n{replay_error}")
+        else:
+            step = timedelta(hours=1) if interval_key == "1h" else timedelta(days=1)
+            first, last = (pd.Timestamp(history.dates[i]).to_pydatetime() for i in (0, -1))
+            as_of = st.slider("As of", min_value=first, max_value=last, value=last, step=step,
+                              format="YYYY-MM-DD HH:mm" if interval_key == "1h" else "YYYY-MM-DD")
+            replay_row = max(history.index_at(as_of), 0)
+            animate = st.checkbox("Animate", help=f"Play the {REPLAY_FRAMES} end dates up to "
+                                                  f"the as-of date in the browser")
+            if animate:
+                frame_step = st.slider(f"Frame step ({tail_unit})", min_value=1, max_value=20,
+                                       value=1)
+            latest_date = pd.Timestamp(history.dates[replay_row])
+
+    # Live: the forming 1h bar, redrawn every few seconds (sectors only, not in replay)
+    live = (LIVE_SOURCE in SOURCES and universe is None and interval_key == "1h"
+            and history is None and st.toggle("Live", help="Update the chart as the current "
+                                                           "bar forms"))
 
     st.divider()
     
@@ -337,13 +291,67 @@ with st.sidebar:
     """)
 
     # Last-updated date
-    latest_date = max(rrg.index[-1] for rrg in sectors.values())
     date_fmt = "%Y-%m-%d %H:%M" if interval_key == "1h" else "%Y-%m-%d"
     st.markdown(f"**Data as of:** {latest_date.strftime(date_fmt)}")
 
+    # Filled in at the end of the script, once everything was timed
+    perf_panel = st.container() if SHOW_PERF_PANEL else None
+
+if history is not None and selected:
+    # Sectors without enough history at the replayed date are left out
+    tails = history.tails_at(replay_row)
+    selected = [s for s in selected if s in tails.symbols]
+    if not selected:
+        st.warning("None of the selected sectors has enough history at this date.")
+        st.stop()
+
 if not selected:
-    st.warning("Select at least one sector from the sidebar.")
+    st.warning("Select at least one sector from the sidebar." if universe is None
+               else "No symbols match the quadrant filter.")
     st.stop()
 
-fig = build_figure(sectors, selected, tail_length, interval_key)
-st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+if live:
+    live_chart(live_feed(LIVE_SOURCE), selected, rs_period, mom_period, tail_length)
+else:
+    if history is not None and animate:
+        rows = history.frame_rows(replay_row, REPLAY_FRAMES, frame_step)
+        fig = build_animation(history, selected, tail_length, rows, interval_key)
+    else:
+        fig = build_figure(tails, selected, tail_length, interval_key,
+                           batched=len(selected) > LEGEND_MAX_SECTORS)
+    with perf.span("plotly_chart"):      # validation + JSON serialization of the figure
+        st.plotly_chart(fig, use_container_width=True)
+    if len(selected) > LEGEND_MAX_SECTORS:
+        st.caption(BATCHED_NOTE)
+
+# Latest quadrant transitions of the selected sectors, at the interval's default periods
+if universe is None:
+    events_error = None
+    with perf.span("events_query"):
+        try:
+            events = recent_events(interval_key, symbols=selected, limit=EVENTS_SHOWN)
+        except (sqlite3.Error, pd.errors.DatabaseError, OSError) as e:     # missing or locked db
+            events, events_error = None, str(e.__cause__ or e)
+    rs_default, mom_default = WATCH[interval_key]
+    with st.expander(f"Quadrant changes (RS {rs_default} / Mom {mom_default})"):
+        if events_error is not None:
+            st.caption(f"Events unavailable ({events_error})")
+        elif events.empty:
+            st.caption("No events stored yet - run: python rrg_events.py update")
+        else:
+            date_len = 16 if interval_key == "1h" else 10
+            events["date"] = events["date"].str.replace("T", " ").str[:date_len]
+            st.dataframe(events, hide_index=True, use_container_width=True,
+                         column_config={c: st.column_config.NumberColumn(format="%.2f")
+                                        for c in ["rs_ratio", "rs_momentum", "angle",
+                                                  "angular_velocity", "speed"]})
+
+# Timings of this render (and where the cached loaders were hits)
+perf.record("render", time.perf_counter() - render_t0)
+perf.write_snapshot(PERF_PROCESS)
+if perf_panel is not None:
+    with perf_panel.expander("Performance"):
+        report = perf.render_report()
+        st.dataframe(pd.DataFrame([(name, None if sec is None else round(sec * 1e3, 2))
+                                   for name, sec in report], columns=["step", "ms"]),
+                     hide_index=True, use_container_width=True)
@@ -7,18 +7,26 @@ Usage:
     python auto_fetch_data.py --schedule         # Run on schedule (market hours)
     python auto_fetch_data.py --interval 1h      # Fetch 1h data only
     python auto_fetch_data.py --interval daily   # Fetch daily data only
+    python auto_fetch_data.py --full             # Re-download full history
 """
 
 import argparse
 import os
 import time
-import schedule
 import logging
-from datetime import datetime
+from datetime import date, datetime
 
 import pandas as pd
 from tvDatafeed import TvDatafeed, Interval
 
+from data_store import FIELDS, SnapshotWriter, load_frames
+from fetch_metrics import record_run
+from fetch_pipeline import (DEFAULT_CONCURRENCY, DEFAULT_RATE, ConcurrentFetcher,
+                            FetchJob, RateLimiter)
+from rrg_events import update_all_events
+from rrg_grid import build_grids
+from scheduler import JOBS, Scheduler, job_times
+
 # Setup logging
 LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -33,9 +41,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize TradingView datafeed
-tv = TvDatafeed()
-
 # Sectors (same as fetch_sector_data.py)
 SECTORS = [
     "SET",
@@ -56,54 +61,112 @@ INTERVAL_MAP = {
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 
+SAMPLE_DAY = date(2025, 1, 6)      # a trading day, for printing the schedule
 
-def fetch_with_retry(symbol, interval, n_bars, max_retries=3, wait_time=20):
-    """Fetch data with retry mechanism."""
-    for attempt in range(max_retries):
-        try:
-            stock_data = tv.get_hist(
-                symbol=symbol,
-                exchange='SET',
-                interval=interval,
-                n_bars=n_bars
-            )
-            if stock_data is not None and not stock_data.empty:
-                return stock_data
-        except Exception as e:
-            if attempt < max_retries - 1:
-                logger.warning(f"  [RETRY] {symbol} attempt {attempt + 1}/{max_retries}: {e}")
-            else:
-                logger.error(f"  [FAIL] {symbol}: {e}")
+# Incremental mode: bars re-requested before the last stored bar, to
+# reconcile a bar that was still forming (or revised) at the previous fetch
+OVERLAP_BARS = {"daily": 5, "1h": 14}
+
+
+def fix_timezone(stock_data, int_type):
+    """Fix timezone for 1h data (Thailand is UTC+7)."""
+    if int_type == "1h":
+        stock_data.index = stock_data.index + pd.Timedelta(hours=7)
+    return stock_data
+
+
+def bars_to_request(last_bar, int_type):
+    """Bars needed to cover the gap since ``last_bar`` plus the overlap.
+
+    Calendar days / hours over-count trading bars, so the gap is always covered.
+    """
+    elapsed = max((datetime.now() - last_bar.to_pydatetime()).total_seconds(), 0)
+    if int_type == "daily":
+        gap = int(elapsed // 86400) + 1
+    else:
+        gap = int(elapsed // 3600) + 1
+    return min(gap + OVERLAP_BARS[int_type], INTERVAL_MAP[int_type]["n_bars"])
+
+
+def merge_bars(old, new):
+    """Reconcile freshly fetched bars with the stored ones.
+
+    Returns (merged, n_added, n_revised), or None when ``new`` starts after the
+    last stored bar (the gap is not covered and a full download is needed).
+    """
+    new = new[~new.index.duplicated(keep="last")].sort_index()
+    if new.index[0] > old.index[-1]:
+        return None
 
-        if attempt < max_retries - 1:
-            time.sleep(wait_time)
+    overlap = new.index.intersection(old.index)
+    changed = old.loc[overlap, FIELDS].to_numpy() != new.loc[overlap, FIELDS].to_numpy()
+    n_revised = int(changed.any(axis=1).sum())
+    n_added = len(new.index.difference(old.index))
 
-    return None
+    merged = pd.concat([old[~old.index.isin(new.index)], new]).sort_index()
+    return merged, n_added, n_revised
 
 
-def verify_file(filepath):
-    """Verify that CSV file exists and has valid data."""
+def csv_last_timestamp(filepath):
+    """Timestamp of the last row of a CSV, read from the file's tail (None if unreadable)."""
     try:
-        if not os.path.exists(filepath):
-            return False, "File not found"
+        with open(filepath, "rb") as fh:
+            fh.seek(0, os.SEEK_END)
+            fh.seek(max(0, fh.tell() - 4096))
+            last_line = fh.read().splitlines()[-1].decode("utf-8")
+        return pd.Timestamp(last_line.split(",", 1)[0])
+    except Exception:
+        return None
+
+
+def export_bars(filepath, old, merged, n_revised):
+    """Write one symbol's CSV export, appending when only new bars arrived."""
+    if old is not None and n_revised == 0 and csv_last_timestamp(filepath) == old.index[-1]:
+        appended = merged[merged.index > old.index[-1]]
+        if len(appended):
+            appended.to_csv(filepath, mode="a", header=False)
+        return len(appended)
+
+    merged.to_csv(filepath)
+    return len(merged)
+
+
+def fetch_metrics_row(result):
+    """Per-symbol metrics of one FetchResult (see fetch_metrics.FETCH_COLUMNS)."""
+    data = result.data
+    return {
+        "interval": result.job.tag,
+        "symbol": result.job.symbol,
+        "status": "ok" if data is not None else "failed",
+        "latency": result.latency,
+        "attempts": result.attempts,
+        "waited": result.waited,
+        "rows_received": 0 if data is None else len(data),
+        "bytes": 0 if data is None else int(data.memory_usage(deep=True).sum()),
+        "error": result.error,
+    }
 
-        df = pd.read_csv(filepath)
-        if df.empty:
-            return False, "Empty file"
 
-        return True, f"{len(df)} rows"
-    except Exception as e:
-        return False, str(e)
+def fetch_data(interval_type="both", full=False, concurrency=DEFAULT_CONCURRENCY,
+               rate=DEFAULT_RATE, client_factory=TvDatafeed):
+    """Fetch sector data from TradingView.
 
+    By default only the bars since the last stored bar (plus a small overlap)
+    are requested and appended; ``full`` re-downloads the whole history.
+    Symbols are fetched ``concurrency`` at a time, at most ``rate`` requests/s.
 
-def fetch_data(interval_type="both"):
-    """Fetch sector data from TradingView."""
+    All intervals are published together as one data snapshot at the end of
+    the run; the CSVs are written afterwards as an export. The run and every
+    symbol's fetch are recorded in the run history (fetch_metrics.py).
+    """
     start_time = datetime.now()
 
     logger.info("=" * 60)
     logger.info("  STARTING DATA FETCH")
     logger.info(f"  Time: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
     logger.info(f"  Interval: {interval_type}")
+    logger.info(f"  Mode: {'full' if full else 'incremental'}")
+    logger.info(f"  Concurrency: {concurrency} (max {rate:g} requests/s)")
     logger.info("=" * 60)
 
     intervals_to_fetch = []
@@ -119,50 +182,123 @@ def fetch_data(interval_type="both"):
         "success_symbols": []
     }
 
+    fetcher = ConcurrentFetcher(client_factory, concurrency=concurrency,
+                                limiter=RateLimiter(rate), logger=logger)
+    writer = SnapshotWriter(DATA_DIR)
+    exports = []
+    n_changed = 0
+    metrics = {}                # (interval, symbol) -> fetch_metrics row
+    timings = {"store_seconds": 0.0}
+
     for int_type in intervals_to_fetch:
         cfg = INTERVAL_MAP[int_type]
         out_dir = os.path.join(DATA_DIR, cfg["subdir"])
         os.makedirs(out_dir, exist_ok=True)
 
         logger.info(f"\nFetching {int_type} data ({len(SECTORS)} sectors)...")
+        fetched = {}
+
+        existing = {} if full else (writer.base_frames(cfg["subdir"]) or load_frames(cfg["subdir"], DATA_DIR))
 
+        jobs = []
         for symbol in SECTORS:
-            stock_data = fetch_with_retry(
-                symbol,
-                cfg["interval"],
-                cfg["n_bars"]
-            )
+            old = existing.get(symbol)
+            if old is None or old.empty:
+                existing[symbol] = old = None
+            n_bars = cfg["n_bars"] if old is None else bars_to_request(old.index[-1], int_type)
+            jobs.append(FetchJob(symbol, cfg["interval"], n_bars, tag=int_type))
+
+        # Results are written here, in completion order, while other symbols download
+        for result in fetcher.fetch_all(jobs):
+            symbol = result.job.symbol
+            old = existing[symbol]
+            stock_data = result.data
+            row = metrics[(int_type, symbol)] = fetch_metrics_row(result)
 
             if stock_data is not None:
                 try:
-                    # Fix timezone for 1h data (Thailand is UTC+7)
-                    if int_type == "1h":
-                        stock_data.index = stock_data.index + pd.Timedelta(hours=7)
-
-                    filepath = os.path.join(out_dir, f'{symbol}.csv')
-                    stock_data.to_csv(filepath)
-
-                    # Verify the saved file
-                    is_valid, msg = verify_file(filepath)
-                    if is_valid:
-                        logger.info(f"  [OK] {int_type}/{symbol}.csv - {msg}")
-                        results["success"] += 1
-                        results["success_symbols"].append(f"{int_type}/{symbol}")
-                    else:
-                        logger.error(f"  [FAIL] {int_type}/{symbol}.csv - Verification failed: {msg}")
-                        results["failed"] += 1
-                        results["failed_symbols"].append(f"{int_type}/{symbol}")
+                    stock_data = fix_timezone(stock_data, int_type)
+                    merged = (stock_data, len(stock_data), 0) if old is None else merge_bars(old, stock_data)
+                    if merged is None:
+                        logger.warning(f"  [GAP] {int_type}/{symbol} - no overlap with stored bars, "
+                                       f"downloading {cfg['n_bars']} bars")
+                        result = fetcher.fetch(FetchJob(symbol, cfg["interval"], cfg["n_bars"], tag=int_type))
+                        attempts = row["attempts"]
+                        row = metrics[(int_type, symbol)] = fetch_metrics_row(result)
+                        row["attempts"] += attempts
+                        if result.data is None:
+                            raise ValueError(result.error)
+                        stock_data = fix_timezone(result.data, int_type)
+                        old = None
+                        merged = (stock_data, len(stock_data), 0)
+                    merged, n_added, n_revised = merged
+
+                    logger.info(f"  [OK] {int_type}/{symbol} - {len(merged)} rows "
+                                f"(+{n_added} new, {n_revised} revised, {len(stock_data)} fetched)")
+                    results["success"] += 1
+                    results["success_symbols"].append(f"{int_type}/{symbol}")
+                    fetched[symbol] = merged
+                    row.update(rows_added=n_added, rows_revised=n_revised)
+                    exports.append((row, os.path.join(out_dir, f'{symbol}.csv'), old, merged, n_revised))
+                    if old is None or n_added or n_revised:
+                        n_changed += 1
 
                 except Exception as e:
                     logger.error(f"  [FAIL] {symbol}: {e}")
+                    row.update(status="failed", error=str(e))
                     results["failed"] += 1
                     results["failed_symbols"].append(f"{int_type}/{symbol}")
             else:
-                logger.error(f"  [FAIL] {symbol}: No data returned from TradingView")
+                logger.error(f"  [FAIL] {symbol}: {result.error}")
                 results["failed"] += 1
                 results["failed_symbols"].append(f"{int_type}/{symbol}")
 
-            time.sleep(2)  # Rate limiting
+        if fetched:
+            t0 = time.perf_counter()
+            writer.update(cfg["subdir"], fetched)
+            timings["store_seconds"] += time.perf_counter() - t0
+
+    # Publish every interval as one snapshot - the app switches to it atomically.
+    # Nothing new means no snapshot, so the app keeps its cached results.
+    results["snapshot"] = None
+    if results["success"] and not n_changed:
+        writer.discard()
+        exports = []
+        results["snapshot"] = writer.base_id
+        logger.info(f"  [OK] No new bars - snapshot {writer.base_id} unchanged")
+    elif results["success"]:
+        try:
+            t0 = time.perf_counter()
+            results["snapshot"] = writer.publish()
+            timings["publish_seconds"] = time.perf_counter() - t0
+            logger.info(f"  [OK] Published data snapshot {results['snapshot']}")
+        except Exception as e:
+            writer.discard()
+            logger.error(f"  [FAIL] Snapshot not published: {e}")
+    else:
+        writer.discard()
+
+    # CSV export, written after publishing so the CSVs never lead the snapshot
+    if results["snapshot"]:
+        for row, filepath, old, merged, n_revised in exports:
+            try:
+                t0 = time.perf_counter()
+                export_bars(filepath, old, merged, n_revised)
+                row["write_seconds"] = time.perf_counter() - t0
+            except Exception as e:
+                logger.warning(f"  [WARN] CSV export {filepath}: {e}")
+
+        # Precompute every slider setting; the app computes on its own until this is done
+        t0 = time.perf_counter()
+        reports = build_grids(results["snapshot"], logger=logger.info)
+        timings["grid_seconds"] = time.perf_counter() - t0
+        logger.info(f"  [OK] RRG grid warm-up {timings['grid_seconds']:.1f}s, "
+                    f"{sum(r['bytes'] for r in reports) / 1e6:.1f} MB")
+
+        # Quadrant transitions of the new bars (only rows after the last scan)
+        t0 = time.perf_counter()
+        update_all_events(logger=logger.info)
+        timings["events_seconds"] = time.perf_counter() - t0
 
     # Calculate duration
     end_time = datetime.now()
@@ -170,10 +306,10 @@ def fetch_data(interval_type="both"):
 
     # Determine status
     total = results["success"] + results["failed"]
-    if results["failed"] == 0:
-        status = "SUCCESS"
-    elif results["success"] == 0:
+    if results["snapshot"] is None:
         status = "FAILED"
+    elif results["failed"] == 0:
+        status = "SUCCESS"
     else:
         status = "PARTIAL"
 
@@ -187,6 +323,7 @@ def fetch_data(interval_type="both"):
     logger.info(f"  Duration:  {duration:.1f} seconds")
     logger.info(f"  Success:   {results['success']}/{total}")
     logger.info(f"  Failed:    {results['failed']}/{total}")
+    logger.info(f"  Snapshot:  {results['snapshot'] or '-'}")
 
     if results["failed_symbols"]:
         logger.warning(f"  Failed symbols: {', '.join(results['failed_symbols'])}")
@@ -194,75 +331,38 @@ def fetch_data(interval_type="both"):
     logger.info("=" * 60)
     logger.info("")
 
+    try:
+        record_run({"run_id": start_time.isoformat(), "started": start_time.isoformat(),
+                    "intervals": interval_type, "mode": "full" if full else "incremental",
+                    "concurrency": concurrency, "rate": rate, "status": status,
+                    "success": results["success"], "failed": results["failed"],
+                    "duration": duration, "snapshot": results["snapshot"], **timings},
+                   list(metrics.values()))
+    except Exception as e:
+        logger.warning(f"  [WARN] Run history not recorded: {e}")
+
     return status, results
 
 
-def run_scheduled():
-    """Run on schedule during market hours."""
+def run_scheduled(concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE):
+    """Run on the market calendar (scheduler.py): hourly 1h fetches in session, daily after close."""
     logger.info("=" * 60)
     logger.info("  STARTING SCHEDULED DATA FETCHER")
     logger.info("=" * 60)
-    logger.info("Schedule:")
-    logger.info("  - Hourly (1h data): 10:20, 11:20, 12:20, 14:20, 15:20, 16:20 (Mon-Fri)")
-    logger.info("  - Daily data: 18:00 (Mon-Fri)")
+    logger.info("Schedule (trading days, Asia/Bangkok):")
+    for job in JOBS:
+        times = ", ".join(f"{t:%H:%M}" for t in job_times(job, SAMPLE_DAY))
+        logger.info(f"  - {job.name} ({', '.join(job.intervals)} data): {times}")
     logger.info("")
     logger.info("Log file: logs/data_fetch.log")
     logger.info("Press Ctrl+C to stop")
     logger.info("")
 
-    # Hourly updates during market hours (1h data only)
-    schedule.every().monday.at("10:20").do(fetch_data, interval_type="1h")
-    schedule.every().monday.at("11:20").do(fetch_data, interval_type="1h")
-    schedule.every().monday.at("12:20").do(fetch_data, interval_type="1h")
-    schedule.every().monday.at("14:20").do(fetch_data, interval_type="1h")
-    schedule.every().monday.at("15:20").do(fetch_data, interval_type="1h")
-    schedule.every().monday.at("16:20").do(fetch_data, interval_type="1h")
-
-    schedule.every().tuesday.at("10:20").do(fetch_data, interval_type="1h")
-    schedule.every().tuesday.at("11:20").do(fetch_data, interval_type="1h")
-    schedule.every().tuesday.at("12:20").do(fetch_data, interval_type="1h")
-    schedule.every().tuesday.at("14:20").do(fetch_data, interval_type="1h")
-    schedule.every().tuesday.at("15:20").do(fetch_data, interval_type="1h")
-    schedule.every().tuesday.at("16:20").do(fetch_data, interval_type="1h")
-
-    schedule.every().wednesday.at("10:20").do(fetch_data, interval_type="1h")
-    schedule.every().wednesday.at("11:20").do(fetch_data, interval_type="1h")
-    schedule.every().wednesday.at("12:20").do(fetch_data, interval_type="1h")
-    schedule.every().wednesday.at("14:20").do(fetch_data, interval_type="1h")
-    schedule.every().wednesday.at("15:20").do(fetch_data, interval_type="1h")
-    schedule.every().wednesday.at("16:20").do(fetch_data, interval_type="1h")
-
-    schedule.every().thursday.at("10:20").do(fetch_data, interval_type="1h")
-    schedule.every().thursday.at("11:20").do(fetch_data, interval_type="1h")
-    schedule.every().thursday.at("12:20").do(fetch_data, interval_type="1h")
-    schedule.every().thursday.at("14:20").do(fetch_data, interval_type="1h")
-    schedule.every().thursday.at("15:20").do(fetch_data, interval_type="1h")
-    schedule.every().thursday.at("16:20").do(fetch_data, interval_type="1h")
-
-    schedule.every().friday.at("10:20").do(fetch_data, interval_type="1h")
-    schedule.every().friday.at("11:20").do(fetch_data, interval_type="1h")
-    schedule.every().friday.at("12:20").do(fetch_data, interval_type="1h")
-    schedule.every().friday.at("14:20").do(fetch_data, interval_type="1h")
-    schedule.every().friday.at("15:20").do(fetch_data, interval_type="1h")
-    schedule.every().friday.at("16:20").do(fetch_data, interval_type="1h")
-
-    # Daily update after market close (daily data)
-    schedule.every().monday.at("18:00").do(fetch_data, interval_type="daily")
-    schedule.every().tuesday.at("18:00").do(fetch_data, interval_type="daily")
-    schedule.every().wednesday.at("18:00").do(fetch_data, interval_type="daily")
-    schedule.every().thursday.at("18:00").do(fetch_data, interval_type="daily")
-    schedule.every().friday.at("18:00").do(fetch_data, interval_type="daily")
-
-    # Run loop
-    logger.info("Waiting for scheduled tasks...")
-    while True:
-        schedule.run_pending()
-        next_run = schedule.next_run()
-        if next_run:
-            time_until = (next_run - datetime.now()).total_seconds()
-            if time_until > 0 and time_until < 120:  # Show when less than 2 minutes
-                logger.info(f"Next fetch in {time_until:.0f} seconds...")
-        time.sleep(60)
+    def run(intervals):
+        fetch_data(interval_type=intervals[0] if len(intervals) == 1 else "both",
+                   concurrency=concurrency, rate=rate)
+
+    Scheduler(run, logger=logger).run_forever()
 
 
 def main():
@@ -270,15 +370,22 @@ def main():
     parser.add_argument("--schedule", action="store_true", help="Run on schedule (market hours)")
     parser.add_argument("--interval", choices=["daily", "1h", "both"], default="both",
                         help="Data interval to fetch (default: both)")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-download full history instead of only the new bars")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Symbols fetched in parallel (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help=f"Max TradingView requests per second (default: {DEFAULT_RATE:g})")
     args = parser.parse_args()
 
     if args.schedule:
         try:
-            run_scheduled()
+            run_scheduled(concurrency=args.concurrency, rate=args.rate)
         except KeyboardInterrupt:
             logger.info("Scheduler stopped by user")
     else:
-        status, results = fetch_data(interval_type=args.interval)
+        status, results = fetch_data(interval_type=args.interval, full=args.full,
+                                     concurrency=args.concurrency, rate=args.rate)
         # Exit with error code if any failures
         if status == "FAILED":
             exit(1)
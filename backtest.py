@@ -0,0 +1,242 @@
+"""
+Backtest - which RS-Ratio / RS-Momentum settings actually rotated well?
+
+Sweeps the period grid (the app's 5..50 sliders by default) over every
+sector and simulates simple quadrant-rotation strategies on the stored
+closes: at each bar's close, hold the sectors in the strategy's quadrants
+equally weighted until the next close (cash when there are none).
+
+    leading      RS-Ratio >= 100 and RS-Momentum >= 100
+    improving    RS-Ratio <  100 and RS-Momentum >= 100
+    rising       leading or improving (RS-Momentum >= 100)
+
+A sector only counts from the bar the chart would show it at
+(rrg_engine.sector_filter), and every setting is measured over the same
+bars: from the longest warm-up in the sweep to the end. Reported per
+interval / strategy / setting: CAGR, volatility, Sharpe (no risk-free
+rate), max drawdown, CAGR over the benchmark, hit rate (share of held
+sector-bars that beat the benchmark), exposure and turnover.
+
+The RS smoothing is computed once per rs_period and shared by every
+mom_period, like the precomputed grid (rrg_grid.py); rs_periods are
+split into chunks over a process pool, each worker mapping the same
+price panel.
+
+Usage:
+    python backtest.py                                  # daily, 5-50 x 5-50
+    python backtest.py --interval weekly --rs 5-30 --mom 5-30 --workers 2
+    python backtest.py --interval all --cost-bps 10 -o backtest.csv --top 5
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from rrg_engine import (CENTER, MIN_VALID, WARMUP_EXTRA, ema_alpha_2d, load_price_panel,
+                        quadrant_codes)
+from rrg_grid import MOM_PERIODS, RS_PERIODS, parse_periods
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+INTERVALS = ["monthly", "weekly", "daily", "1h"]
+STRATEGIES = {                  # strategy -> quadrant codes held (see rrg_engine.QUADRANTS)
+    "leading": [0],
+    "improving": [3],
+    "rising": [0, 3],
+}
+METRICS = ["cagr", "volatility", "sharpe", "max_drawdown", "excess_cagr", "hit_rate",
+           "exposure", "turnover"]
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+
+# ---------------------------------------------------------------------------
+# Simulation
+# ---------------------------------------------------------------------------
+
+def bar_returns(closes: np.ndarray) -> np.ndarray:
+    """Return of every bar over the previous one (row 0 is NaN).
+
+    Missing bars keep the last close, so the move over a gap lands on the
+    bar after it; NaN before a column's first close.
+    """
+    filled = pd.DataFrame(closes, copy=False).ffill().to_numpy()
+    out = np.full(closes.shape, np.nan)
+    out[1:] = filled[1:] / filled[:-1] - 1
+    return out
+
+
+def periods_per_year(dates: pd.DatetimeIndex) -> float:
+    years = (dates[-1] - dates[0]).days / 365.25
+    return (len(dates) - 1) / years if years > 0 else float("nan")
+
+
+def simulate(held: np.ndarray, returns: np.ndarray, bench_returns: np.ndarray,
+             start: int, per_year: float, cost: float = 0.0) -> dict:
+    """Metrics of holding ``held`` (bars x sectors, decided at each close) equally weighted.
+
+    ``returns`` / ``bench_returns`` are per bar (``bar_returns``); the
+    position taken at bar t earns the return of bar t+1. Measured from
+    ``start`` on; ``cost`` is charged per unit of turnover.
+    """
+    held = held[start:-1]
+    n_held = held.sum(axis=1)
+    weights = held / np.maximum(n_held, 1)[:, None]
+    nxt = np.nan_to_num(returns[start + 1:])
+    bench = np.nan_to_num(bench_returns[start + 1:])
+
+    turnover = np.abs(np.diff(weights, axis=0, prepend=0)).sum(axis=1)
+    port = (weights * nxt).sum(axis=1) - cost * turnover
+    equity = np.cumprod(1 + port)
+    years = len(port) / per_year
+
+    vol = port.std() * np.sqrt(per_year)
+    cagr = equity[-1] ** (1 / years) - 1 if len(port) else np.nan
+    bench_cagr = np.prod(1 + bench) ** (1 / years) - 1 if len(port) else np.nan
+    n_positions = n_held.sum()
+    return {
+        "cagr": cagr,
+        "volatility": vol,
+        "sharpe": port.mean() / port.std() * np.sqrt(per_year) if port.std() > 0 else np.nan,
+        "max_drawdown": (equity / np.maximum.accumulate(equity) - 1).min() if len(port) else np.nan,
+        "excess_cagr": cagr - bench_cagr,
+        "hit_rate": (held & (nxt > bench[:, None])).sum() / n_positions if n_positions else np.nan,
+        "exposure": (n_held > 0).mean() if len(port) else np.nan,
+        "turnover": turnover.mean() * per_year,
+    }
+
+
+def _sweep_chunk(interval: str, rs_periods: list[int], mom_periods: list[int], start: int,
+                 cost: float) -> list[dict]:
+    """Every strategy for ``rs_periods`` x ``mom_periods`` (one process pool task)."""
+    panel, error = load_price_panel(interval)
+    if panel is None:
+        raise RuntimeError(error)
+    closes = panel.closes.to_numpy(dtype=np.float64)
+    benchmark = panel.benchmark.to_numpy(dtype=np.float64)
+    returns = bar_returns(closes)
+    bench_returns = bar_returns(benchmark[:, None])[:, 0]
+    per_year = periods_per_year(panel.closes.index)
+    n_bars = np.cumsum(~np.isnan(closes), axis=0)
+
+    # Same arithmetic as rrg_engine.rrg_arrays; the RS smoothing is shared by every mom_period
+    rs = closes / benchmark[:, None]
+    # Quadrant code -> held, per strategy; the extra last entry catches code -1 (no point)
+    tables = {}
+    for strategy, quadrants in STRATEGIES.items():
+        tables[strategy] = np.zeros(5, dtype=bool)
+        tables[strategy][quadrants] = True
+    rows = []
+    for rs_period in rs_periods:
+        rs_smooth = ema_alpha_2d(rs, rs_period)
+        rs_ratio = CENTER + ((rs - rs_smooth) / rs_smooth) * CENTER
+        for mom_period in mom_periods:
+            ratio_smooth = ema_alpha_2d(rs_ratio, mom_period)
+            rs_momentum = CENTER + ((rs_ratio - ratio_smooth) / ratio_smooth) * CENTER
+            codes = quadrant_codes(rs_ratio, rs_momentum)
+            n_points = np.cumsum(codes >= 0, axis=0)
+            shown = (n_bars >= rs_period + mom_period + WARMUP_EXTRA) & (n_points >= MIN_VALID)
+            for strategy, table in tables.items():
+                held = shown & table[codes]
+                rows.append({"interval": interval, "strategy": strategy, "rs_period": rs_period,
+                             "mom_period": mom_period,
+                             **simulate(held, returns, bench_returns, start, per_year, cost)})
+    return rows
+
+
+def _chunks(values: list[int], n: int) -> list[list[int]]:
+    """Split ``values`` into about ``n`` interleaved chunks (similar work each)."""
+    return [values[i::n] for i in range(min(n, len(values)))]
+
+
+def run_backtest(interval: str, rs_periods=RS_PERIODS, mom_periods=MOM_PERIODS,
+                 workers: int = DEFAULT_WORKERS, cost_bps: float = 0.0) -> pd.DataFrame:
+    """Sweep ``rs_periods`` x ``mom_periods`` for ``interval``. One row per strategy and setting."""
+    rs_periods, mom_periods = list(rs_periods), list(mom_periods)
+    panel, error = load_price_panel(interval)
+    if panel is None:
+        raise RuntimeError(error)
+    start = max(rs_periods) + max(mom_periods) + WARMUP_EXTRA
+    if start >= len(panel.closes) - 1:
+        raise RuntimeError(f"Not enough {interval} bars ({len(panel.closes)}) "
+                           f"for periods up to {max(rs_periods)} / {max(mom_periods)}")
+    cost = cost_bps / 1e4
+
+    # Several chunks per worker so a slow chunk does not leave the others idle
+    chunks = _chunks(rs_periods, workers * 4 if workers > 1 else 1)
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            parts = list(pool.map(_sweep_chunk, [interval] * len(chunks), chunks,
+                                  [mom_periods] * len(chunks), [start] * len(chunks),
+                                  [cost] * len(chunks)))
+    else:
+        parts = [_sweep_chunk(interval, chunk, mom_periods, start, cost) for chunk in chunks]
+
+    bench_returns = bar_returns(panel.benchmark.to_numpy(dtype=np.float64)[:, None])
+    per_year = periods_per_year(panel.closes.index)
+    benchmark = simulate(np.ones((len(bench_returns), 1), dtype=bool), bench_returns,
+                         bench_returns[:, 0], start, per_year)
+    rows = [row for part in parts for row in part]
+    rows.append({"interval": interval, "strategy": "benchmark", "rs_period": 0, "mom_period": 0,
+                 **benchmark, "hit_rate": np.nan})
+    result = pd.DataFrame(rows, columns=["interval", "strategy", "rs_period", "mom_period"] + METRICS)
+    result.attrs["period"] = (panel.closes.index[start], panel.closes.index[-1])
+    return result.sort_values(["strategy", "rs_period", "mom_period"], ignore_index=True)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest quadrant rotation over the period grid")
+    parser.add_argument("--interval", choices=INTERVALS + ["all"], default="daily")
+    parser.add_argument("--rs", default="5-50", help="RS-Ratio periods, e.g. 5-50 or 8,10,14")
+    parser.add_argument("--mom", default="5-50", help="RS-Momentum periods, e.g. 5-50")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Processes")
+    parser.add_argument("--cost-bps", type=float, default=0.0,
+                        help="Trading cost in basis points per unit of turnover")
+    parser.add_argument("--rank-by", choices=METRICS, default="sharpe")
+    parser.add_argument("--top", type=int, default=5, help="Settings shown per strategy")
+    parser.add_argument("-o", "--output", help="Write all results to this .csv or .json file")
+    args = parser.parse_args()
+
+    intervals = INTERVALS if args.interval == "all" else [args.interval]
+    rs_periods, mom_periods = parse_periods(args.rs), parse_periods(args.mom)
+    results = []
+    for interval in intervals:
+        t0 = time.perf_counter()
+        try:
+            result = run_backtest(interval, rs_periods, mom_periods, args.workers, args.cost_bps)
+        except RuntimeError as e:
+            print(f"[FAIL] {interval}: {e}")
+            continue
+        results.append(result)
+        first, last = result.attrs["period"]
+        print(f"[OK] {interval}: {len(rs_periods) * len(mom_periods)} settings x "
+              f"{len(STRATEGIES)} strategies in {time.perf_counter() - t0:.1f}s "
+              f"({first:%Y-%m-%d} .. {last:%Y-%m-%d})")
+        ascending = args.rank_by in ("volatility", "turnover")
+        for strategy, rows in result.groupby("strategy", sort=False):
+            best = rows.sort_values(args.rank_by, ascending=ascending).head(args.top)
+            for row in best.itertuples():
+                setting = "" if strategy == "benchmark" else f"{row.rs_period:>3}/{row.mom_period:<3}"
+                print(f"  {strategy:<10} {setting:<7} CAGR {row.cagr:7.2%}  Sharpe {row.sharpe:5.2f}  "
+                      f"MaxDD {row.max_drawdown:7.2%}  vs bench {row.excess_cagr:+7.2%}  "
+                      f"hit {row.hit_rate:6.2%}")
+
+    if args.output and results:
+        combined = pd.concat(results, ignore_index=True)
+        if args.output.endswith(".json"):
+            combined.to_json(args.output, orient="records", indent=1)
+        else:
+            combined.to_csv(args.output, index=False)
+        print(f"[OK] {len(combined)} rows -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
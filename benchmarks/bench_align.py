@@ -0,0 +1,91 @@
+"""
+Benchmark - aligning symbols on the benchmark's dates
+
+Compares, for N symbols x T daily rows with gaps:
+
+    intersect   per symbol: index.intersection(benchmark.index) + two .loc
+                lookups (how the app aligned every sector originally)
+    resample    one frame over the store arrays, resample("W-FRI") for weekly,
+                then a boolean mask on the benchmark (the previous store path)
+    calendar    MasterCalendar positions; "cold" includes building it, "warm"
+                reuses it as every load after the first one does
+
+Usage (from the repository root):
+    python -m benchmarks.bench_align
+    python -m benchmarks.bench_align --symbols 28,500,3000 --rows 5000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from rrg_engine import build_calendar, resample_rule
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+
+def synthetic_store(n_symbols: int, n_rows: int, seed: int = 0):
+    """Dates and a dates x (benchmark + symbols) close array, ~5% of bars missing."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2000-01-03", periods=n_rows, name="datetime") + pd.Timedelta(hours=2)
+    close = 100 + rng.random((n_rows, n_symbols + 1))
+    close[rng.random(close.shape) < 0.05] = np.nan
+    return dates, close
+
+
+def intersect(dates, close, interval):
+    bench = pd.Series(close[:, 0], index=dates).dropna()
+    if interval == "weekly":
+        bench = bench.resample("W-FRI").last().dropna()
+    out = {}
+    for col in range(1, close.shape[1]):
+        series = pd.Series(close[:, col], index=dates).dropna()
+        if interval == "weekly":
+            series = series.resample("W-FRI").last().dropna()
+        common = series.index.intersection(bench.index)
+        out[col] = (series.loc[common], bench.loc[common])
+    return out
+
+
+def resample(dates, close, interval):
+    frame = pd.DataFrame(close, index=dates, copy=False)
+    if interval == "weekly":
+        frame = frame.resample("W-FRI").last()
+    has_benchmark = frame[0].notna().to_numpy()
+    return frame[has_benchmark] if not has_benchmark.all() else frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Symbol alignment benchmark")
+    parser.add_argument("--symbols", default="28,500,3000", help="comma-separated symbol counts")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'symbols':>7} {'interval':<8} {'intersect ms':>13} {'resample ms':>12} "
+          f"{'cold ms':>8} {'warm ms':>8}")
+    for n_symbols in [int(n) for n in args.symbols.split(",")]:
+        dates, close = synthetic_store(n_symbols, args.rows)
+        for interval in ("daily", "weekly"):
+            repeat = 1 if n_symbols > 500 else args.repeat
+            t_intersect = _best(lambda: intersect(dates, close, interval), repeat)
+            t_resample = _best(lambda: resample(dates, close, interval), args.repeat)
+            rule = resample_rule(interval)
+            t_cold = _best(lambda: build_calendar(rule, dates, close[:, 0]).align(close), args.repeat)
+            cal = build_calendar(rule, dates, close[:, 0])
+            t_warm = _best(lambda: cal.align(close), args.repeat)
+            print(f"{n_symbols:>7} {interval:<8} {t_intersect:>13.1f} {t_resample:>12.1f} "
+                  f"{t_cold:>8.1f} {t_warm:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark - requests per second against a running RRG API (api.py)
+
+Each client process keeps one HTTP/1.1 connection open and sends requests
+back to back for ``--seconds``. Scenarios:
+
+    hot     the same query every time (served from the response cache)
+    304     the same query with If-None-Match (what polling clients send)
+    mixed   random rs/mom/tail/sector combinations from the slider ranges
+
+Usage (from the repository root):
+    python api.py --port 8000 --workers 2 &
+    python -m benchmarks.bench_api
+    python -m benchmarks.bench_api --url http://localhost:8000 --clients 16 --seconds 10
+"""
+
+import argparse
+import http.client
+import random
+import time
+from multiprocessing import Pool
+from urllib.parse import urlsplit
+
+SECTORS = ["AGRI", "BANK", "ETRON", "FOOD", "FIN", "ICT", "PETRO", "ENERG", "PROP", "TRANS"]
+
+
+def _query(scenario: str, rng: random.Random) -> str:
+    if scenario != "mixed":
+        return "/rrg?interval=daily&rs=10&mom=10&tail=10"
+    sectors = ",".join(rng.sample(SECTORS, rng.randint(1, len(SECTORS))))
+    return (f"/rrg?interval={rng.choice(['weekly', 'daily', '1h'])}"
+            f"&rs={rng.randint(5, 50)}&mom={rng.randint(5, 50)}"
+            f"&tail={rng.randint(2, 50)}&sectors={sectors}")
+
+
+def _client(args):
+    url, scenario, seconds, seed = args
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    rng = random.Random(seed)
+    headers = {"Accept-Encoding": "gzip"}
+    if scenario == "304":
+        conn.request("GET", _query(scenario, rng), headers=headers)
+        resp = conn.getresponse()
+        resp.read()
+        headers["If-None-Match"] = resp.getheader("ETag")
+
+    count, errors, latencies = 0, 0, []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        conn.request("GET", _query(scenario, rng), headers=headers)
+        resp = conn.getresponse()
+        resp.read()
+        latencies.append(time.perf_counter() - t0)
+        count += 1
+        if resp.status not in (200, 304):
+            errors += 1
+    conn.close()
+    return count, errors, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RRG API throughput benchmark")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--scenario", choices=["hot", "304", "mixed", "all"], default="all")
+    args = parser.parse_args()
+
+    scenarios = ["hot", "304", "mixed"] if args.scenario == "all" else [args.scenario]
+    print(f"{args.url}: {args.clients} clients x {args.seconds:.0f}s")
+    print(f"{'scenario':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    with Pool(args.clients) as pool:
+        for scenario in scenarios:
+            jobs = [(args.url, scenario, args.seconds, seed) for seed in range(args.clients)]
+            results = pool.map(_client, jobs)
+            total = sum(r[0] for r in results)
+            errors = sum(r[1] for r in results)
+            latencies = sorted(lat for r in results for lat in r[2])
+            p50 = latencies[len(latencies) // 2] * 1e3
+            p95 = latencies[int(len(latencies) * 0.95)] * 1e3
+            print(f"{scenario:<8} {total / args.seconds:>8.0f} {p50:>8.2f} {p95:>8.2f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark - wall-clock time of the full 29-symbol x 2-interval fetch job
+
+Compares the old sequential loop (2 s between symbols, 20 s between retries)
+with ConcurrentFetcher, both against FakeTvDatafeed. All latencies and sleeps
+are multiplied by --scale so the run is quick; times are reported both as
+measured and projected back to real-world seconds.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_fetch
+    python -m benchmarks.bench_fetch --concurrency 8 --rate 2 --failure-rate 0.2
+"""
+
+import argparse
+import time
+from functools import partial
+
+from tvDatafeed import Interval
+
+from auto_fetch_data import INTERVAL_MAP, SECTORS
+from benchmarks.fake_tvdatafeed import FakeTvDatafeed
+from fetch_pipeline import ConcurrentFetcher, FetchJob, RateLimiter
+
+
+def _jobs():
+    return [FetchJob(symbol, INTERVAL_MAP[int_type]["interval"], 50, tag=int_type)
+            for int_type in ["1h", "daily"] for symbol in SECTORS]
+
+
+def run_sequential(client, scale, max_retries=3):
+    """The pre-pipeline loop: fixed 20 s retry wait and 2 s pause after every symbol."""
+    ok = 0
+    for job in _jobs():
+        for attempt in range(max_retries):
+            try:
+                data = client.get_hist(symbol=job.symbol, exchange="SET",
+                                       interval=job.interval, n_bars=job.n_bars)
+                if data is not None and not data.empty:
+                    ok += 1
+                    break
+            except Exception:
+                pass
+            if attempt < max_retries - 1:
+                time.sleep(20 * scale)
+        time.sleep(2 * scale)
+    return ok
+
+
+def run_concurrent(factory, scale, concurrency, rate):
+    fetcher = ConcurrentFetcher(factory, concurrency=concurrency,
+                                limiter=RateLimiter(rate / scale),
+                                backoff=2.0 * scale, max_backoff=30.0 * scale)
+    return sum(result.data is not None for result in fetcher.fetch_all(_jobs()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential vs concurrent fetch benchmark")
+    parser.add_argument("--scale", type=float, default=0.05,
+                        help="Multiplier applied to every latency and sleep (default: 0.05)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=1.0, help="Requests per second (real-world)")
+    parser.add_argument("--latency", type=float, nargs=2, default=[0.3, 0.8],
+                        metavar=("MIN", "MAX"), help="Fake request latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    latency = (args.latency[0] * args.scale, args.latency[1] * args.scale)
+    factory = partial(FakeTvDatafeed, latency=latency, failure_rate=args.failure_rate)
+    n_jobs = len(_jobs())
+
+    # Warm the fake's data cache so it is not timed
+    FakeTvDatafeed(latency=(0, 0), failure_rate=0).get_hist("SET", interval=Interval.in_1_hour)
+    FakeTvDatafeed(latency=(0, 0), failure_rate=0).get_hist("SET", interval=Interval.in_daily)
+
+    print(f"{n_jobs} jobs, latency {args.latency[0]}-{args.latency[1]} s, "
+          f"failure rate {args.failure_rate:.0%}, scale {args.scale}")
+    print(f"{'mode':<26} {'ok':>4} {'measured s':>11} {'projected s':>12}")
+
+    t0 = time.perf_counter()
+    ok = run_sequential(factory(seed=args.seed), args.scale)
+    seq = time.perf_counter() - t0
+    print(f"{'sequential (old loop)':<26} {ok:>4} {seq:11.2f} {seq / args.scale:12.1f}")
+
+    t0 = time.perf_counter()
+    ok = run_concurrent(factory, args.scale, args.concurrency, args.rate)
+    conc = time.perf_counter() - t0
+    label = f"concurrent x{args.concurrency} @{args.rate:g}/s"
+    print(f"{label:<26} {ok:>4} {conc:11.2f} {conc / args.scale:12.1f}")
+    print(f"speedup {seq / conc:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark - memory of K serving processes: mapped vs private price panels
+
+Each worker loads the price panels of every interval, touches all of their
+pages and serves a few grid lookups, like an app or API replica answering
+its first requests. All workers are measured while alive together, from
+/proc/self/smaps_rollup:
+
+    Rss      pages the process has mapped (shared pages counted in full)
+    Pss      shared pages divided by the number of processes mapping them
+    Private  pages only this process uses
+
+Modes:
+    mapped   the panels written into the snapshot at publish (rrg_engine.write_panels)
+    private  each process builds its own panel from the store, as before
+
+Usage (from the repository root, Linux only):
+    python -m benchmarks.bench_memory
+    python -m benchmarks.bench_memory --workers 1,2,4,8
+    python -m benchmarks.bench_memory --symbols 500 --rows 5000   # synthetic data
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import rrg_engine
+import rrg_grid
+from data_store import SnapshotWriter, current_snapshot, snapshots_dir
+
+FIELDS = ("Rss", "Pss", "Private_Clean", "Private_Dirty")
+LOOKUPS = [(10, 10), (14, 14), (21, 8), (50, 50)]
+
+
+def _smaps() -> dict:
+    """Rss, Pss and Private of this process in MB."""
+    values = {}
+    with open("/proc/self/smaps_rollup", encoding="utf-8") as fh:
+        for line in fh:
+            name, _, rest = line.partition(":")
+            if name in FIELDS:
+                values[name] = int(rest.split()[0]) / 1024
+    return {"rss": values["Rss"], "pss": values["Pss"],
+            "private": values["Private_Clean"] + values["Private_Dirty"]}
+
+
+def _load(mode: str, interval: str):
+    if mode == "mapped":
+        panel, error = rrg_engine.load_price_panel(interval)
+    else:
+        kind, path, fingerprint = rrg_engine._panel_source(interval)
+        panel, error = rrg_engine._read_store_panel(interval, path, fingerprint)
+        if panel is not None:
+            panel = rrg_engine.PricePanel(panel.benchmark.copy(), panel.closes.copy(), fingerprint)
+    if panel is None:
+        raise SystemExit(error)
+    return panel
+
+
+def _worker(base_dir, mode, intervals, start, done, results):
+    rrg_engine.BASE_DIR = base_dir
+    data_dir = os.path.join(base_dir, "data")
+    start.wait()
+    before = _smaps()
+
+    panels = [_load(mode, interval) for interval in intervals]
+    checksum = sum(float(np.nansum(p.closes.to_numpy())) for p in panels)
+    for interval in intervals:
+        for rs, mom in LOOKUPS:
+            tails = rrg_grid.lookup_tails(interval, rs, mom, data_dir)
+            if tails is not None:
+                checksum += float(np.nansum(tails.rs_ratio))
+
+    done.wait()                        # every worker holds its panels now
+    after = _smaps()
+    results.put({k: after[k] - before[k] for k in after})
+    done.wait()                        # keep them alive until all have measured
+    return checksum
+
+
+def measure(base_dir: str, mode: str, workers: int, intervals) -> dict:
+    """Total and per-process MB added by ``workers`` processes serving ``intervals``."""
+    ctx = mp.get_context("spawn")      # fresh interpreters, nothing inherited from this one
+    start, done, results = ctx.Barrier(workers), ctx.Barrier(workers), ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(base_dir, mode, intervals, start, done, results))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    deltas = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return {k: sum(d[k] for d in deltas) for k in deltas[0]}
+
+
+def synthetic_data(root: str, n_symbols: int, n_rows: int) -> None:
+    """Publish a random daily snapshot (and so its panels) under ``root``/data."""
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2000-01-03", periods=n_rows, name="datetime")
+    data_dir = os.path.join(root, "data")
+    frames = {}
+    for symbol in ["SET"] + [f"S{i:04d}" for i in range(n_symbols)]:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_rows)))
+        frames[symbol] = pd.DataFrame({"symbol": f"SET:{symbol}", "open": close, "high": close,
+                                       "low": close, "close": close, "volume": 1.0}, index=dates)
+    writer = SnapshotWriter(data_dir=data_dir)
+    writer.replace("daily", frames)
+    writer.publish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mapped vs private panel memory benchmark")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma-separated process counts")
+    parser.add_argument("--symbols", type=int, help="synthetic sectors (default: real data)")
+    parser.add_argument("--rows", type=int, default=5000, help="synthetic daily bars")
+    args = parser.parse_args()
+
+    tmp_root = None
+    if args.symbols:
+        tmp_root = tempfile.mkdtemp(prefix="rrg-bench-")
+        synthetic_data(tmp_root, args.symbols, args.rows)
+        base_dir, intervals = tmp_root, ["weekly", "daily"]
+        print(f"synthetic: {args.symbols} sectors x {args.rows} daily bars")
+    else:
+        base_dir, intervals = rrg_engine.BASE_DIR, ["weekly", "daily", "1h"]
+        data_dir = os.path.join(base_dir, "data")
+        snapshot_id = current_snapshot(data_dir)
+        if snapshot_id is None:
+            raise SystemExit("No store snapshot - run: python data_store.py migrate")
+        if not os.path.isdir(rrg_engine.panel_dir(os.path.join(snapshots_dir(data_dir), snapshot_id),
+                                                  "daily")):
+            raise SystemExit("Snapshot has no panels - publish a new one: python data_store.py migrate")
+
+    try:
+        print(f"{'workers':>7} {'mode':<8} {'RSS MB':>8} {'PSS MB':>8} {'private MB':>11}")
+        for workers in [int(w) for w in args.workers.split(",")]:
+            for mode in ("private", "mapped"):
+                total = measure(base_dir, mode, workers, intervals)
+                print(f"{workers:>7} {mode:<8} {total['rss']:>8.1f} {total['pss']:>8.1f} "
+                      f"{total['private']:>11.1f}")
+    finally:
+        if tmp_root:
+            shutil.rmtree(tmp_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Benchmark - every stage of the load -> compute -> render pipeline, outside Streamlit
+
+Stages (each timed on its own; best of --repeat, then one more run under
+tracemalloc for the Python heap peak):
+
+    load_csv            rrg_engine.load_csv on every CSV of the folder
+    panel_csv           the whole price panel from the CSVs (_read_panel)
+    panel_store         the price panel from the columnar store snapshot
+    compute_rrg         per-sector compute_rrg loop (the original path)
+    compute_rrg_panel   all sectors in one vectorized pass
+    load_all_sectors    what the app's cached loader runs on a miss
+                        (rrg_grid.load_tails: grid lookup, else computed)
+    build_figure        the chart of every sector, tail 10
+    to_json             Plotly JSON as sent to the browser (size reported)
+
+Datasets: the bundled data/daily and data/1h sets (from the current
+snapshot), and synthetic universes of N random-walk symbols x --rows daily
+bars published to a temporary store (no CSV stages). Results are printed
+and written as JSON together with the commit and library versions;
+``--compare`` prints the ratio to an earlier results file.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --symbols 100,1000,5000 --rows 5000 --repeat 3
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/<old commit>.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.io as pio
+
+import rrg_engine
+from data_store import SnapshotWriter, current_snapshot, snapshots_dir
+from rrg_engine import (BENCHMARK, compute_rrg, compute_rrg_panel, compute_sector_tails,
+                        load_csv, load_snapshot_panel)
+from rrg_figure import build_figure
+from rrg_grid import load_tails
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+PERIODS = (10, 10)
+TAIL = 10
+LEGEND_MAX_SECTORS = 10         # as in app.py: larger selections are drawn batched
+
+
+def _measure(fn, repeat: int) -> dict:
+    """Best wall time over ``repeat`` runs and the Python heap peak of one more run."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": best, "peak_mb": peak / 2**20, "result": result}
+
+
+def _per_sector(panel):
+    """The original loop: one compute_rrg per sector on its own dates."""
+    out = {}
+    for name in panel.closes.columns:
+        sector = panel.closes[name].dropna()
+        out[name] = compute_rrg(sector, panel.benchmark.loc[sector.index], *PERIODS)
+    return out
+
+
+def run_stages(dataset: str, interval: str, snapshot_dir: str, repeat: int,
+               csv_dir: str | None = None, grid: bool = False) -> list[dict]:
+    """Time every stage on one dataset. Returns one result dict per stage."""
+    stages = []
+    if csv_dir:
+        files = sorted(glob.glob(os.path.join(csv_dir, "*.csv")))
+        stages.append(("load_csv", lambda: [load_csv(f, interval) for f in files]))
+        stages.append(("panel_csv", lambda: rrg_engine._read_panel(interval, csv_dir, ())))
+    stages.append(("panel_store", lambda: load_snapshot_panel(interval, snapshot_dir)))
+
+    panel, error = load_snapshot_panel(interval, snapshot_dir)
+    if panel is None:
+        raise SystemExit(error)
+    tails, error = compute_sector_tails(panel, *PERIODS)
+    if tails is None:
+        raise SystemExit(error)
+    selected = sorted(tails.symbols)
+    batched = len(selected) > LEGEND_MAX_SECTORS
+    fig = build_figure(tails, selected, TAIL, interval, batched)
+
+    stages += [
+        ("compute_rrg", lambda: _per_sector(panel)),
+        ("compute_rrg_panel", lambda: compute_rrg_panel(panel, *PERIODS)),
+        ("load_all_sectors", (lambda: load_tails(interval, *PERIODS)) if grid
+         else (lambda: compute_sector_tails(panel, *PERIODS))),
+        ("build_figure", lambda: build_figure(tails, selected, TAIL, interval, batched)),
+        ("to_json", lambda: pio.to_json(fig, validate=False)),
+    ]
+    results = []
+    for stage, fn in stages:
+        # The per-sector loop is slow at scale; once is enough to see it
+        m = _measure(fn, 1 if stage == "compute_rrg" and len(selected) > 1000 else repeat)
+        row = {"dataset": dataset, "interval": interval, "stage": stage,
+               "symbols": len(panel.closes.columns), "rows": len(panel.closes),
+               "seconds": m["seconds"], "peak_mb": m["peak_mb"]}
+        if stage == "to_json":
+            row["json_bytes"] = len(m["result"])
+        results.append(row)
+        print(_format(row))
+    return results
+
+
+def synthetic_snapshot(root: str, n_symbols: int, n_rows: int, seed: int = 0) -> str:
+    """Publish N random-walk symbols plus the benchmark under ``root``. Returns the snapshot dir."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2000-01-03", periods=n_rows, name="datetime")
+    frames = {}
+    for symbol in [BENCHMARK] + [f"S{i:05d}" for i in range(n_symbols)]:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.012, n_rows)))
+        frames[symbol] = pd.DataFrame({"symbol": f"SET:{symbol}", "open": close, "high": close,
+                                       "low": close, "close": close, "volume": 1.0}, index=dates)
+    writer = SnapshotWriter(data_dir=root)
+    writer.replace("daily", frames)
+    return os.path.join(snapshots_dir(root), writer.publish())
+
+
+def _format(row: dict) -> str:
+    size = f"{row['json_bytes'] / 1024:>9.1f}" if "json_bytes" in row else f"{'':>9}"
+    return (f"{row['dataset']:<16} {row['stage']:<18} {row['seconds'] * 1e3:>10.2f} "
+            f"{row['peak_mb']:>9.2f} {size}")
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {"commit": commit, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(), "numpy": np.__version__,
+            "pandas": pd.__version__, "plotly": plotly.__version__,
+            "machine": platform.machine(), "cpus": os.cpu_count()}
+
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    """Print each stage's time against the same stage in ``baseline_path``."""
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    before = {(r["dataset"], r["stage"]): r for r in baseline["results"]}
+    print(f"\nvs {baseline['env']['commit']} ({baseline_path})")
+    print(f"{'dataset':<16} {'stage':<18} {'before ms':>10} {'now ms':>10} {'ratio':>7}")
+    for row in results:
+        old = before.get((row["dataset"], row["stage"]))
+        if old is None:
+            continue
+        ratio = row["seconds"] / old["seconds"] if old["seconds"] else float("nan")
+        flag = "  slower" if ratio > 1.2 else ""
+        print(f"{row['dataset']:<16} {row['stage']:<18} {old['seconds'] * 1e3:>10.2f} "
+              f"{row['seconds'] * 1e3:>10.2f} {ratio:>6.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load -> compute -> render pipeline benchmark")
+    parser.add_argument("--symbols", default="100,1000,5000",
+                        help="comma-separated synthetic universe sizes (empty: none)")
+    parser.add_argument("--rows", type=int, default=5000, help="synthetic daily bars")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", help="results file (default: results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    env = _environment()
+    print(f"commit {env['commit']}, best of {args.repeat}")
+    print(f"{'dataset':<16} {'stage':<18} {'best ms':>10} {'peak MB':>9} {'JSON KB':>9}")
+
+    results = []
+    data_dir = os.path.join(rrg_engine.BASE_DIR, "data")
+    snapshot_id = current_snapshot(data_dir)
+    if snapshot_id is None:
+        raise SystemExit("No store snapshot - run: python data_store.py migrate")
+    for interval in ("daily", "1h"):
+        results += run_stages(interval, interval, os.path.join(snapshots_dir(data_dir), snapshot_id),
+                              args.repeat, csv_dir=rrg_engine.data_dir_for(interval), grid=True)
+
+    for n_symbols in [int(n) for n in args.symbols.split(",") if n]:
+        root = tempfile.mkdtemp(prefix="rrg-pipeline-")
+        try:
+            snapshot_dir = synthetic_snapshot(root, n_symbols, args.rows)
+            results += run_stages(f"synthetic-{n_symbols}", "daily", snapshot_dir, args.repeat)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{env['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump({"env": env, "args": vars(args), "results": results}, fh, indent=1)
+    print(f"[OK] {len(results)} results -> {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
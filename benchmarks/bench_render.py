@@ -0,0 +1,73 @@
+"""
+Benchmark - per-sector vs batched Plotly figure construction
+
+Measures build_figure time, JSON serialization time (what st.plotly_chart
+sends to the browser) and payload size for both rendering modes. "cold"
+rebuilds the figure skeleton (quadrants, labels, centre lines) every time,
+as every render did before the skeleton cache; "warm" reuses it.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_render
+    python -m benchmarks.bench_render --interval 1h --repeat 50
+"""
+
+import argparse
+import time
+
+import plotly.io as pio
+
+from rrg_engine import compute_sector_tails, load_price_panel
+from rrg_figure import build_figure, skeleton_layout
+
+CASES = [
+    ("default 7 sectors, tail 10", 7, 10),
+    ("all sectors, tail 20", None, 20),
+    ("all sectors, tail 50", None, 50),
+]
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-sector vs batched figure benchmark")
+    parser.add_argument("--interval", default="daily", choices=["weekly", "daily", "1h"])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    panel, error = load_price_panel(args.interval)
+    if panel is None:
+        raise SystemExit(error)
+    tails, error = compute_sector_tails(panel, 10, 10)
+    if tails is None:
+        raise SystemExit(error)
+
+    print(f"{args.interval}: {len(tails)} sectors, best of {args.repeat}")
+    print(f"{'case':<28} {'mode':<11} {'traces':>6} {'cold ms':>8} {'warm ms':>8} "
+          f"{'json ms':>8} {'KB':>7}")
+    for label, n, tail_length in CASES:
+        selected = sorted(tails.symbols)[:n]
+        for batched in (False, True):
+            def build():
+                return build_figure(tails, selected, tail_length, args.interval, batched)
+
+            def build_cold():
+                skeleton_layout.cache_clear()
+                return build()
+
+            cold_s, _ = _best(build_cold, args.repeat)
+            warm_s, fig = _best(build, args.repeat)
+            json_s, payload = _best(lambda: pio.to_json(fig, validate=False), args.repeat)
+            mode = "batched" if batched else "per-sector"
+            print(f"{label:<28} {mode:<11} {len(fig.data):>6} {cold_s * 1e3:>8.2f} "
+                  f"{warm_s * 1e3:>8.2f} {json_s * 1e3:>8.2f} {len(payload) / 1024:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
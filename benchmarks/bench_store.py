@@ -0,0 +1,67 @@
+"""
+Benchmark - cold panel load from CSV vs the columnar store
+
+Usage (from the repository root):
+    python data_store.py migrate          # publish a store snapshot first
+    python -m benchmarks.bench_store
+    python -m benchmarks.bench_store --repeat 10
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+import rrg_engine
+from data_store import current_store_dir, store_fingerprint
+
+
+def _measure(load, repeat):
+    """Best wall time over ``repeat`` cold loads and the Python heap peak of one load."""
+    times = []
+    for _ in range(repeat):
+        rrg_engine.clear_calendars()
+        t0 = time.perf_counter()
+        panel, error = load()
+        times.append(time.perf_counter() - t0)
+        if panel is None:
+            raise SystemExit(error)
+
+    rrg_engine.clear_calendars()
+    tracemalloc.start()
+    load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV vs columnar store load benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data_root = os.path.join(rrg_engine.BASE_DIR, "data")
+    print(f"{'interval':<8} {'source':<6} {'best ms':>9} {'peak MB':>9}")
+    for interval in ["weekly", "daily", "1h"]:
+        store_dir = current_store_dir(rrg_engine.subdir_for(interval), data_root)
+        if store_dir is None:
+            raise SystemExit("No store snapshot - run: python data_store.py migrate")
+
+        # The loaders behind load_price_panel, with the fingerprints it would pass
+        csv_dir = rrg_engine.data_dir_for(interval)
+        csv_key = rrg_engine.csv_fingerprint(csv_dir)
+        store_key = ("store", store_fingerprint(store_dir))
+        sources = {
+            "csv": lambda: rrg_engine._read_panel(interval, csv_dir, csv_key),
+            "store": lambda: rrg_engine._read_store_panel(interval, store_dir, store_key),
+        }
+        results = {}
+        for name, load in sources.items():
+            best, peak = _measure(load, args.repeat)
+            results[name] = best
+            print(f"{interval:<8} {name:<6} {best * 1000:9.1f} {peak / 2**20:9.2f}")
+        print(f"{interval:<8} speedup {results['csv'] / results['store']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark - chunked RRG over a synthetic single-stock universe
+
+Publishes random daily bars for N symbols x T dates as a universe in a
+temporary data folder, then times ``compute_universe_tails`` (all symbols,
+tails only) for several chunk sizes together with the peak of memory
+allocated while computing, and the top-N / quadrant filter.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_universe
+    python -m benchmarks.bench_universe --symbols 500,1000,3000 --rows 5000 --chunks 64,256,1024
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from universe import compute_universe_tails, filter_tails, import_universe, list_universes
+
+
+def synthetic_frames(n_symbols: int, n_rows: int, seed: int = 0) -> dict[str, pd.DataFrame]:
+    """Random walks in fetcher format; every 10th symbol lists late (shorter history)."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2000-01-03", periods=n_rows, name="datetime")
+    frames = {}
+    for i, symbol in enumerate(["BENCH"] + [f"S{i:05d}" for i in range(n_symbols)]):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, n_rows)))
+        start = rng.integers(0, n_rows // 2) if i % 10 == 9 else 0
+        frames[symbol] = pd.DataFrame({"symbol": f"X:{symbol}", "open": close, "high": close,
+                                       "low": close, "close": close, "volume": 1.0},
+                                      index=dates).iloc[start:]
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunked universe RRG benchmark")
+    parser.add_argument("--symbols", default="500,1000,3000", help="comma-separated universe sizes")
+    parser.add_argument("--rows", type=int, default=5000, help="daily bars per symbol")
+    parser.add_argument("--chunks", default="64,256,1024", help="comma-separated chunk sizes")
+    parser.add_argument("--interval", default="daily", choices=["weekly", "daily"])
+    args = parser.parse_args()
+
+    print(f"{'symbols':>7} {'chunk':>6} {'compute s':>10} {'peak MB':>8} {'filter ms':>10}")
+    for n_symbols in [int(n) for n in args.symbols.split(",")]:
+        data_dir = tempfile.mkdtemp(prefix="rrg-universe-")
+        try:
+            import_universe("bench", "BENCH", synthetic_frames(n_symbols, args.rows),
+                            data_dir=data_dir)
+            universe = list_universes(data_dir)["bench"]
+            for chunk in [int(c) for c in args.chunks.split(",")]:
+                tracemalloc.start()
+                t0 = time.perf_counter()
+                tails, error = compute_universe_tails(universe, args.interval, 10, 10,
+                                                      chunk_size=chunk, data_dir=data_dir)
+                seconds = time.perf_counter() - t0
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                if tails is None:
+                    raise SystemExit(error)
+
+                t0 = time.perf_counter()
+                filter_tails(tails, 20, ["leading", "improving"])
+                filter_ms = (time.perf_counter() - t0) * 1e3
+                print(f"{n_symbols:>7} {chunk:>6} {seconds:>10.2f} {peak / 2**20:>8.1f} "
+                      f"{filter_ms:>10.2f}")
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
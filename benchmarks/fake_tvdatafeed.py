@@ -0,0 +1,44 @@
+"""
+Local stand-in for tvDatafeed.TvDatafeed
+
+Serves bars from the bundled data (store or CSV) with injected latency and
+random failures, so the fetch pipeline can be exercised without TradingView.
+"""
+
+import random
+import time
+
+import pandas as pd
+from tvDatafeed import Interval
+
+from data_store import DATA_DIR, load_frames
+
+_frames: dict[str, dict[str, pd.DataFrame]] = {}
+
+
+def _bars(subdir: str, symbol: str) -> pd.DataFrame:
+    if subdir not in _frames:
+        _frames[subdir] = load_frames(subdir, DATA_DIR)
+    return _frames[subdir][symbol]
+
+
+class FakeTvDatafeed:
+    """``get_hist`` sleeps ``latency`` seconds (uniform range) and raises with ``failure_rate``."""
+
+    def __init__(self, latency=(0.3, 0.8), failure_rate=0.1, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+
+    def get_hist(self, symbol, exchange="SET", interval=Interval.in_daily, n_bars=10,
+                 fut_contract=None, extended_session=False):
+        time.sleep(self._rng.uniform(*self.latency))
+        if self._rng.random() < self.failure_rate:
+            raise ConnectionError(f"fake connection dropped for {exchange}:{symbol}")
+
+        subdir = "1h" if interval == Interval.in_1_hour else "daily"
+        data = _bars(subdir, symbol).iloc[-n_bars:].copy()
+        if subdir == "1h":
+            # Stored 1h bars are shifted to Thai time; TradingView returns them unshifted
+            data.index = data.index - pd.Timedelta(hours=7)
+        return data
@@ -0,0 +1,480 @@
+"""
+Columnar data store - one memory-mapped NumPy array per field and interval
+
+Replaces per-symbol CSV parsing on the read path. Every interval folder holds
+the bars of all symbols aligned on one sorted calendar:
+
+    data/store/
+        CURRENT                          id of the published snapshot
+        snapshots/<id>/manifest.json     snapshot id, time and intervals
+        snapshots/<id>/<interval>/
+            dates.npy                    int64 nanoseconds since epoch
+            open.npy ... volume.npy      float64, dates x symbols (NaN = no bar)
+            meta.json                    symbols (benchmark first), tickers and
+                                         a fingerprint of the interval's content
+        snapshots/<id>/weekly/, monthly/ derived from daily (same layout)
+        snapshots/<id>/panels/<interval>/ close prices per interval, ready to
+                                         map (rrg_engine.write_panels)
+
+Writers build a complete snapshot in a staging folder and publish it by
+atomically replacing CURRENT, so readers always see one consistent set of
+bars across all symbols. Snapshots are never modified after publishing.
+
+The app opens the arrays with ``mmap_mode="r"`` so nothing is parsed or
+copied on load. CSV stays available as an export format.
+
+Derived intervals (weekly W-FRI and monthly bars, plus any custom anchor
+added with ``derive``) are resampled from daily once, when a snapshot is
+published, and rebuilt only when the daily bars changed.
+
+Usage:
+    python data_store.py migrate                 # CSV -> new snapshot (daily and 1h)
+    python data_store.py migrate --interval 1h   # one interval only
+    python data_store.py export                  # current snapshot -> CSV
+    python data_store.py status                  # show the current snapshot
+    python data_store.py derive --name W-THU --rule W-THU   # extra weekly anchor
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+STORE_DIRNAME = "store"
+INTERVALS = ["daily", "1h"]
+
+FIELDS = ["open", "high", "low", "close", "volume"]
+META_FILE = "meta.json"
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+KEEP_SNAPSHOTS = 3
+
+# Derived from daily at every publish: name -> end-anchored pandas resample rule
+DERIVED = {"weekly": "W-FRI", "monthly": "ME"}
+UNIVERSE_PREFIX = "universe-"       # universe.py folders (own symbols and benchmark)
+AGGREGATES = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+BENCHMARK = "SET"
+EXCHANGE = "SET"
+
+
+def store_root(data_dir: str = DATA_DIR) -> str:
+    return os.path.join(data_dir, STORE_DIRNAME)
+
+
+def snapshots_dir(data_dir: str = DATA_DIR) -> str:
+    return os.path.join(store_root(data_dir), "snapshots")
+
+
+def current_snapshot(data_dir: str = DATA_DIR) -> str | None:
+    """Id of the published snapshot, or None if nothing was published yet."""
+    try:
+        with open(os.path.join(store_root(data_dir), CURRENT_FILE), encoding="utf-8") as fh:
+            snapshot_id = fh.read().strip()
+    except FileNotFoundError:
+        return None
+    return snapshot_id or None
+
+
+def current_store_dir(subdir: str, data_dir: str = DATA_DIR) -> str | None:
+    """Store folder of ``subdir`` in the current snapshot, or None."""
+    snapshot_id = current_snapshot(data_dir)
+    if snapshot_id is None:
+        return None
+    store_dir = os.path.join(snapshots_dir(data_dir), snapshot_id, subdir)
+    return store_dir if has_store(store_dir) else None
+
+
+# ---------------------------------------------------------------------------
+# Write
+# ---------------------------------------------------------------------------
+
+def _ordered_symbols(symbols) -> list[str]:
+    """Benchmark first, then the rest sorted - keeps sector columns a contiguous slice."""
+    rest = sorted(s for s in symbols if s != BENCHMARK)
+    return ([BENCHMARK] if BENCHMARK in symbols else []) + rest
+
+
+def _clean(frame: pd.DataFrame) -> pd.DataFrame:
+    frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+    frame.index = pd.DatetimeIndex(frame.index).as_unit("ns")
+    return frame
+
+
+def write_store(frames: dict[str, pd.DataFrame], store_dir: str) -> None:
+    """Write fetcher-format frames (datetime index, symbol + OHLCV columns) to ``store_dir``."""
+    symbols = _ordered_symbols(frames)
+    frames = {s: _clean(frames[s]) for s in symbols}
+    dates = pd.DatetimeIndex(np.unique(np.concatenate([f.index.asi8 for f in frames.values()])))
+
+    arrays = {f: np.full((len(dates), len(symbols)), np.nan) for f in FIELDS}
+    for col, symbol in enumerate(symbols):
+        frame = frames[symbol]
+        pos = dates.get_indexer(frame.index)
+        for f in FIELDS:
+            arrays[f][pos, col] = frame[f].to_numpy(dtype=np.float64)
+
+    tickers = []
+    for symbol in symbols:
+        ticker = frames[symbol]["symbol"].iloc[-1] if "symbol" in frames[symbol] else None
+        tickers.append(ticker if isinstance(ticker, str) else f"{EXCHANGE}:{symbol}")
+
+    # Content hash: identical bars give an identical fingerprint across snapshots
+    digest = hashlib.sha1(json.dumps([symbols, tickers]).encode("utf-8"))
+    digest.update(dates.asi8.tobytes())
+    for f in FIELDS:
+        digest.update(arrays[f].tobytes())
+    _write_arrays(store_dir, dates, symbols, tickers, arrays, digest.hexdigest()[:16])
+
+
+def _write_arrays(store_dir: str, dates: pd.DatetimeIndex, symbols: list[str], tickers: list[str],
+                  arrays: dict[str, np.ndarray], fingerprint: str, **extra) -> None:
+    os.makedirs(store_dir, exist_ok=True)
+    save_npy(os.path.join(store_dir, "dates.npy"), dates.asi8)
+    for f in FIELDS:
+        save_npy(os.path.join(store_dir, f"{f}.npy"), arrays[f])
+    meta = {"symbols": symbols, "tickers": tickers, "rows": len(dates),
+            "fingerprint": fingerprint, **extra}
+    save_json(os.path.join(store_dir, META_FILE), meta)
+
+
+def resample_offset(rule: str):
+    """Offset of an end-anchored resample rule (W-FRI, ME, QE, ...); ValueError otherwise."""
+    offset = pd.tseries.frequencies.to_offset(rule)
+    if not isinstance(offset, (pd.offsets.Week, pd.offsets.MonthEnd,
+                               pd.offsets.QuarterEnd, pd.offsets.YearEnd)):
+        raise ValueError(f"Resample rule must be end-anchored (W-FRI, ME, QE, YE): {rule}")
+    return offset
+
+
+def derive_store(source_dir: str, store_dir: str, rule: str) -> None:
+    """Write ``source_dir`` resampled with ``rule`` (OHLCV aggregates) to ``store_dir``."""
+    resample_offset(rule)
+    data = read_store(source_dir, fields=FIELDS)
+    arrays = {}
+    for f in FIELDS:
+        bins = pd.DataFrame(data.arrays[f], index=data.dates, copy=False).resample(rule)
+        frame = bins.sum(min_count=1) if f == "volume" else getattr(bins, AGGREGATES[f])()
+        arrays[f] = frame.to_numpy()
+    dates = frame.index
+    has_bar = ~np.isnan(arrays["close"]).all(axis=1)
+    if not has_bar.all():
+        dates = dates[has_bar]
+        arrays = {f: a[has_bar] for f, a in arrays.items()}
+
+    source = read_meta(source_dir)
+    # Derived content depends only on the source content and the rule
+    fingerprint = hashlib.sha1(json.dumps([source["fingerprint"], rule]).encode("utf-8"))
+    _write_arrays(store_dir, dates, data.symbols, data.tickers, arrays,
+                  fingerprint.hexdigest()[:16], source=os.path.basename(source_dir), rule=rule,
+                  source_fingerprint=source["fingerprint"])
+
+
+def save_npy(path: str, array: np.ndarray) -> None:
+    """Write ``array`` to ``path`` atomically (readers never see a partial file)."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        np.save(fh, array)
+    os.replace(tmp, path)
+
+
+def save_json(path: str, obj) -> None:
+    """Write ``obj`` as JSON to ``path`` atomically."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(obj, fh, indent=1)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# Snapshots
+# ---------------------------------------------------------------------------
+
+class SnapshotWriter:
+    """Build the next snapshot in a staging folder, then publish it atomically.
+
+    Intervals that are not updated are carried over from the current
+    snapshot (hard-linked, since published files are never modified).
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR):
+        self.data_dir = data_dir
+        self.base_id = current_snapshot(data_dir)
+        self.snapshot_id = f"{datetime.now():%Y%m%d-%H%M%S-%f}"   # sorts by creation time
+        self.staging_dir = os.path.join(snapshots_dir(data_dir), f".staging-{self.snapshot_id}")
+        os.makedirs(self.staging_dir)
+        self.updated: list[str] = []
+
+        if self.base_id is not None:
+            base_dir = os.path.join(snapshots_dir(data_dir), self.base_id)
+            for subdir in sorted(os.listdir(base_dir)):
+                if has_store(os.path.join(base_dir, subdir)):
+                    link_tree(os.path.join(base_dir, subdir), os.path.join(self.staging_dir, subdir))
+
+    def base_frames(self, subdir: str) -> dict[str, pd.DataFrame]:
+        """Symbols of ``subdir`` as staged so far (carried over or already updated)."""
+        store_dir = os.path.join(self.staging_dir, subdir)
+        if not has_store(store_dir):
+            return {}
+        data = read_store(store_dir, fields=FIELDS)
+        return {symbol: store_frame(data, symbol) for symbol in data.symbols}
+
+    def update(self, subdir: str, frames: dict[str, pd.DataFrame]) -> None:
+        """Replace the symbols in ``frames``; every other staged symbol is kept."""
+        merged = self.base_frames(subdir)
+        merged.update(frames)
+        self.replace(subdir, merged)
+
+    def replace(self, subdir: str, frames: dict[str, pd.DataFrame]) -> None:
+        """Stage ``frames`` as the complete symbol set of ``subdir``."""
+        store_dir = os.path.join(self.staging_dir, subdir)
+        if os.path.isdir(store_dir):
+            shutil.rmtree(store_dir)
+        write_store(frames, store_dir)
+        self.updated.append(subdir)
+
+    def derive(self, name: str, rule: str, source: str = "daily") -> None:
+        """Stage ``name`` as ``source`` resampled with ``rule``; kept up to date on every publish."""
+        store_dir = os.path.join(self.staging_dir, name)
+        if os.path.isdir(store_dir):
+            shutil.rmtree(store_dir)
+        derive_store(os.path.join(self.staging_dir, source), store_dir, rule)
+        self.updated.append(name)
+
+    def _refresh_derived(self) -> None:
+        """(Re)build the derived intervals whose source bars changed, and the missing defaults."""
+        wanted = {name: ("daily", rule) for name, rule in DERIVED.items()}
+        for name in sorted(os.listdir(self.staging_dir)):
+            store_dir = os.path.join(self.staging_dir, name)
+            if has_store(store_dir):
+                meta = read_meta(store_dir)
+                if meta.get("rule"):
+                    wanted[name] = (meta["source"], meta["rule"])
+
+        for name, (source, rule) in wanted.items():
+            source_dir = os.path.join(self.staging_dir, source)
+            store_dir = os.path.join(self.staging_dir, name)
+            if not has_store(source_dir):
+                continue
+            if has_store(store_dir) and \
+                    read_meta(store_dir).get("source_fingerprint") == store_fingerprint(source_dir):
+                continue
+            self.derive(name, rule, source)
+
+    def publish(self) -> str:
+        """Move the staged snapshot into place and point CURRENT at it."""
+        from rrg_engine import write_panels     # rrg_engine imports this module
+
+        self._refresh_derived()
+        base_dir = os.path.join(snapshots_dir(self.data_dir), self.base_id) \
+            if self.base_id is not None else None
+        write_panels(self.staging_dir, base_dir)
+        intervals = {}
+        for subdir in sorted(os.listdir(self.staging_dir)):
+            store_dir = os.path.join(self.staging_dir, subdir)
+            if has_store(store_dir):
+                meta = read_meta(store_dir)
+                intervals[subdir] = {"rows": meta["rows"], "symbols": len(meta["symbols"]),
+                                     "fingerprint": meta.get("fingerprint")}
+
+        manifest = {
+            "id": self.snapshot_id,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "base": self.base_id,
+            "updated": self.updated,
+            "intervals": intervals,
+        }
+        save_json(os.path.join(self.staging_dir, MANIFEST_FILE), manifest)
+
+        final_dir = os.path.join(snapshots_dir(self.data_dir), self.snapshot_id)
+        os.rename(self.staging_dir, final_dir)
+
+        # The single atomic step readers observe
+        current = os.path.join(store_root(self.data_dir), CURRENT_FILE)
+        with open(current + ".tmp", "w", encoding="utf-8") as fh:
+            fh.write(self.snapshot_id + "\n")
+        os.replace(current + ".tmp", current)
+
+        prune_snapshots(self.data_dir)
+        return self.snapshot_id
+
+    def discard(self) -> None:
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+
+def link_tree(src: str, dst: str) -> None:
+    """Create ``dst`` with hard links to the files of ``src`` (copies across file systems)."""
+    os.makedirs(dst)
+    for name in os.listdir(src):
+        try:
+            os.link(os.path.join(src, name), os.path.join(dst, name))
+        except OSError:
+            shutil.copy2(os.path.join(src, name), os.path.join(dst, name))
+
+
+def prune_snapshots(data_dir: str = DATA_DIR, keep: int = KEEP_SNAPSHOTS) -> None:
+    """Delete all but the newest ``keep`` snapshots (never the current one)."""
+    root = snapshots_dir(data_dir)
+    current = current_snapshot(data_dir)
+    names = sorted(n for n in os.listdir(root) if not n.startswith("."))
+    for name in names[:-keep] if keep else names:
+        if name != current:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def read_manifest(snapshot_id: str, data_dir: str = DATA_DIR) -> dict:
+    with open(os.path.join(snapshots_dir(data_dir), snapshot_id, MANIFEST_FILE), encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+# ---------------------------------------------------------------------------
+# Read
+# ---------------------------------------------------------------------------
+
+@dataclass
+class StoreData:
+    """Arrays of one interval. ``arrays[field]`` is dates x symbols."""
+    dates: pd.DatetimeIndex
+    symbols: list[str]
+    tickers: list[str]
+    arrays: dict[str, np.ndarray]
+
+
+def has_store(store_dir: str) -> bool:
+    return os.path.isfile(os.path.join(store_dir, META_FILE))
+
+
+def read_meta(store_dir: str) -> dict:
+    with open(os.path.join(store_dir, META_FILE), encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def store_fingerprint(store_dir: str) -> str:
+    """Content fingerprint of one interval (unchanged when its bars are unchanged)."""
+    return read_meta(store_dir).get("fingerprint") or os.path.realpath(store_dir)
+
+
+def read_store(store_dir: str, fields=("close",), mmap: bool = True) -> StoreData:
+    """Open ``fields`` of the store. With ``mmap`` the arrays are read-only views of the files."""
+    meta = read_meta(store_dir)
+    mode = "r" if mmap else None
+    dates = pd.DatetimeIndex(np.load(os.path.join(store_dir, "dates.npy")).view("datetime64[ns]"),
+                             name="datetime")
+    arrays = {f: np.load(os.path.join(store_dir, f"{f}.npy"), mmap_mode=mode) for f in fields}
+    return StoreData(dates, meta["symbols"], meta["tickers"], arrays)
+
+
+def store_frame(data: StoreData, symbol: str) -> pd.DataFrame:
+    """One symbol back in fetcher/CSV format (only the bars it actually has)."""
+    col = data.symbols.index(symbol)
+    mask = ~np.isnan(data.arrays["close"][:, col])
+    frame = pd.DataFrame({"symbol": data.tickers[col]}, index=data.dates[mask])
+    for f in FIELDS:
+        frame[f] = data.arrays[f][mask, col]
+    return frame
+
+
+def read_csv_frames(csv_dir: str) -> dict[str, pd.DataFrame]:
+    """Read every ``<SYMBOL>.csv`` of ``csv_dir`` in fetcher format."""
+    frames = {}
+    for fpath in sorted(glob.glob(os.path.join(csv_dir, "*.csv"))):
+        name = os.path.splitext(os.path.basename(fpath))[0]
+        df = pd.read_csv(fpath, parse_dates=["datetime"], float_precision="round_trip")
+        frames[name] = df.set_index("datetime")
+    return frames
+
+
+def load_frames(subdir: str, data_dir: str = DATA_DIR) -> dict[str, pd.DataFrame]:
+    """All symbols of ``subdir`` in fetcher format, from the current snapshot if any."""
+    store_dir = current_store_dir(subdir, data_dir)
+    if store_dir is not None:
+        data = read_store(store_dir, fields=FIELDS)
+        return {symbol: store_frame(data, symbol) for symbol in data.symbols}
+    return read_csv_frames(os.path.join(data_dir, subdir))
+
+
+# ---------------------------------------------------------------------------
+# Migration / export
+# ---------------------------------------------------------------------------
+
+def migrate(subdirs=INTERVALS, data_dir: str = DATA_DIR) -> str | None:
+    """Publish a snapshot built from the CSVs of ``subdirs``. Returns its id."""
+    writer = SnapshotWriter(data_dir)
+    try:
+        for subdir in subdirs:
+            frames = read_csv_frames(os.path.join(data_dir, subdir))
+            if frames:
+                writer.replace(subdir, frames)
+        if not writer.updated:
+            writer.discard()
+            return None
+        return writer.publish()
+    except BaseException:
+        writer.discard()
+        raise
+
+
+def export_csv(subdir: str, data_dir: str = DATA_DIR) -> int:
+    """Write ``data/<subdir>/<SYMBOL>.csv`` for every symbol in the current snapshot."""
+    store_dir = current_store_dir(subdir, data_dir)
+    if store_dir is None:
+        return 0
+    data = read_store(store_dir, fields=FIELDS, mmap=True)
+    out_dir = os.path.join(data_dir, subdir)
+    os.makedirs(out_dir, exist_ok=True)
+    for symbol in data.symbols:
+        store_frame(data, symbol).to_csv(os.path.join(out_dir, f"{symbol}.csv"))
+    return len(data.symbols)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar data store (CSV <-> NumPy snapshots)")
+    parser.add_argument("command", choices=["migrate", "export", "status", "derive"])
+    parser.add_argument("--interval", choices=INTERVALS + ["both"], default="both",
+                        help="Data interval (default: both)")
+    parser.add_argument("--name", help="Derived interval name (derive)")
+    parser.add_argument("--rule", help="End-anchored resample rule, e.g. W-THU or QE (derive)")
+    args = parser.parse_args()
+
+    subdirs = INTERVALS if args.interval == "both" else [args.interval]
+    if args.command == "migrate":
+        snapshot_id = migrate(subdirs)
+        if snapshot_id is None:
+            print("[FAIL] No CSV files found")
+            raise SystemExit(1)
+        print(f"[OK] Published snapshot {snapshot_id} ({', '.join(subdirs)})")
+    elif args.command == "derive":
+        if not (args.name and args.rule):
+            parser.error("derive needs --name and --rule")
+        writer = SnapshotWriter()
+        try:
+            writer.derive(args.name, args.rule)
+            snapshot_id = writer.publish()
+        except BaseException:
+            writer.discard()
+            raise
+        print(f"[OK] Published snapshot {snapshot_id} with {args.name} ({args.rule} from daily)")
+    elif args.command == "export":
+        for subdir in subdirs:
+            n = export_csv(subdir)
+            print(f"[OK] {subdir}: {n} symbols -> {os.path.join(DATA_DIR, subdir)}")
+    else:
+        snapshot_id = current_snapshot()
+        if snapshot_id is None:
+            print("No snapshot published yet")
+            return
+        manifest = read_manifest(snapshot_id)
+        print(f"Current snapshot: {snapshot_id} (created {manifest['created']})")
+        for subdir, info in manifest["intervals"].items():
+            print(f"  {subdir}: {info['symbols']} symbols, {info['rows']} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -90,6 +90,22 @@ def fetch_all_data() -> dict:
         else:
             results["failed"] += 1
 
+    # Publish a store snapshot - the app reads only the current snapshot
+    try:
+        from data_store import migrate
+        snapshot_id = migrate(["daily", "1h"], str(DATA_DIR))
+        if snapshot_id is not None:
+            print(f"  [OK] Published data snapshot {snapshot_id}")
+    except Exception as e:
+        print(f"  [FAIL] Snapshot not published ({e}) - app keeps the previous data")
+    else:
+        # Grid of the new snapshot, or of the current one when nothing changed
+        try:
+            from rrg_grid import build_grids
+            build_grids(snapshot_id, data_dir=str(DATA_DIR), logger=print)
+        except Exception as e:
+            print(f"  [FAIL] RRG grid not built ({e}) - the app computes on its own")
+
     print(f"\n{'='*60}")
     print(f"  Completed: {results['success']} success, {results['failed']} failed")
     print(f"{'='*60}\n")
@@ -0,0 +1,223 @@
+"""
+Fetch Metrics - run history of the data fetcher, per run and per symbol
+
+Every ``auto_fetch_data.fetch_data`` run is recorded in a SQLite file
+(logs/fetch_runs.db) next to the text log:
+
+    runs      one row per run: intervals, mode, concurrency / rate, status,
+              counts, duration, snapshot, and the time spent writing the
+              store, publishing, building the grid and scanning events
+    fetches   one row per symbol and interval: request latency (of the
+              successful / last attempt), attempts, rate-limiter wait, rows
+              and bytes received, rows added / revised, CSV write time
+
+Bytes are the in-memory size of the received frame; TvDatafeed does not
+expose the raw websocket payload.
+
+The report gives p50 / p95 request latency per symbol and interval, over
+the whole history or per day / week, to tune concurrency, backoff and the
+schedule from real runs.
+
+Usage:
+    python fetch_metrics.py report                            # all runs, per symbol
+    python fetch_metrics.py report --interval 1h --since 2025-01-01 --by week
+    python fetch_metrics.py runs --last 20
+"""
+
+import argparse
+import os
+import sqlite3
+
+import pandas as pd
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
+RUNS_DB = os.path.join(LOG_DIR, "fetch_runs.db")
+RUN_COLUMNS = ["run_id", "started", "intervals", "mode", "concurrency", "rate", "status",
+               "success", "failed", "duration", "snapshot", "store_seconds", "publish_seconds",
+               "grid_seconds", "events_seconds"]
+FETCH_COLUMNS = ["run_id", "interval", "symbol", "status", "latency", "attempts", "waited",
+                 "rows_received", "bytes", "rows_added", "rows_revised", "write_seconds", "error"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started TEXT NOT NULL,
+    intervals TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    concurrency INTEGER,
+    rate REAL,
+    status TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    failed INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    snapshot TEXT,
+    store_seconds REAL,
+    publish_seconds REAL,
+    grid_seconds REAL,
+    events_seconds REAL
+);
+CREATE TABLE IF NOT EXISTS fetches (
+    run_id TEXT NOT NULL REFERENCES runs (run_id),
+    interval TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    status TEXT NOT NULL,
+    latency REAL,
+    attempts INTEGER,
+    waited REAL,
+    rows_received INTEGER,
+    bytes INTEGER,
+    rows_added INTEGER,
+    rows_revised INTEGER,
+    write_seconds REAL,
+    error TEXT,
+    PRIMARY KEY (run_id, interval, symbol)
+);
+CREATE INDEX IF NOT EXISTS fetches_by_symbol ON fetches (interval, symbol, run_id);
+"""
+
+
+# ---------------------------------------------------------------------------
+# SQLite store
+# ---------------------------------------------------------------------------
+
+def connect(db_path: str = RUNS_DB) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def record_run(run: dict, fetches: list[dict], db_path: str = RUNS_DB) -> None:
+    """Store one run (``RUN_COLUMNS``) and its per-symbol rows (``FETCH_COLUMNS``)."""
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.execute(f"INSERT OR REPLACE INTO runs VALUES ({','.join('?' * len(RUN_COLUMNS))})",
+                         [run.get(c) for c in RUN_COLUMNS])
+            conn.executemany(
+                f"INSERT OR REPLACE INTO fetches VALUES ({','.join('?' * len(FETCH_COLUMNS))})",
+                [[run["run_id"] if c == "run_id" else f.get(c) for c in FETCH_COLUMNS]
+                 for f in fetches])
+    finally:
+        conn.close()
+
+
+def _query(sql: str, params: list, db_path: str) -> pd.DataFrame:
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+
+def load_runs(last: int = 20, db_path: str = RUNS_DB) -> pd.DataFrame:
+    """The ``last`` runs, newest first."""
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=RUN_COLUMNS)
+    return _query(f"SELECT {', '.join(RUN_COLUMNS)} FROM runs ORDER BY started DESC LIMIT ?",
+                  [last], db_path)
+
+
+def load_fetches(interval: str | None = None, since=None, symbols=None,
+                 db_path: str = RUNS_DB) -> pd.DataFrame:
+    """Per-symbol rows with the run's start time (``started``), oldest first."""
+    columns = ["started"] + FETCH_COLUMNS
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=columns)
+    sql = (f"SELECT r.started, {', '.join('f.' + c for c in FETCH_COLUMNS)} "
+           f"FROM fetches f JOIN runs r USING (run_id) WHERE 1=1")
+    params = []
+    if interval is not None:
+        sql += " AND f.interval=?"
+        params.append(interval)
+    if since is not None:
+        sql += " AND r.started>=?"
+        params.append(pd.Timestamp(since).isoformat())
+    if symbols:
+        sql += f" AND f.symbol IN ({','.join('?' * len(symbols))})"
+        params += list(symbols)
+    return _query(sql + " ORDER BY r.started", params, db_path)
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def latency_report(fetches: pd.DataFrame, by: str | None = None) -> pd.DataFrame:
+    """p50 / p95 / max request latency (ms) and retry / failure counts per interval and symbol.
+
+    ``by`` adds a period column ("day" or "week", by the run's start).
+    """
+    keys = ["interval", "symbol"]
+    df = fetches.copy()
+    if by is not None:
+        started = pd.to_datetime(df["started"])
+        df["period"] = started.dt.normalize() if by == "day" else \
+            started.dt.to_period("W-SUN").dt.start_time
+        keys.append("period")
+    ok = df[df["status"] == "ok"]
+    latency = ok.groupby(keys)["latency"]
+    report = pd.DataFrame({
+        "fetches": df.groupby(keys).size(),
+        "failed": df[df["status"] != "ok"].groupby(keys).size(),
+        "p50_ms": latency.quantile(0.5) * 1e3,
+        "p95_ms": latency.quantile(0.95) * 1e3,
+        "max_ms": latency.max() * 1e3,
+        "retries": (df["attempts"] - 1).groupby([df[k] for k in keys]).sum(),
+        "wait_s": df.groupby(keys)["waited"].mean(),
+        "rows_added": ok.groupby(keys)["rows_added"].sum(),
+    })
+    report["failed"] = report["failed"].fillna(0).astype(int)
+    return report.reset_index()
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetcher run history")
+    parser.add_argument("command", choices=["report", "runs"])
+    parser.add_argument("--interval", choices=["daily", "1h"])
+    parser.add_argument("--since", help="Only runs started on or after this date")
+    parser.add_argument("--sector", help="Comma-separated symbols (report)")
+    parser.add_argument("--by", choices=["day", "week"], help="One row per period (report)")
+    parser.add_argument("--last", type=int, default=20, help="Runs listed (runs)")
+    args = parser.parse_args()
+
+    if not os.path.exists(RUNS_DB):
+        print(f"[FAIL] No run history yet ({RUNS_DB})")
+        raise SystemExit(1)
+
+    if args.command == "runs":
+        runs = load_runs(args.last)
+        for row in runs.itertuples():
+            print(f"{row.started[:19]}  {row.intervals:<10} {row.mode:<11} {row.status:<8} "
+                  f"{row.success:>3} ok {row.failed:>3} failed  {row.duration:7.1f}s  "
+                  f"c={row.concurrency} rate={row.rate:g}  {row.snapshot or '-'}")
+        return
+
+    symbols = [s.strip().upper() for s in args.sector.split(",")] if args.sector else None
+    fetches = load_fetches(args.interval, args.since, symbols)
+    if fetches.empty:
+        print("[FAIL] No fetches match")
+        raise SystemExit(1)
+    report = latency_report(fetches, args.by)
+    n_runs = fetches["run_id"].nunique()
+    print(f"[OK] {len(fetches)} fetches over {n_runs} runs "
+          f"({fetches['started'].iloc[0][:10]} .. {fetches['started'].iloc[-1][:10]})")
+    period = "period      " if args.by else ""
+    print(f"{period}{'interval':<8} {'symbol':<8} {'n':>5} {'fail':>5} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'max ms':>8} {'retries':>7} {'wait s':>7} {'added':>7}")
+    for row in report.itertuples():
+        prefix = f"{row.period:%Y-%m-%d}  " if args.by else ""
+        print(f"{prefix}{row.interval:<8} {row.symbol:<8} {row.fetches:>5} {row.failed:>5} "
+              f"{row.p50_ms:>8.0f} {row.p95_ms:>8.0f} {row.max_ms:>8.0f} {row.retries:>7.0f} "
+              f"{row.wait_s:>7.2f} {row.rows_added:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Concurrent fetch pipeline - bounded worker pool with a shared rate limiter
+
+Used by auto_fetch_data.py and fetch_sector_data.py in place of the old
+one-symbol-at-a-time loop with fixed 2 s / 20 s sleeps. Every request, from
+every worker, takes a token from one token bucket, so the total request rate
+to TradingView stays bounded whatever the concurrency. Failed requests are
+retried per symbol with exponential backoff and jitter.
+
+TvDatafeed keeps its websocket on the instance, so each worker thread gets
+its own client from ``client_factory``.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+import pandas as pd
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE = 1.0       # requests per second, all workers together
+DEFAULT_BURST = 4
+
+
+class RateLimiter:
+    """Token bucket: ``rate`` tokens per second, at most ``burst`` banked."""
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a token is available. Returns the time spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+
+@dataclass
+class FetchJob:
+    symbol: str
+    interval: object      # tvDatafeed.Interval
+    n_bars: int
+    exchange: str = "SET"
+    tag: str = ""         # caller's label, e.g. "daily" / "1h"
+
+
+@dataclass
+class FetchResult:
+    job: FetchJob
+    data: pd.DataFrame | None
+    attempts: int
+    latency: float        # seconds spent in successful/last request
+    error: str | None = None
+    waited: float = 0.0   # seconds spent waiting for rate limiter tokens, all attempts
+
+
+class ConcurrentFetcher:
+    """Fetch many symbols concurrently through a shared ``RateLimiter``."""
+
+    def __init__(self, client_factory: Callable[[], object],
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 limiter: RateLimiter | None = None,
+                 max_retries: int = 3, backoff: float = 2.0, max_backoff: float = 30.0,
+                 sleep: Callable[[float], None] = time.sleep, logger=None):
+        self.client_factory = client_factory
+        self.concurrency = max(1, concurrency)
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._sleep = sleep
+        self._logger = logger
+        self._local = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.client_factory()
+        return client
+
+    def _backoff_delay(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    def fetch(self, job: FetchJob) -> FetchResult:
+        """Fetch one symbol, retrying with exponential backoff."""
+        error = None
+        latency = waited = 0.0
+        for attempt in range(self.max_retries):
+            waited += self.limiter.acquire()
+            t0 = time.perf_counter()
+            try:
+                data = self._client().get_hist(symbol=job.symbol, exchange=job.exchange,
+                                               interval=job.interval, n_bars=job.n_bars)
+                latency = time.perf_counter() - t0
+                if data is not None and not data.empty:
+                    return FetchResult(job, data, attempt + 1, latency, waited=waited)
+                error = "No data returned from TradingView"
+            except Exception as e:
+                latency = time.perf_counter() - t0
+                error = str(e)
+                # Drop the client; its websocket may be in a bad state
+                self._local.client = None
+
+            if attempt < self.max_retries - 1:
+                if self._logger:
+                    self._logger.warning(f"  [RETRY] {job.symbol} attempt {attempt + 1}/{self.max_retries}: {error}")
+                self._sleep(self._backoff_delay(attempt))
+
+        return FetchResult(job, None, self.max_retries, latency, error, waited)
+
+    def fetch_all(self, jobs: Iterable[FetchJob]) -> Iterator[FetchResult]:
+        """Run ``jobs`` on the worker pool, yielding results as they complete."""
+        jobs = list(jobs)
+        if self.concurrency == 1:
+            for job in jobs:
+                yield self.fetch(job)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.concurrency,
+                                thread_name_prefix="fetch") as pool:
+            futures = [pool.submit(self.fetch, job) for job in jobs]
+            for future in as_completed(futures):
+                yield future.result()
@@ -1,13 +1,13 @@
 
 import argparse
 import os
-import time
-from datetime import datetime
 
 import pandas as pd
 from tvDatafeed import TvDatafeed, Interval
 
-tv = TvDatafeed()
+from data_store import SnapshotWriter
+from fetch_pipeline import (DEFAULT_CONCURRENCY, DEFAULT_RATE, ConcurrentFetcher,
+                            FetchJob, RateLimiter)
 
 # หมวดธุรกิจ (Sectors) - 29 หมวด
 sectors = [
@@ -63,54 +63,31 @@ INTERVAL_MAP = {
 }
 
 
-def fetch_with_retry(symbol, exchange='SET', interval=Interval.in_daily, n_bars=5000, max_retries=3, wait_time=20):
-    """
-    Fetch stock data with retry mechanism
+def prepare_symbol(result, interval):
+    """Fetched bars of one symbol ready to store, or None if the fetch failed."""
+    symbol = result.job.symbol
+    if result.data is None:
+        print(f"[WARN] Failed to fetch {symbol} after {result.attempts} attempts: {result.error}")
+        return None
 
-    Args:
-        symbol: Stock symbol
-        exchange: Exchange name
-        interval: Time interval
-        n_bars: Number of bars to fetch
-        max_retries: Maximum number of retry attempts
-        wait_time: Wait time in seconds before retry
+    stock_data = result.data
+    # Fix timezone for 1h data (Thailand is UTC+7)
+    if interval == "1h":
+        stock_data.index = stock_data.index + pd.Timedelta(hours=7)
 
-    Returns:
-        DataFrame or None if all retries failed
-    """
-    for attempt in range(max_retries):
-        try:
-            print(f"Fetching {symbol} (Attempt {attempt + 1}/{max_retries})...")
-            stock_data = tv.get_hist(
-                symbol=symbol,
-                exchange=exchange,
-                interval=interval,
-                n_bars=n_bars
-            )
-
-            # Check if data is valid
-            if stock_data is not None and not stock_data.empty:
-                print(f"[OK] Successfully fetched {symbol} - {len(stock_data)} rows")
-                return stock_data
-            else:
-                print(f"[FAIL] No data returned for {symbol}")
-
-        except Exception as e:
-            print(f"[FAIL] Error fetching {symbol}: {str(e)}")
-
-        # Wait before retry (except for the last attempt)
-        if attempt < max_retries - 1:
-            print(f"Waiting {wait_time} seconds before retry...")
-            time.sleep(wait_time)
-
-    print(f"[WARN] Failed to fetch {symbol} after {max_retries} attempts")
-    return None
+    print(f"[OK] {symbol} - {len(stock_data)} rows ({result.attempts} attempt(s), "
+          f"{result.latency:.1f}s)")
+    return stock_data
 
 
 def main():
     parser = argparse.ArgumentParser(description="Fetch SET sector data from TradingView")
     parser.add_argument("--interval", choices=["daily", "1h"], default="daily",
                         help="Data interval: daily (default) or 1h")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Symbols fetched in parallel (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help=f"Max TradingView requests per second (default: {DEFAULT_RATE:g})")
     args = parser.parse_args()
 
     cfg = INTERVAL_MAP[args.interval]
@@ -121,33 +98,20 @@ def main():
 
     failed_symbols = []
     successful_symbols = []
+    fetched = {}
 
-    for symbol in sectors:
-        print(f"\n{'='*60}")
-        print(f"Processing: {symbol}  (interval={args.interval})")
-        print(f"{'='*60}")
-
-        stock_data = fetch_with_retry(symbol, interval=tv_interval, n_bars=n_bars,
-                                      wait_time=20, max_retries=3)
+    fetcher = ConcurrentFetcher(TvDatafeed, concurrency=args.concurrency,
+                                limiter=RateLimiter(args.rate))
+    print(f"Fetching {len(sectors)} symbols (interval={args.interval}, "
+          f"concurrency={args.concurrency}, max {args.rate:g} requests/s)")
 
+    for result in fetcher.fetch_all(FetchJob(symbol, tv_interval, n_bars) for symbol in sectors):
+        stock_data = prepare_symbol(result, args.interval)
         if stock_data is not None:
-            try:
-                # Fix timezone for 1h data (Thailand is UTC+7)
-                if args.interval == "1h":
-                    stock_data.index = stock_data.index + pd.Timedelta(hours=7)
-
-                filepath = os.path.join(out_dir, f'{symbol}.csv')
-                stock_data.to_csv(filepath)
-                print(f"[OK] Saved to {filepath}")
-                successful_symbols.append(symbol)
-            except Exception as e:
-                print(f"[FAIL] Error saving {symbol}: {str(e)}")
-                failed_symbols.append(symbol)
+            successful_symbols.append(result.job.symbol)
+            fetched[result.job.symbol] = stock_data
         else:
-            failed_symbols.append(symbol)
-
-        # Small delay between symbols to avoid rate limiting
-        time.sleep(2)
+            failed_symbols.append(result.job.symbol)
 
     # Retry failed symbols one more time
     if failed_symbols:
@@ -156,35 +120,29 @@ def main():
         print(f"{'='*60}")
         print(f"Retrying {len(failed_symbols)} failed symbols: {', '.join(failed_symbols)}")
 
-        retry_failed = []
-
-        for symbol in failed_symbols[:]:  # Create a copy to iterate
-            print(f"\n{'='*60}")
-            print(f"Retrying: {symbol}  (interval={args.interval})")
-            print(f"{'='*60}")
+        for result in fetcher.fetch_all(FetchJob(symbol, tv_interval, n_bars) for symbol in failed_symbols[:]):
+            stock_data = prepare_symbol(result, args.interval)
+            if stock_data is not None:
+                successful_symbols.append(result.job.symbol)
+                failed_symbols.remove(result.job.symbol)
+                fetched[result.job.symbol] = stock_data
 
-            stock_data = fetch_with_retry(symbol, interval=tv_interval, n_bars=n_bars,
-                                          wait_time=20, max_retries=3)
+    # Publish one snapshot with every fetched symbol, then export the CSVs
+    if fetched:
+        writer = SnapshotWriter(os.path.dirname(out_dir))
+        try:
+            writer.update(cfg["subdir"], fetched)
+            print(f"[OK] Published data snapshot {writer.publish()} ({len(fetched)} symbols)")
+        except Exception as e:
+            writer.discard()
+            print(f"[FAIL] Snapshot not published: {str(e)}")
 
-            if stock_data is not None:
-                try:
-                    # Fix timezone for 1h data (Thailand is UTC+7)
-                    if args.interval == "1h":
-                        stock_data.index = stock_data.index + pd.Timedelta(hours=7)
-
-                    filepath = os.path.join(out_dir, f'{symbol}.csv')
-                    stock_data.to_csv(filepath)
-                    print(f"[OK] Saved to {filepath}")
-                    successful_symbols.append(symbol)
-                    failed_symbols.remove(symbol)
-                except Exception as e:
-                    print(f"[FAIL] Error saving {symbol}: {str(e)}")
-                    retry_failed.append(symbol)
-            else:
-                retry_failed.append(symbol)
-
-            # Small delay between symbols to avoid rate limiting
-            time.sleep(2)
+        for symbol, stock_data in fetched.items():
+            filepath = os.path.join(out_dir, f'{symbol}.csv')
+            try:
+                stock_data.to_csv(filepath)
+            except Exception as e:
+                print(f"[FAIL] Error saving {symbol}: {str(e)}")
 
     # Summary
     print(f"\n{'='*60}")
@@ -0,0 +1,227 @@
+"""
+Perf - lightweight timers and cache counters for the hot paths
+
+    with span("build_figure"): ...          # or @timed("build_figure")
+    with cache_lookup("load_all_sectors"):  # hit unless the cached body calls cache_miss()
+        tails, error = load_all_sectors(...)
+
+Every span is added to a per-process histogram (count, sum, max, buckets)
+and, when a render is open on the current thread (``start_render``), to
+that render's list, which the app shows in its Performance expander. A
+span costs two perf_counter calls and a dict update under a lock.
+
+Metrics leave the process as JSON snapshots: the app replicas and API
+workers write theirs to RRG_METRICS_DIR (``write_snapshot``) and the API's
+/metrics endpoint renders all of them in Prometheus text format
+(``prometheus_text``), one ``process`` label per writer. A process removes
+its snapshot when it exits; snapshots of killed processes are deleted once
+they are METRICS_MAX_AGE old.
+"""
+
+import atexit
+import json
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+METRICS_DIR = os.environ.get("RRG_METRICS_DIR")     # unset: metrics stay in the process
+METRICS_MAX_AGE = 24 * 3600     # snapshots not rewritten for this long are deleted (seconds)
+
+_lock = threading.Lock()
+_spans: dict[str, list] = {}    # name -> [count, sum, max, per-bucket counts (+Inf last)]
+_caches: dict[str, list] = {}   # name -> [hits, misses]
+_local = threading.local()      # .render: [(name, seconds)], .lookups: stack of missed flags
+_written: set[str] = set()      # snapshot files with an exit hook registered
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+
+def record(name: str, seconds: float) -> None:
+    with _lock:
+        entry = _spans.get(name)
+        if entry is None:
+            entry = _spans[name] = [0, 0.0, 0.0, [0] * (len(BUCKETS) + 1)]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        entry[3][bisect_left(BUCKETS, seconds)] += 1
+    render = getattr(_local, "render", None)
+    if render is not None:
+        render.append((name, seconds))
+
+
+@contextmanager
+def span(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - t0)
+
+
+def timed(name: str):
+    """Decorator: every call is a ``span(name)``."""
+    def wrap(fn):
+        @wraps(fn)
+        def timed_fn(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - t0)
+        return timed_fn
+    return wrap
+
+
+def cache_result(name: str, hit: bool) -> None:
+    with _lock:
+        entry = _caches.setdefault(name, [0, 0])
+        entry[0 if hit else 1] += 1
+    render = getattr(_local, "render", None)
+    if render is not None:
+        render.append((f"{name} ({'hit' if hit else 'miss'})", None))
+
+
+@contextmanager
+def cache_lookup(name: str):
+    """Count a lookup of cache ``name``: a miss if ``cache_miss`` is called inside it."""
+    lookups = getattr(_local, "lookups", None)
+    if lookups is None:
+        lookups = _local.lookups = []
+    lookups.append(False)
+    try:
+        with span(name):
+            yield
+    finally:
+        cache_result(name, hit=not lookups.pop())
+
+
+def cache_miss() -> None:
+    """Mark the innermost open ``cache_lookup`` on this thread as a miss."""
+    lookups = getattr(_local, "lookups", None)
+    if lookups:
+        lookups[-1] = True
+
+
+# ---------------------------------------------------------------------------
+# Per-render report
+# ---------------------------------------------------------------------------
+
+def start_render() -> None:
+    """Collect the spans of this thread from now on (one Streamlit script run)."""
+    _local.render = []
+
+
+def render_report() -> list[tuple[str, float | None]]:
+    """(name, seconds) of this render in order; cache results have seconds None."""
+    return list(getattr(_local, "render", None) or [])
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def process_name(kind: str) -> str:
+    return f"{kind}-{socket.gethostname()}-{os.getpid()}"
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "spans": {name: {"count": e[0], "sum": e[1], "max": e[2], "buckets": list(e[3])}
+                      for name, e in _spans.items()},
+            "caches": {name: {"hit": e[0], "miss": e[1]} for name, e in _caches.items()},
+        }
+
+
+def write_snapshot(process: str, metrics_dir: str | None = METRICS_DIR) -> None:
+    """Write this process's metrics for the /metrics endpoint (no-op without a metrics dir)."""
+    if not metrics_dir:
+        return
+    os.makedirs(metrics_dir, exist_ok=True)
+    path = os.path.join(metrics_dir, f"{process}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(snapshot(), fh)
+    os.replace(tmp, path)
+    with _lock:
+        if path not in _written:
+            _written.add(path)
+            atexit.register(_remove_at_exit, process, metrics_dir, os.getpid())
+
+
+def remove_snapshot(process: str, metrics_dir: str | None = METRICS_DIR) -> None:
+    """Delete a process's snapshot when it stops (runs at exit; servers also call it on shutdown)."""
+    if not metrics_dir:
+        return
+    try:
+        os.remove(os.path.join(metrics_dir, f"{process}.json"))
+    except OSError:
+        pass
+
+
+def _remove_at_exit(process: str, metrics_dir: str, pid: int) -> None:
+    if os.getpid() == pid:     # not in a forked child, whose parent still writes the file
+        remove_snapshot(process, metrics_dir)
+
+
+def read_snapshots(metrics_dir: str | None = METRICS_DIR) -> dict[str, dict]:
+    """Snapshots written by every live process, by process name; expired ones are deleted."""
+    if not metrics_dir or not os.path.isdir(metrics_dir):
+        return {}
+    out, now = {}, time.time()
+    for name in os.listdir(metrics_dir):
+        path = os.path.join(metrics_dir, name)
+        if not name.endswith(".json"):
+            continue
+        try:
+            if now - os.path.getmtime(path) > METRICS_MAX_AGE:
+                os.remove(path)     # its process was killed before it could clean up
+                continue
+            with open(path, encoding="utf-8") as fh:
+                out[name[:-len(".json")]] = json.load(fh)
+        except (OSError, ValueError):
+            continue            # being replaced, or gone
+    return out
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text(snapshots: dict[str, dict]) -> str:
+    """Prometheus text exposition of ``snapshots`` (process name -> ``snapshot()``)."""
+    lines = ["# HELP rrg_span_seconds Time spent in instrumented code.",
+             "# TYPE rrg_span_seconds histogram"]
+    for process, snap in sorted(snapshots.items()):
+        for name, s in sorted(snap["spans"].items()):
+            cumulative = 0
+            for le, n in zip(list(BUCKETS) + ["+Inf"], s["buckets"]):
+                cumulative += n
+                lines.append(f"rrg_span_seconds_bucket{_labels(process=process, span=name, le=le)} "
+                             f"{cumulative}")
+            lines.append(f"rrg_span_seconds_sum{_labels(process=process, span=name)} {s['sum']:.6f}")
+            lines.append(f"rrg_span_seconds_count{_labels(process=process, span=name)} {s['count']}")
+    lines += ["# HELP rrg_span_seconds_max Longest single span.",
+              "# TYPE rrg_span_seconds_max gauge"]
+    for process, snap in sorted(snapshots.items()):
+        for name, s in sorted(snap["spans"].items()):
+            lines.append(f"rrg_span_seconds_max{_labels(process=process, span=name)} {s['max']:.6f}")
+    lines += ["# HELP rrg_cache_requests_total Cache lookups by result.",
+              "# TYPE rrg_cache_requests_total counter"]
+    for process, snap in sorted(snapshots.items()):
+        for name, c in sorted(snap["caches"].items()):
+            for result in ("hit", "miss"):
+                lines.append(f"rrg_cache_requests_total"
+                             f"{_labels(process=process, cache=name, result=result)} {c[result]}")
+    return "\n".join(lines) + "\n"
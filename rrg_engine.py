@@ -0,0 +1,902 @@
+"""
+RRG engine - price loading and JdK RS-Ratio / RS-Momentum computation.
+
+Kept free of Streamlit so the app and command-line tools can share it.
+"""
+
+import os
+import glob
+import json
+import shutil
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from data_store import (CURRENT_FILE, DERIVED, INTERVALS, UNIVERSE_PREFIX, current_store_dir,
+                        has_store, link_tree, read_meta, read_store, resample_offset, save_json,
+                        save_npy, store_fingerprint, store_root)
+from perf import cache_result, span, timed
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+_script_dir = os.path.dirname(os.path.realpath(__file__))
+if os.path.isdir(os.path.join(_script_dir, "data")):
+    BASE_DIR = _script_dir
+else:
+    BASE_DIR = os.getcwd()
+
+CENTER = 100
+BENCHMARK = "SET"
+MAX_TAIL = 50          # longest tail the UI can show
+MIN_VALID = 5          # sectors need this many RRG points ...
+WARMUP_EXTRA = 10      # ... and rs_period + mom_period + this many bars
+PANEL_DIRNAME = "panels"
+PANEL_FILE = "panel.json"
+
+
+def subdir_for(interval: str) -> str:
+    """Source bars: 1h ใช้ folder "1h", ทุก interval อื่น (weekly, monthly, ...) มาจาก "daily"."""
+    return "1h" if interval == "1h" else "daily"
+
+
+def resample_rule(interval: str) -> str | None:
+    """Resample rule of ``interval`` over its source bars (None for daily / 1h).
+
+    "weekly" and "monthly" map to W-FRI / ME; any other name is taken as an
+    end-anchored pandas rule itself (e.g. "W-THU"), so custom anchors work.
+    """
+    if interval in ("daily", "1h"):
+        return None
+    return DERIVED.get(interval, interval)
+
+
+def store_dir_in(snapshot_dir: str, interval: str) -> str:
+    """Folder of ``interval`` in a snapshot: its derived bars if published, else the source bars."""
+    derived = os.path.join(snapshot_dir, interval)
+    return derived if has_store(derived) else os.path.join(snapshot_dir, subdir_for(interval))
+
+
+def data_dir_for(interval: str) -> str:
+    return os.path.join(BASE_DIR, "data", subdir_for(interval))
+
+
+# ---------------------------------------------------------------------------
+# RRG computation (JdK style with ema_alpha / Wilder's smoothing)
+# ---------------------------------------------------------------------------
+
+@timed("load_csv")
+def load_csv(path: str, interval: str = "daily") -> pd.Series:
+    """Load a sector CSV and return close prices.
+
+    For weekly: resample daily to weekly (W-FRI) - ต้นตำรับ
+    For monthly / custom anchors: resample with ``resample_rule``
+    For daily: no resample (use raw daily)
+    For 1h: no resample (use raw hourly)
+    """
+    df = pd.read_csv(path, parse_dates=["datetime"])
+    df = df.sort_values("datetime").set_index("datetime")
+
+    rule = resample_rule(interval)
+    if rule is not None:
+        return df["close"].resample(rule).last().dropna()
+    else:
+        return df["close"].dropna()
+
+
+def ema_alpha(series: pd.Series, period: int) -> pd.Series:
+    """Wilder's smoothing (RMA) - ต้นตำรับ JdK RRG"""
+    return series.ewm(alpha=1/period, adjust=False).mean()
+
+
+@timed("compute_rrg")
+def compute_rrg(sector_close: pd.Series,
+                benchmark_close: pd.Series,
+                rs_period: int,
+                mom_period: int) -> pd.DataFrame:
+    """
+    Compute RS-Ratio and RS-Momentum using JdK methodology.
+    ใช้ ema_alpha (Wilder's smoothing) ตามต้นตำรับ
+    """
+    # Raw relative strength
+    rs = sector_close / benchmark_close
+
+    # RS-Ratio: ใช้ ema_alpha
+    rs_smooth = ema_alpha(rs, rs_period)
+    rs_ratio = CENTER + ((rs - rs_smooth) / rs_smooth) * CENTER
+
+    # RS-Momentum: ใช้ ema_alpha
+    ratio_smooth = ema_alpha(rs_ratio, mom_period)
+    rs_momentum = CENTER + ((rs_ratio - ratio_smooth) / ratio_smooth) * CENTER
+
+    result = pd.DataFrame({"rs_ratio": rs_ratio, "rs_momentum": rs_momentum})
+    return result.dropna()
+
+
+# ---------------------------------------------------------------------------
+# Price panel (cached per interval, invalidated when the data changes)
+# ---------------------------------------------------------------------------
+
+@dataclass
+class PricePanel:
+    """Close prices of every sector aligned on the benchmark's dates.
+
+    ``closes`` is a dates x sectors frame indexed like ``benchmark``; a NaN
+    means the sector has no bar on that date.
+    """
+    benchmark: pd.Series
+    closes: pd.DataFrame
+    fingerprint: tuple
+    errors: list[str] = field(default_factory=list)
+
+
+_panel_cache: dict[str, PricePanel] = {}
+_panel_lock = threading.Lock()
+
+
+def csv_fingerprint(data_dir: str) -> tuple:
+    """(name, mtime, size) of every CSV in ``data_dir`` - changes whenever a file is rewritten."""
+    entries = []
+    for fpath in sorted(glob.glob(os.path.join(data_dir, "*.csv"))):
+        st = os.stat(fpath)
+        entries.append((os.path.basename(fpath), st.st_mtime_ns, st.st_size))
+    return tuple(entries)
+
+
+_source_memo: dict[str, tuple] = {}
+
+
+def _pointer_key(data_root: str):
+    """Identity of the CURRENT pointer file; os.replace on publish always changes it."""
+    try:
+        st = os.stat(os.path.join(store_root(data_root), CURRENT_FILE))
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _panel_source(interval: str):
+    """Pick the data for ``interval``. Returns (kind, path, fingerprint).
+
+    Reads only the published snapshot when there is one, so a fetch in
+    progress is never seen half-done. The CSVs are used only before the
+    first snapshot is published.
+
+    The fingerprint is the content hash of the interval, so publishing new
+    1h bars does not invalidate daily/weekly results. While the CURRENT
+    pointer is unchanged this costs a single ``stat``.
+    """
+    data_root = os.path.join(BASE_DIR, "data")
+    key = _pointer_key(data_root)
+    if key is not None:
+        memo = _source_memo.get(interval)
+        if memo is not None and memo[0] == key:
+            return memo[1]
+        store_dir = current_store_dir(interval, data_root) or \
+            current_store_dir(subdir_for(interval), data_root)
+        if store_dir is not None:
+            source = ("store", store_dir, ("store", store_fingerprint(store_dir)))
+            _source_memo[interval] = (key, source)
+            return source
+    data_dir = data_dir_for(interval)
+    return "csv", data_dir, csv_fingerprint(data_dir)
+
+
+def data_version(interval: str) -> tuple:
+    """Cache key of the data behind ``interval``; changes only when its content does."""
+    return _panel_source(interval)[2]
+
+
+# ---------------------------------------------------------------------------
+# Master calendar (position alignment on the store's dates)
+# ---------------------------------------------------------------------------
+
+CALENDAR_ENTRIES = 16
+
+
+@dataclass
+class MasterCalendar:
+    """The bars of one interval as row ranges of the store's date axis.
+
+    Every symbol of a store is already position-aligned on one sorted date
+    axis (NaN = no bar). An interval's bars are the dates on which the
+    benchmark trades; when resampled (weekly from daily bars), bar ``k``
+    spans store rows ``starts[k]..ends[k]`` (one W-FRI week) and takes each
+    symbol's last close in it. Built once per store fingerprint, so aligning a symbol is
+    array indexing instead of an index join or a resample.
+    """
+    dates: pd.DatetimeIndex
+    starts: np.ndarray
+    ends: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def align(self, values: np.ndarray) -> np.ndarray:
+        """Rows of ``values`` (store rows x symbols) as bars of the interval.
+
+        Daily / 1h with the benchmark on every row returns ``values`` itself.
+        """
+        if np.array_equal(self.starts, self.ends):
+            return values if len(self.ends) == len(values) else values[self.ends]
+        # Each symbol's last non-NaN close of the bin: take the bin's last row,
+        # then walk back only where that is still NaN (missing bars are rare)
+        out = values[self.ends]
+        r, c = np.nonzero(np.isnan(out))
+        rows = self.ends[r]
+        while len(r):
+            rows = rows - 1
+            ok = rows >= self.starts[r]
+            r, c, rows = r[ok], c[ok], rows[ok]
+            picked = values[rows, c]
+            out[r, c] = picked
+            missing = np.isnan(picked)
+            r, c, rows = r[missing], c[missing], rows[missing]
+        return out
+
+
+def period_ends(dates: pd.DatetimeIndex, rule: str) -> pd.DatetimeIndex:
+    """Bin label of each date, like ``resample(rule)`` (e.g. W-FRI: the week's Friday, midnight)."""
+    return dates.normalize() + resample_offset(rule) * 0
+
+
+def build_calendar(rule: str | None, dates: pd.DatetimeIndex,
+                   benchmark: np.ndarray) -> MasterCalendar:
+    """Master calendar from the store dates and the benchmark's closes.
+
+    ``rule`` resamples the store's bars (see ``resample_rule``); None keeps them.
+    """
+    if rule is not None:
+        bins = period_ends(dates, rule)
+        labels, starts = np.unique(bins.asi8, return_index=True)
+        ends = np.append(starts[1:], len(dates)) - 1
+        cal = MasterCalendar(pd.DatetimeIndex(labels.view("datetime64[ns]"), name=dates.name),
+                             starts, ends)
+        keep = ~np.isnan(cal.align(benchmark[:, None])[:, 0])
+        return MasterCalendar(cal.dates[keep], starts[keep], ends[keep])
+    rows = np.flatnonzero(~np.isnan(benchmark))
+    return MasterCalendar(dates[rows], rows, rows)
+
+
+_calendars: OrderedDict = OrderedDict()
+_calendars_lock = threading.Lock()
+
+
+def master_calendar(key: tuple, rule: str | None, dates: pd.DatetimeIndex,
+                    benchmark: np.ndarray) -> MasterCalendar:
+    """``build_calendar`` cached per ``key`` (store identity and fingerprint) and rule."""
+    key = (key, rule)
+    with _calendars_lock:
+        cal = _calendars.get(key)
+        if cal is not None:
+            _calendars.move_to_end(key)
+            return cal
+    cal = build_calendar(rule, dates, benchmark)
+    with _calendars_lock:
+        _calendars[key] = cal
+        while len(_calendars) > CALENDAR_ENTRIES:
+            _calendars.popitem(last=False)
+    return cal
+
+
+def clear_calendars() -> None:
+    with _calendars_lock:
+        _calendars.clear()
+
+
+def _read_store_panel(interval: str, store_dir: str, fingerprint: tuple):
+    try:
+        data = read_store(store_dir)
+    except Exception as e:
+        return None, f"Error loading store: {e}"
+    if not data.symbols or data.symbols[0] != BENCHMARK:
+        return None, f"Benchmark {BENCHMARK} not found in store: {store_dir}"
+
+    # Benchmark is column 0; stored bars stay a zero-copy view of the mapped file.
+    # Derived folders (weekly/, monthly/) already hold the interval's bars.
+    close = data.arrays["close"]
+    rule = None if os.path.basename(store_dir) == interval else resample_rule(interval)
+    cal = master_calendar((store_dir, interval) + fingerprint, rule, data.dates, close[:, 0])
+    aligned = cal.align(close)
+    frame = pd.DataFrame(aligned, index=cal.dates, columns=data.symbols, copy=False)
+    return PricePanel(frame[BENCHMARK], frame.iloc[:, 1:], fingerprint), None
+
+
+def _read_panel(interval: str, data_dir: str, fingerprint: tuple):
+    benchmark_file = os.path.join(data_dir, f"{BENCHMARK}.csv")
+    if not os.path.isfile(benchmark_file):
+        return None, f"Benchmark file not found: {benchmark_file}"
+
+    try:
+        benchmark = load_csv(benchmark_file, interval)
+    except Exception as e:
+        return None, f"Error loading benchmark: {e}"
+
+    sector_files = sorted(glob.glob(os.path.join(data_dir, "*.csv")))
+    sector_files = [f for f in sector_files if os.path.basename(f) != f"{BENCHMARK}.csv"]
+
+    columns = {}
+    errors = []
+    for fpath in sector_files:
+        name = os.path.splitext(os.path.basename(fpath))[0]
+        try:
+            columns[name] = load_csv(fpath, interval).reindex(benchmark.index)
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+
+    closes = pd.DataFrame(columns, index=benchmark.index)
+    return PricePanel(benchmark, closes, fingerprint, errors), None
+
+
+def load_price_panel(interval: str):
+    """Return (PricePanel|None, error_msg|None) for ``interval``.
+
+    Reads the current snapshot when present, otherwise the CSVs. The panel
+    is kept in memory and only re-read when the source fingerprint changes.
+    """
+    kind, path, fingerprint = _panel_source(interval)
+
+    with _panel_lock:
+        panel = _panel_cache.get(interval)
+        if panel is not None and panel.fingerprint == fingerprint:
+            cache_result("price_panel", hit=True)
+            return panel, None
+
+        cache_result("price_panel", hit=False)
+        with span(f"load_panel_{kind}"):
+            if kind == "store":
+                panel, error = _open_store_panel(interval, path, fingerprint)
+            else:
+                panel, error = _read_panel(interval, path, fingerprint)
+        if panel is not None:
+            _panel_cache[interval] = panel
+        return panel, error
+
+
+def load_snapshot_panel(interval: str, snapshot_dir: str):
+    """Return (PricePanel|None, error_msg|None) for ``interval`` from one given snapshot."""
+    store_dir = store_dir_in(snapshot_dir, interval)
+    if not has_store(store_dir):
+        return None, f"No {subdir_for(interval)} data in snapshot: {snapshot_dir}"
+    return _open_store_panel(interval, store_dir, ("store", store_fingerprint(store_dir)))
+
+
+# ---------------------------------------------------------------------------
+# Materialized panels (shared read-only by every app / API process)
+# ---------------------------------------------------------------------------
+#
+#   <snapshot>/panels/<interval>/
+#       dates.npy        int64 nanoseconds, the benchmark's dates
+#       benchmark.npy    float64 benchmark closes
+#       closes.npy       float64, dates x sectors (weekly already resampled)
+#       panel.json       sectors, index name and the source fingerprint
+#
+# Written into the staging folder when a snapshot is published (write_panels),
+# for every stored and derived interval. Processes open the files with
+# mmap_mode="r", so every replica shares one copy in the page cache instead
+# of building its own benchmark-aligned frame.
+
+def panel_dir(snapshot_dir: str, interval: str) -> str:
+    return os.path.join(snapshot_dir, PANEL_DIRNAME, interval)
+
+
+def _read_mapped_panel(path: str, fingerprint: tuple):
+    """Zero-copy PricePanel over a materialized panel, or None if missing or stale."""
+    try:
+        with open(os.path.join(path, PANEL_FILE), encoding="utf-8") as fh:
+            meta = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if meta.get("fingerprint") != fingerprint[1]:
+        return None
+    dates = pd.DatetimeIndex(np.load(os.path.join(path, "dates.npy")).view("datetime64[ns]"),
+                             name=meta.get("index_name"))
+    benchmark = pd.Series(np.load(os.path.join(path, "benchmark.npy"), mmap_mode="r"),
+                          index=dates, name=BENCHMARK, copy=False)
+    closes = pd.DataFrame(np.load(os.path.join(path, "closes.npy"), mmap_mode="r"),
+                          index=dates, columns=meta["symbols"], copy=False)
+    return PricePanel(benchmark, closes, fingerprint)
+
+
+def _open_store_panel(interval: str, store_dir: str, fingerprint: tuple):
+    """Materialized panel of the snapshot when there is one, else built from the store."""
+    mapped = _read_mapped_panel(panel_dir(os.path.dirname(store_dir), interval), fingerprint)
+    if mapped is not None:
+        return mapped, None
+    return _read_store_panel(interval, store_dir, fingerprint)
+
+
+def write_panel(interval: str, snapshot_dir: str, base_dir: str | None = None) -> None:
+    """Write the panel of ``interval`` into an unpublished snapshot.
+
+    Hard-linked from ``base_dir`` (the previous snapshot) when its panel was
+    built from the same bars.
+    """
+    store_dir = store_dir_in(snapshot_dir, interval)
+    fingerprint = ("store", store_fingerprint(store_dir))
+    out_dir = panel_dir(snapshot_dir, interval)
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    if base_dir is not None and \
+            _read_mapped_panel(panel_dir(base_dir, interval), fingerprint) is not None:
+        link_tree(panel_dir(base_dir, interval), out_dir)
+        return
+
+    panel, error = _read_store_panel(interval, store_dir, fingerprint)
+    if panel is None:
+        raise RuntimeError(error)
+    os.makedirs(out_dir)
+    save_npy(os.path.join(out_dir, "dates.npy"), panel.benchmark.index.as_unit("ns").asi8)
+    save_npy(os.path.join(out_dir, "benchmark.npy"),
+             np.ascontiguousarray(panel.benchmark.to_numpy(dtype=np.float64)))
+    save_npy(os.path.join(out_dir, "closes.npy"),
+             np.ascontiguousarray(panel.closes.to_numpy(dtype=np.float64)))
+    save_json(os.path.join(out_dir, PANEL_FILE),
+              {"symbols": list(panel.closes.columns), "rows": len(panel.benchmark),
+                "index_name": panel.benchmark.index.name, "fingerprint": fingerprint[1]})
+
+
+def sector_intervals(snapshot_dir: str) -> list[str]:
+    """Sector folders of a snapshot: daily, 1h and their derived intervals (no universes)."""
+    intervals = []
+    for name in sorted(os.listdir(snapshot_dir)):
+        store_dir = os.path.join(snapshot_dir, name)
+        if name.startswith(UNIVERSE_PREFIX) or not has_store(store_dir):
+            continue
+        if name in INTERVALS or name in DERIVED or read_meta(store_dir).get("rule"):
+            intervals.append(name)
+    return intervals
+
+
+def write_panels(snapshot_dir: str, base_dir: str | None = None) -> list[str]:
+    """Panels of every sector interval (stored and derived) of an unpublished snapshot.
+
+    Called by ``SnapshotWriter.publish`` on the staging folder, so published
+    snapshots are never modified. Universes are read in chunks from their own
+    store instead (universe.py). Returns the intervals written.
+    """
+    intervals = sector_intervals(snapshot_dir)
+    for interval in intervals:
+        write_panel(interval, snapshot_dir, base_dir)
+    return intervals
+
+
+# ---------------------------------------------------------------------------
+# Panel RRG (all symbols in one vectorized pass)
+# ---------------------------------------------------------------------------
+
+def ema_alpha_2d(values: np.ndarray, period: int) -> np.ndarray:
+    """Column-wise ema_alpha over a dates x symbols array.
+
+    NaNs are skipped (``ignore_na=True``), so every column is smoothed exactly
+    as ``ema_alpha`` would smooth it after ``dropna()``. NaN input stays NaN.
+    """
+    smooth = pd.DataFrame(values, copy=False).ewm(alpha=1/period, adjust=False,
+                                                  ignore_na=True).mean().to_numpy()
+    return np.where(np.isnan(values), np.nan, smooth)
+
+
+def rrg_arrays(closes: np.ndarray, benchmark: np.ndarray,
+               rs_period: int, mom_period: int) -> tuple[np.ndarray, np.ndarray]:
+    """Array form of ``compute_rrg`` for a dates x symbols close matrix.
+
+    ``benchmark`` is the close vector on the same dates. Returns
+    (rs_ratio, rs_momentum) arrays shaped like ``closes``.
+    """
+    rs = closes / benchmark[:, None]
+
+    rs_smooth = ema_alpha_2d(rs, rs_period)
+    rs_ratio = CENTER + ((rs - rs_smooth) / rs_smooth) * CENTER
+
+    ratio_smooth = ema_alpha_2d(rs_ratio, mom_period)
+    rs_momentum = CENTER + ((rs_ratio - ratio_smooth) / ratio_smooth) * CENTER
+    return rs_ratio, rs_momentum
+
+
+@dataclass
+class RRGPanel:
+    """Array-backed RRG result for every symbol of a panel.
+
+    ``rs_ratio`` and ``rs_momentum`` are dates x symbols arrays aligned on
+    ``dates``; a row is valid for a symbol where both values are not NaN.
+    """
+    dates: pd.DatetimeIndex
+    symbols: list[str]
+    rs_ratio: np.ndarray
+    rs_momentum: np.ndarray
+    valid: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.valid = ~(np.isnan(self.rs_ratio) | np.isnan(self.rs_momentum))
+
+    def frame(self, name: str) -> pd.DataFrame:
+        """Result for one symbol, identical to ``compute_rrg`` output."""
+        col = self.symbols.index(name)
+        mask = self.valid[:, col]
+        return pd.DataFrame({"rs_ratio": self.rs_ratio[mask, col],
+                             "rs_momentum": self.rs_momentum[mask, col]},
+                            index=self.dates[mask])
+
+
+def compute_rrg_panel(panel: PricePanel, rs_period: int, mom_period: int) -> RRGPanel:
+    """Compute RS-Ratio and RS-Momentum for all sectors of ``panel`` at once."""
+    closes = panel.closes.to_numpy(dtype=np.float64)
+    benchmark = panel.benchmark.to_numpy(dtype=np.float64)
+    rs_ratio, rs_momentum = rrg_arrays(closes, benchmark, rs_period, mom_period)
+    return RRGPanel(panel.closes.index, list(panel.closes.columns), rs_ratio, rs_momentum)
+
+
+# ---------------------------------------------------------------------------
+# Incremental RRG (resume the Wilder recursions over appended bars only)
+# ---------------------------------------------------------------------------
+
+RRG_STATES_PER_INTERVAL = 2    # settings kept per interval (each holds its full-history arrays)
+
+
+@dataclass
+class RRGState:
+    """Smoothing state of every panel column after the first ``n_rows`` rows.
+
+    NaN means the column has not started yet. Kept one row behind the end
+    of the data, so a revised (or still forming) last bar is recomputed.
+    """
+    n_rows: int
+    rs_smooth: np.ndarray
+    ratio_smooth: np.ndarray
+
+
+def ema_alpha_resume(values: np.ndarray, period: int,
+                     state: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Continue ``ema_alpha_2d`` from ``state`` over the rows of ``values``.
+
+    Same arithmetic as pandas' ewm kernel (adjust=False, ignore_na=True),
+    so resuming gives bit-identical results to a full recompute.
+    Returns (smoothed rows, new state).
+    """
+    alpha = 1. / (1. + (1 - 1/period) / (1/period))   # pandas goes via com
+    old_wt = 1. - alpha
+    weighted = state.copy()
+    out = np.full(values.shape, np.nan)
+    for i, cur in enumerate(values):
+        is_obs = cur == cur
+        started = weighted == weighted
+        step = is_obs & started & (weighted != cur)
+        weighted = np.where(step, (old_wt * weighted + alpha * cur) / (old_wt + alpha), weighted)
+        weighted = np.where(is_obs & ~started, cur, weighted)
+        out[i] = np.where(is_obs, weighted, np.nan)
+    return out, weighted
+
+
+def _last_valid(values: np.ndarray, n_rows: int) -> np.ndarray:
+    """Per column, the last non-NaN value among the first ``n_rows`` rows (NaN if none)."""
+    head = values[:n_rows]
+    if n_rows == 0:
+        return np.full(values.shape[1], np.nan)
+    rows = np.where(np.isnan(head), -1, np.arange(n_rows)[:, None]).max(axis=0)
+    picked = head[np.maximum(rows, 0), np.arange(values.shape[1])]
+    return np.where(rows >= 0, picked, np.nan)
+
+
+def rrg_arrays_with_state(closes: np.ndarray, benchmark: np.ndarray,
+                          rs_period: int, mom_period: int, behind: int = 1):
+    """``rrg_arrays`` plus the state needed to resume it ``behind`` rows before the end."""
+    rs = closes / benchmark[:, None]
+    rs_smooth = ema_alpha_2d(rs, rs_period)
+    rs_ratio = CENTER + ((rs - rs_smooth) / rs_smooth) * CENTER
+    ratio_smooth = ema_alpha_2d(rs_ratio, mom_period)
+    rs_momentum = CENTER + ((rs_ratio - ratio_smooth) / ratio_smooth) * CENTER
+
+    n = max(len(closes) - behind, 0)
+    state = RRGState(n, _last_valid(rs_smooth, n), _last_valid(ratio_smooth, n))
+    return rs_ratio, rs_momentum, state
+
+
+def _advance(rs: np.ndarray, rs_period: int, mom_period: int,
+             rs_state: np.ndarray, ratio_state: np.ndarray):
+    rs_smooth, rs_state = ema_alpha_resume(rs, rs_period, rs_state)
+    rs_ratio = CENTER + ((rs - rs_smooth) / rs_smooth) * CENTER
+    ratio_smooth, ratio_state = ema_alpha_resume(rs_ratio, mom_period, ratio_state)
+    rs_momentum = CENTER + ((rs_ratio - ratio_smooth) / ratio_smooth) * CENTER
+    return rs_ratio, rs_momentum, rs_state, ratio_state
+
+
+def resume_rrg_arrays(closes: np.ndarray, benchmark: np.ndarray,
+                      rs_period: int, mom_period: int, state: RRGState):
+    """RRG for the rows of ``closes`` after ``state.n_rows``, advanced from ``state``.
+
+    Returns (rs_ratio, rs_momentum) of those rows only, and the new state.
+    Cost is O(new rows) - history is not touched.
+    """
+    rs = closes[state.n_rows:] / benchmark[state.n_rows:, None]
+    # Up to the new checkpoint (one row before the end), then the last row
+    ratio_a, mom_a, rs_state, ratio_state = _advance(rs[:-1], rs_period, mom_period,
+                                                     state.rs_smooth, state.ratio_smooth)
+    ratio_b, mom_b, _, _ = _advance(rs[-1:], rs_period, mom_period, rs_state, ratio_state)
+
+    next_state = RRGState(max(len(closes) - 1, state.n_rows), rs_state, ratio_state)
+    return (np.concatenate([ratio_a, ratio_b]), np.concatenate([mom_a, mom_b]), next_state)
+
+
+def _extends(old: PricePanel, new: PricePanel, n_rows: int) -> bool:
+    """True when ``new`` has the same first ``n_rows`` rows as ``old`` (bars only appended)."""
+    if list(old.closes.columns) != list(new.closes.columns) or len(new.benchmark) < n_rows:
+        return False
+    if not old.benchmark.index[:n_rows].equals(new.benchmark.index[:n_rows]):
+        return False
+    return (np.array_equal(old.benchmark.to_numpy()[:n_rows], new.benchmark.to_numpy()[:n_rows])
+            and np.array_equal(old.closes.to_numpy()[:n_rows], new.closes.to_numpy()[:n_rows],
+                               equal_nan=True))
+
+
+_rrg_states: OrderedDict = OrderedDict()
+_rrg_lock = threading.Lock()
+
+
+def update_rrg_panel(key: tuple, panel: PricePanel, rs_period: int, mom_period: int) -> RRGPanel:
+    """``compute_rrg_panel`` that resumes from the state kept under ``key``.
+
+    ``key`` identifies the series, e.g. (interval, rs_period, mom_period).
+    When ``panel`` only appends bars to the panel seen last time for ``key``,
+    just the new bars (and the previous last bar) are computed; otherwise
+    it falls back to a full recompute. Either way the result equals
+    ``compute_rrg_panel(panel, ...)``. The last ``RRG_STATES_PER_INTERVAL``
+    keys per interval (``key[0]``) are kept in memory, ~2.5 MB each on daily.
+    """
+    with _rrg_lock:
+        cached = _rrg_states.get(key)
+        if cached is not None:
+            _rrg_states.move_to_end(key)
+
+    closes = panel.closes.to_numpy(dtype=np.float64)
+    benchmark = panel.benchmark.to_numpy(dtype=np.float64)
+    symbols = list(panel.closes.columns)
+
+    if cached is not None:
+        old_panel, old_result, state = cached
+        if old_panel.fingerprint == panel.fingerprint:
+            return old_result
+        if _extends(old_panel, panel, state.n_rows):
+            rs_ratio, rs_momentum, state = resume_rrg_arrays(closes, benchmark, rs_period,
+                                                             mom_period, state)
+            n = len(closes) - len(rs_ratio)
+            result = RRGPanel(panel.closes.index, symbols,
+                              np.concatenate([old_result.rs_ratio[:n], rs_ratio]),
+                              np.concatenate([old_result.rs_momentum[:n], rs_momentum]))
+            _store_state(key, panel, result, state)
+            return result
+
+    rs_ratio, rs_momentum, state = rrg_arrays_with_state(closes, benchmark, rs_period, mom_period)
+    result = RRGPanel(panel.closes.index, symbols, rs_ratio, rs_momentum)
+    _store_state(key, panel, result, state)
+    return result
+
+
+def _store_state(key, panel, result, state):
+    with _rrg_lock:
+        _rrg_states[key] = (panel, result, state)
+        _rrg_states.move_to_end(key)
+        same = [k for k in _rrg_states if k[0] == key[0]]     # oldest first
+        for old in same[:-RRG_STATES_PER_INTERVAL]:
+            del _rrg_states[old]
+
+
+def sector_filter(n_bars: np.ndarray, n_valid: np.ndarray,
+                  rs_period: int, mom_period: int) -> np.ndarray:
+    """Columns with enough history to be shown (per-column bar and RRG point counts)."""
+    return (n_bars >= rs_period + mom_period + WARMUP_EXTRA) & (n_valid >= MIN_VALID)
+
+
+def _compute(panel: PricePanel, rs_period: int, mom_period: int,
+             interval: str | None) -> RRGPanel:
+    with span("rrg_panel"):
+        if interval is None:
+            return compute_rrg_panel(panel, rs_period, mom_period)
+        return update_rrg_panel((interval, rs_period, mom_period), panel, rs_period, mom_period)
+
+
+def compute_all_sectors(panel: PricePanel, rs_period: int, mom_period: int,
+                        interval: str | None = None):
+    """Compute RRG for every sector of ``panel``. Returns (dict, error_msg|None).
+
+    With ``interval`` the result is updated incrementally from the previous
+    panel of that interval (see ``update_rrg_panel``).
+    """
+    errors = list(panel.errors)
+    try:
+        result = _compute(panel, rs_period, mom_period, interval)
+    except Exception as e:
+        errors.append(f"RRG: {e}")
+        return {}, f"All sectors failed. First errors: {errors[:3]}"
+
+    n_bars = np.count_nonzero(~np.isnan(panel.closes.to_numpy()), axis=0)
+    n_valid = np.count_nonzero(result.valid, axis=0)
+    shown = sector_filter(n_bars, n_valid, rs_period, mom_period)
+
+    sectors = {name: result.frame(name) for col, name in enumerate(result.symbols) if shown[col]}
+    if not sectors and errors:
+        return {}, f"All sectors failed. First errors: {errors[:3]}"
+    return sectors, None
+
+
+# ---------------------------------------------------------------------------
+# Tail payload (what the UI actually draws)
+# ---------------------------------------------------------------------------
+
+def tail_rows(valid: np.ndarray, max_tail: int = MAX_TAIL) -> np.ndarray:
+    """Row numbers of the last ``max_tail`` valid rows per column, right-aligned, -1 padded."""
+    rows = np.full((max_tail, valid.shape[1]), -1, dtype=np.int64)
+    if not len(valid):
+        return rows
+    seen = np.cumsum(valid, axis=0)
+    after = seen[-1] - seen            # valid rows below each row, per column
+    r, c = np.nonzero(valid & (after < max_tail))
+    rows[max_tail - 1 - after[r, c], c] = r
+    return rows
+
+
+def take_rows(values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """``values[rows[k, c], c]`` for every cell of ``rows``; NaN where ``rows`` is -1."""
+    out = values[np.maximum(rows, 0), np.arange(values.shape[1])]
+    return np.where(rows >= 0, out, np.nan)
+
+
+@dataclass
+class RRGTails:
+    """The last ``MAX_TAIL`` RRG points of every shown sector.
+
+    Arrays are max_tail x sectors with the latest point in the last row;
+    sectors with fewer points are padded at the top with NaN / NaT. A few
+    tens of KB instead of the full history - that stays in the engine.
+    """
+    symbols: list[str]
+    dates: np.ndarray          # datetime64
+    rs_ratio: np.ndarray
+    rs_momentum: np.ndarray
+    latest: pd.Timestamp | None = field(init=False)
+
+    def __post_init__(self):
+        self.latest = pd.Timestamp(self.dates[-1].max()) if self.symbols else None
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def take(self, names: list[str]) -> "RRGTails":
+        """The tails of ``names`` only, in that order."""
+        cols = [self.symbols.index(name) for name in names]
+        return RRGTails(list(names), self.dates[:, cols], self.rs_ratio[:, cols],
+                        self.rs_momentum[:, cols])
+
+    def tail(self, name: str, length: int):
+        """(dates, rs_ratio, rs_momentum) of the last ``length`` points of ``name``."""
+        col = self.symbols.index(name)
+        dates = self.dates[-length:, col]
+        keep = ~np.isnat(dates)
+        return (pd.DatetimeIndex(dates[keep]), self.rs_ratio[-length:, col][keep],
+                self.rs_momentum[-length:, col][keep])
+
+
+def compute_sector_tails(panel: PricePanel, rs_period: int, mom_period: int,
+                         interval: str | None = None, max_tail: int = MAX_TAIL):
+    """Like ``compute_all_sectors`` but returns only the tails. Returns (RRGTails|None, error_msg|None)."""
+    errors = list(panel.errors)
+    try:
+        result = _compute(panel, rs_period, mom_period, interval)
+    except Exception as e:
+        errors.append(f"RRG: {e}")
+        return None, f"All sectors failed. First errors: {errors[:3]}"
+
+    n_bars = np.count_nonzero(~np.isnan(panel.closes.to_numpy()), axis=0)
+    tails = rrg_tails(result, n_bars, rs_period, mom_period, max_tail)
+    if not len(tails) and errors:
+        return None, f"All sectors failed. First errors: {errors[:3]}"
+    return tails, None
+
+
+def rrg_tails(result: RRGPanel, n_bars: np.ndarray, rs_period: int, mom_period: int,
+              max_tail: int = MAX_TAIL) -> RRGTails:
+    """Tails of the symbols of ``result`` that pass ``sector_filter``.
+
+    ``n_bars`` is the number of price bars per symbol of ``result``.
+    """
+    n_valid = np.count_nonzero(result.valid, axis=0)
+    cols = np.flatnonzero(sector_filter(n_bars, n_valid, rs_period, mom_period))
+    rows = tail_rows(result.valid[:, cols], max_tail)
+    dates = result.dates.to_numpy()[np.maximum(rows, 0)] if len(result.dates) else rows.astype("datetime64[ns]")
+    return RRGTails([result.symbols[c] for c in cols],
+                    np.where(rows >= 0, dates, np.datetime64("NaT")),
+                    take_rows(result.rs_ratio[:, cols], rows),
+                    take_rows(result.rs_momentum[:, cols], rows))
+
+
+# ---------------------------------------------------------------------------
+# Replay (rotation history indexed by end date)
+# ---------------------------------------------------------------------------
+
+@dataclass
+class RRGHistory:
+    """Full RRG history of every sector, indexed for replaying any end date.
+
+    ``rank[i, c]`` counts the RRG points of sector ``c`` up to row ``i`` and
+    ``point_rows[k, c]`` is the row of its k-th point, so the tails as of
+    any row are one gather (``tails_at``) instead of a recompute. The JdK
+    smoothing only looks back, so they equal ``compute_sector_tails`` run
+    on the panel cut off at that row.
+    """
+    dates: np.ndarray          # datetime64, T
+    symbols: list[str]
+    rs_ratio: np.ndarray       # T x sectors
+    rs_momentum: np.ndarray
+    n_bars: np.ndarray         # price bars up to each row, T x sectors
+    rank: np.ndarray
+    point_rows: np.ndarray     # -1 padded
+    rs_period: int
+    mom_period: int
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def index_at(self, when) -> int:
+        """Row of the last bar at or before ``when`` (-1 if before the first bar)."""
+        return int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(when)), side="right")) - 1
+
+    def frame_rows(self, end_row: int, frames: int, step: int = 1) -> np.ndarray:
+        """Rows of ``frames`` end dates ``step`` bars apart up to ``end_row``, oldest first."""
+        rows = np.arange(end_row - step * (frames - 1), end_row + 1, step)
+        return rows[rows >= 0]
+
+    def tails_at(self, row: int, max_tail: int = MAX_TAIL) -> RRGTails:
+        """The tails shown as of ``row``, like ``compute_sector_tails`` on the data up to it."""
+        rank = self.rank[row]
+        cols = np.flatnonzero(sector_filter(self.n_bars[row], rank,
+                                            self.rs_period, self.mom_period))
+        k = rank[cols] - max_tail + np.arange(max_tail)[:, None]
+        rows = np.where(k >= 0, self.point_rows[np.maximum(k, 0), cols], -1)
+        safe = np.maximum(rows, 0)
+        return RRGTails([self.symbols[c] for c in cols],
+                        np.where(rows >= 0, self.dates[safe], np.datetime64("NaT")),
+                        np.where(rows >= 0, self.rs_ratio[safe, cols], np.nan),
+                        np.where(rows >= 0, self.rs_momentum[safe, cols], np.nan))
+
+
+def compute_rrg_history(panel: PricePanel, rs_period: int, mom_period: int,
+                        interval: str | None = None):
+    """Index the full RRG of ``panel`` for replay. Returns (RRGHistory|None, error_msg|None)."""
+    try:
+        result = _compute(panel, rs_period, mom_period, interval)
+    except Exception as e:
+        return None, f"RRG: {e}"
+
+    valid = result.valid
+    rank = np.cumsum(valid, axis=0, dtype=np.int32)
+    point_rows = np.full(valid.shape, -1, dtype=np.int32)
+    r, c = np.nonzero(valid)
+    point_rows[rank[r, c] - 1, c] = r
+    n_bars = np.cumsum(~np.isnan(panel.closes.to_numpy()), axis=0, dtype=np.int32)
+    return RRGHistory(result.dates.to_numpy(), list(result.symbols), result.rs_ratio,
+                      result.rs_momentum, n_bars, rank, point_rows, rs_period, mom_period), None
+
+
+def load_history(interval: str, rs_period: int, mom_period: int):
+    """Replay history of every sector. Returns (RRGHistory|None, error_msg|None)."""
+    panel, error = load_price_panel(interval)
+    if panel is None:
+        return None, error
+    return compute_rrg_history(panel, rs_period, mom_period, interval)
+
+
+# ---------------------------------------------------------------------------
+# Quadrants
+# ---------------------------------------------------------------------------
+
+QUADRANTS = ["leading", "weakening", "lagging", "improving"]
+
+
+def quadrant_codes(rs_ratio: np.ndarray, rs_momentum: np.ndarray) -> np.ndarray:
+    """Index into QUADRANTS per point (-1 where a value is NaN)."""
+    strong = rs_ratio >= CENTER
+    rising = rs_momentum >= CENTER
+    codes = np.where(strong, np.where(rising, 0, 1), np.where(rising, 3, 2))
+    return np.where(np.isnan(rs_ratio) | np.isnan(rs_momentum), -1, codes)
@@ -0,0 +1,341 @@
+"""
+RRG Events - quadrant transitions of every sector, detected as bars arrive
+
+A sector crossing from one quadrant of the chart to the next (leading ->
+weakening -> lagging -> improving) is an event. ``scan_transitions`` finds
+all of them in a block of RRG rows at once (numpy, no per-sector loop) and
+measures the rotation at each crossing:
+
+    angle              position around the centre, degrees counter-clockwise
+                       from the RS-Ratio axis (leading 0-90, improving 90-180,
+                       lagging 180-270, weakening 270-360)
+    angular_velocity   change of that angle since the previous point, degrees
+                       per bar; negative = clockwise, the usual rotation
+    speed              distance moved since the previous point, per bar
+
+Events are kept in a SQLite table (data/events.db) that the app, the API
+and alerting jobs query with an index on the date. ``update_events`` runs
+after every published fetch and only scans the rows after the last
+checkpoint; the checkpoint stays one bar behind the end of the data, so a
+revised (still forming) last bar is rescanned and its events replaced.
+Periods are the app's defaults per interval (WATCH).
+
+Usage:
+    python rrg_events.py update                  # scan new bars of every interval
+    python rrg_events.py rebuild --interval daily
+    python rrg_events.py list --interval daily --since 2025-01-01 --sector BANK
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from data_store import DATA_DIR
+from rrg_engine import (CENTER, MIN_VALID, QUADRANTS, WARMUP_EXTRA, load_price_panel,
+                        quadrant_codes, update_rrg_panel)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+EVENTS_DB = os.path.join(DATA_DIR, "events.db")
+WATCH = {                       # interval -> (rs_period, mom_period), the app's defaults
+    "monthly": (6, 6),
+    "weekly": (8, 8),
+    "daily": (10, 10),
+    "1h": (10, 10),
+}
+COLUMNS = ["symbol", "date", "from_quadrant", "to_quadrant", "rs_ratio", "rs_momentum",
+           "angle", "angular_velocity", "speed"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    interval TEXT NOT NULL,
+    rs_period INTEGER NOT NULL,
+    mom_period INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    from_quadrant TEXT NOT NULL,
+    to_quadrant TEXT NOT NULL,
+    rs_ratio REAL NOT NULL,
+    rs_momentum REAL NOT NULL,
+    angle REAL NOT NULL,
+    angular_velocity REAL NOT NULL,
+    speed REAL NOT NULL,
+    PRIMARY KEY (interval, rs_period, mom_period, symbol, date)
+);
+CREATE INDEX IF NOT EXISTS events_by_date ON events (interval, rs_period, mom_period, date);
+CREATE TABLE IF NOT EXISTS scans (
+    interval TEXT NOT NULL,
+    rs_period INTEGER NOT NULL,
+    mom_period INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    updated TEXT NOT NULL,
+    PRIMARY KEY (interval, rs_period, mom_period)
+);
+"""
+
+
+# ---------------------------------------------------------------------------
+# Vectorized scan
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ScanState:
+    """Where a scan stopped: the checkpoint row's date and values, and per
+    sector the last point and the bar / point counts up to it."""
+    date: str                   # ISO date of the checkpoint row
+    symbols: list[str]
+    check: np.ndarray           # rs_ratio of the checkpoint row (detects revised history)
+    rs_ratio: np.ndarray        # last point per sector, NaN if none yet
+    rs_momentum: np.ndarray
+    age: np.ndarray             # rows from that point to the checkpoint row
+    n_bars: np.ndarray
+    n_points: np.ndarray
+
+    def to_json(self) -> str:
+        return json.dumps({"date": self.date, "symbols": self.symbols,
+                           "check": self.check.tolist(), "rs_ratio": self.rs_ratio.tolist(),
+                           "rs_momentum": self.rs_momentum.tolist(), "age": self.age.tolist(),
+                           "n_bars": self.n_bars.tolist(), "n_points": self.n_points.tolist()})
+
+    @classmethod
+    def from_json(cls, text: str) -> "ScanState":
+        d = json.loads(text)
+        floats = {k: np.array(d[k], dtype=np.float64) for k in ("check", "rs_ratio", "rs_momentum")}
+        ints = {k: np.array(d[k], dtype=np.int64) for k in ("age", "n_bars", "n_points")}
+        return cls(d["date"], d["symbols"], **floats, **ints)
+
+
+def _iso(dates) -> np.ndarray:
+    return np.datetime_as_string(np.asarray(dates, dtype="datetime64[s]"), unit="s")
+
+
+def _angle(x, y) -> np.ndarray:
+    return np.degrees(np.arctan2(y - CENTER, x - CENTER)) % 360
+
+
+def scan_transitions(dates, symbols: list[str], rs_ratio: np.ndarray, rs_momentum: np.ndarray,
+                     has_bar: np.ndarray, rs_period: int, mom_period: int,
+                     state: ScanState | None = None):
+    """Quadrant transitions in a block of rows. Returns (events DataFrame, ScanState|None).
+
+    ``rs_ratio`` / ``rs_momentum`` / ``has_bar`` (price bar present) are rows x
+    sectors for ``dates``, continuing after ``state`` (None: the start of the
+    data). Only sectors the chart would show at that row count (see
+    ``rrg_engine.sector_filter``). The returned state is at the second to last
+    row (None when the block has fewer than two rows and there is no state).
+    """
+    n_cols = len(symbols)
+    if state is None:
+        state = ScanState("", list(symbols), np.full(n_cols, np.nan), np.full(n_cols, np.nan),
+                          np.full(n_cols, np.nan), np.zeros(n_cols, np.int64),
+                          np.zeros(n_cols, np.int64), np.zeros(n_cols, np.int64))
+    # The previous point of every sector goes in front of the block as row 0
+    x = np.vstack([state.rs_ratio, rs_ratio])
+    y = np.vstack([state.rs_momentum, rs_momentum])
+    valid = ~(np.isnan(x) | np.isnan(y))
+    n_bars = state.n_bars + np.cumsum(has_bar, axis=0)
+    n_points = state.n_points + np.cumsum(valid[1:], axis=0)
+
+    # Row of the previous valid point, for every row
+    rows = np.arange(len(x))[:, None]
+    last = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+    prev = last[:-1]
+
+    codes = quadrant_codes(x, y)
+    cols = np.arange(n_cols)
+    shown = (n_bars >= rs_period + mom_period + WARMUP_EXTRA) & (n_points >= MIN_VALID)
+    crossed = valid[1:] & (prev >= 0) & shown & \
+        (codes[1:] != codes[np.maximum(prev, 0), cols])
+    r, c = np.nonzero(crossed)
+    p = prev[r, c]
+    x0, y0, x1, y1 = x[p, c], y[p, c], x[r + 1, c], y[r + 1, c]
+    turn = (_angle(x1, y1) - _angle(x0, y0) + 180) % 360 - 180
+    steps = r + 1 - p + np.where(p == 0, state.age[c], 0)     # bars since the previous point
+    order = np.lexsort((c, r))
+    events = pd.DataFrame({
+        "symbol": np.asarray(symbols, dtype=object)[c],
+        "date": _iso(np.asarray(dates)[r]),
+        "from_quadrant": np.asarray(QUADRANTS, dtype=object)[codes[p, c]],
+        "to_quadrant": np.asarray(QUADRANTS, dtype=object)[codes[r + 1, c]],
+        "rs_ratio": x1, "rs_momentum": y1, "angle": _angle(x1, y1),
+        "angular_velocity": turn / steps,
+        "speed": np.hypot(x1 - x0, y1 - y0) / steps,
+    }, columns=COLUMNS).iloc[order].reset_index(drop=True)
+
+    if len(dates) < 2:
+        return events, (state if state.date else None)
+    k = len(dates) - 2
+    at = last[k + 1]                       # last point up to the checkpoint row
+    has = at >= 0
+    next_state = ScanState(
+        str(_iso(np.asarray(dates)[k:k + 1])[0]), list(symbols), rs_ratio[k].copy(),
+        np.where(has, x[np.maximum(at, 0), cols], np.nan),
+        np.where(has, y[np.maximum(at, 0), cols], np.nan),
+        np.where(has, k + 1 - at + np.where(at == 0, state.age, 0), 0),
+        n_bars[k].astype(np.int64), n_points[k].astype(np.int64))
+    return events, next_state
+
+
+# ---------------------------------------------------------------------------
+# SQLite store
+# ---------------------------------------------------------------------------
+
+def connect(db_path: str = EVENTS_DB) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    # Default rollback journal, not WAL: readers (app, API) mount data/ read-only
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _load_state(conn, key: tuple) -> ScanState | None:
+    row = conn.execute("SELECT state FROM scans WHERE interval=? AND rs_period=? AND mom_period=?",
+                       key).fetchone()
+    return ScanState.from_json(row[0]) if row else None
+
+
+def _resume_row(state: ScanState | None, symbols: list[str], iso_dates: np.ndarray,
+                rs_ratio: np.ndarray) -> int:
+    """First row to scan after ``state``; -1 when the history changed under it."""
+    if state is None:
+        return 0
+    if state.symbols != symbols:
+        return -1
+    row = int(np.searchsorted(iso_dates, state.date))
+    if row >= len(iso_dates) or iso_dates[row] != state.date or \
+            not np.array_equal(rs_ratio[row], state.check, equal_nan=True):
+        return -1
+    return row + 1
+
+
+def update_events(interval: str, rs_period: int | None = None, mom_period: int | None = None,
+                  rebuild: bool = False, db_path: str = EVENTS_DB) -> dict:
+    """Scan the bars of ``interval`` not scanned yet and store their events.
+
+    Returns a report: interval, rows scanned, events added, status.
+    """
+    rs_period, mom_period = (rs_period, mom_period) if rs_period else WATCH[interval]
+    key = (interval, rs_period, mom_period)
+    report = {"interval": interval, "rows": 0, "events": 0, "status": "ok"}
+    panel, error = load_price_panel(interval)
+    if panel is None:
+        return dict(report, status="failed", error=error)
+    result = update_rrg_panel(key, panel, rs_period, mom_period)
+    iso_dates = _iso(result.dates.to_numpy())
+    has_bar = ~np.isnan(panel.closes.to_numpy())
+
+    conn = connect(db_path)
+    try:
+        with conn:
+            state = None if rebuild else _load_state(conn, key)
+            start = _resume_row(state, result.symbols, iso_dates, result.rs_ratio)
+            if start < 0:
+                state, start = None, 0
+                report["status"] = "rescanned"
+            if state is None:
+                conn.execute("DELETE FROM events WHERE interval=? AND rs_period=? "
+                             "AND mom_period=?", key)
+            else:
+                # Events after the checkpoint came from a bar that may have been revised
+                conn.execute("DELETE FROM events WHERE interval=? AND rs_period=? "
+                             "AND mom_period=? AND date>?", key + (state.date,))
+            events, next_state = scan_transitions(
+                result.dates[start:], result.symbols, result.rs_ratio[start:],
+                result.rs_momentum[start:], has_bar[start:], rs_period, mom_period, state)
+            conn.executemany(f"INSERT OR REPLACE INTO events VALUES ({','.join('?' * 12)})",
+                             [key + row for row in events.itertuples(index=False, name=None)])
+            if next_state is not None:
+                conn.execute("INSERT OR REPLACE INTO scans VALUES (?, ?, ?, ?, ?)",
+                             key + (next_state.to_json(), pd.Timestamp.now().isoformat()))
+    finally:
+        conn.close()
+    return dict(report, rows=len(iso_dates) - start, events=len(events))
+
+
+def update_all_events(intervals=WATCH, db_path: str = EVENTS_DB, logger=None) -> list[dict]:
+    """``update_events`` for every watched interval; failures are reported, not raised."""
+    reports = []
+    for interval in intervals:
+        t0 = time.perf_counter()
+        try:
+            report = update_events(interval, db_path=db_path)
+        except Exception as e:
+            report = {"interval": interval, "rows": 0, "events": 0, "status": "failed",
+                      "error": str(e)}
+        reports.append(report)
+        if logger and report["status"] == "failed":
+            logger(f"  [FAIL] Events {interval}: {report['error']}")
+        elif logger:
+            logger(f"  [OK] Events {interval}: {report['events']} from {report['rows']} rows "
+                   f"({time.perf_counter() - t0:.2f}s)")
+    return reports
+
+
+def recent_events(interval: str, rs_period: int | None = None, mom_period: int | None = None,
+                  since=None, symbols=None, limit: int = 100,
+                  db_path: str = EVENTS_DB) -> pd.DataFrame:
+    """Stored events of ``interval``, newest first (empty when none were stored)."""
+    rs_period, mom_period = (rs_period, mom_period) if rs_period else WATCH[interval]
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=COLUMNS)
+    sql = f"SELECT {', '.join(COLUMNS)} FROM events WHERE interval=? AND rs_period=? AND mom_period=?"
+    params = [interval, rs_period, mom_period]
+    if since is not None:
+        sql += " AND date>=?"
+        params.append(pd.Timestamp(since).isoformat())
+    if symbols:
+        sql += f" AND symbol IN ({','.join('?' * len(symbols))})"
+        params += list(symbols)
+    sql += " ORDER BY date DESC, symbol LIMIT ?"
+    params.append(limit)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Quadrant transition events")
+    parser.add_argument("command", choices=["update", "rebuild", "list"])
+    parser.add_argument("--interval", choices=list(WATCH) + ["all"], default="all")
+    parser.add_argument("--since", help="Only events from this date (list)")
+    parser.add_argument("--sector", action="append", help="Only this sector (list, repeatable)")
+    parser.add_argument("--limit", type=int, default=50, help="Number of events (list)")
+    args = parser.parse_args()
+
+    intervals = list(WATCH) if args.interval == "all" else [args.interval]
+    if args.command in ("update", "rebuild"):
+        for interval in intervals:
+            t0 = time.perf_counter()
+            report = update_events(interval, rebuild=args.command == "rebuild")
+            if report["status"] == "failed":
+                print(f"[FAIL] {interval}: {report['error']}")
+                continue
+            print(f"[OK] {interval}: {report['events']} events from {report['rows']} rows "
+                  f"in {time.perf_counter() - t0:.2f}s ({report['status']})")
+        return
+
+    for interval in intervals:
+        events = recent_events(interval, since=args.since, symbols=args.sector, limit=args.limit)
+        print(f"{interval} (RS {WATCH[interval][0]} / Mom {WATCH[interval][1]}): "
+              f"{len(events)} events")
+        for e in events.itertuples():
+            print(f"  {e.date:<19} {e.symbol:<8} {e.from_quadrant:>9} -> {e.to_quadrant:<9} "
+                  f"angle {e.angle:5.0f}  {e.angular_velocity:+6.1f} deg/bar  "
+                  f"speed {e.speed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
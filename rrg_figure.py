@@ -0,0 +1,295 @@
+"""
+RRG figure - Plotly chart of the sector tails.
+
+Kept free of Streamlit so the app and benchmarks can share it.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from perf import timed
+from rrg_engine import CENTER
+
+COLORS = [
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+    "#aec7e8", "#ffbb78", "#98df8a", "#ff9896", "#c5b0d5",
+    "#c49c94", "#f7b6d2", "#c7c7c7", "#dbdb8d", "#9edae5",
+]
+
+# Batched mode draws one line trace per colour of COLORS (a trace has a single
+# line colour), so sectors keep their colour without a trace per sector
+BATCHED_LINE_OPACITY = 0.6
+BATCHED_TRACES = len(COLORS) + 2    # lines per colour, markers, labels
+
+# Marker colours as indices into COLORS - numeric arrays are much cheaper for
+# Plotly to validate than one colour string per point
+COLOR_SCALE = [[i / (len(COLORS) - 1), c] for i, c in enumerate(COLORS)]
+
+SKELETON_CACHE_SIZE = 128   # decorated layouts, one per axis range bucket
+
+HOVER_TEMPLATE = ("<b>%{customdata[0]}</b><br>Date: %{customdata[1]}"
+                  "<br>RS-Ratio: %{x:.2f}<br>RS-Mom: %{y:.2f}<extra></extra>")
+
+FRAME_DURATION = 150        # ms per animation frame when playing
+
+
+@timed("build_figure")
+def build_figure(tails, selected: list[str], tail_length: int,
+                 interval: str = "daily", batched: bool = False) -> go.Figure:
+    """RRG chart of the ``selected`` sectors of ``tails`` (an ``RRGTails``).
+
+    The default draws two traces and a label per sector, with a legend.
+    ``batched`` draws all sectors with a fixed number of traces (a line trace
+    per colour, markers, labels) and per-point hover data, for large
+    selections; sectors keep their colours and are named at the tail head
+    instead of in a legend. The static
+    decorations come from a cached skeleton (see ``skeleton_layout``).
+    """
+    color_map = {name: COLORS[i % len(COLORS)] for i, name in enumerate(sorted(tails.symbols))}
+
+    traces, labels = [], []
+    if batched:
+        all_x, all_y = _batched_traces(traces, tails, sorted(selected), tail_length,
+                                       color_map, interval)
+    else:
+        all_x, all_y = _sector_traces(traces, labels, tails, sorted(selected), tail_length,
+                                      color_map, interval)
+
+    x_lo, x_hi, y_lo, y_hi = _axis_range(all_x, all_y)
+
+    # The skeleton was validated when it was built, the traces on creation
+    layout = skeleton_layout(x_lo, x_hi, y_lo, y_hi)
+    if labels:
+        layout = dict(layout, annotations=labels + layout["annotations"])
+    return go.Figure(data=traces, layout=layout, _validate=False)
+
+
+def _axis_range(all_x, all_y) -> tuple[float, float, float, float]:
+    """Padded axis range, snapped outward so nearby ranges share a skeleton."""
+    if not (len(all_x) and len(all_y)):
+        return 96, 104, 96, 104
+    x_min, x_max = np.min(all_x), np.max(all_x)
+    y_min, y_max = np.min(all_y), np.max(all_y)
+    x_margin = max((x_max - x_min) * 0.15, 0.5)
+    y_margin = max((y_max - y_min) * 0.15, 0.5)
+    return (*bucket_range(x_min - x_margin, x_max + x_margin),
+            *bucket_range(y_min - y_margin, y_max + y_margin))
+
+
+@timed("build_animation")
+def build_animation(history, selected: list[str], tail_length: int, rows,
+                    interval: str = "daily") -> go.Figure:
+    """Animated RRG of the ``selected`` sectors of ``history`` (an ``RRGHistory``).
+
+    One frame per end row in ``rows`` (oldest first), each the batched chart
+    as of that row (``history.tails_at``), on one axis range covering every
+    frame. A play button and a slider scrub the frames in the browser, so
+    the whole replay is sent in one batch.
+    """
+    color_map = {name: COLORS[i % len(COLORS)] for i, name in enumerate(sorted(history.symbols))}
+    date_fmt = "%Y-%m-%d %H:%M" if interval == "1h" else "%Y-%m-%d"
+
+    frames, all_x, all_y = [], [], []
+    for row in rows:
+        tails = history.tails_at(row, tail_length)
+        names = [name for name in sorted(selected) if name in tails.symbols]
+        traces = []
+        x, y = _batched_traces(traces, tails, names, tail_length, color_map, interval)
+        all_x.append(x)
+        all_y.append(y)
+        # Every frame needs the same traces, also before a sector has data
+        traces = traces or [dict(type="scatter", x=[], y=[], showlegend=False)
+                            for _ in range(BATCHED_TRACES)]
+        frames.append(dict(name=pd.Timestamp(history.dates[row]).strftime(date_fmt), data=traces))
+    if not frames:
+        return build_figure(history.tails_at(len(history) - 1, tail_length), selected,
+                            tail_length, interval, batched=True)
+
+    x_lo, x_hi, y_lo, y_hi = _axis_range(np.concatenate(all_x), np.concatenate(all_y))
+    layout = skeleton_layout(x_lo, x_hi, y_lo, y_hi)
+    step_args = dict(mode="immediate", frame=dict(duration=0, redraw=False),
+                     transition=dict(duration=0))
+    play_args = dict(frame=dict(duration=FRAME_DURATION, redraw=False), fromcurrent=True,
+                     transition=dict(duration=0))
+    layout = dict(
+        layout,
+        margin=dict(layout["margin"], b=120),
+        updatemenus=[dict(type="buttons", direction="left", x=0, y=-0.12, xanchor="left",
+                          yanchor="top", showactive=False, buttons=[
+                              dict(label="Play", method="animate", args=[None, play_args]),
+                              dict(label="Pause", method="animate",
+                                   args=[[None], dict(step_args, mode="immediate")]),
+                          ])],
+        sliders=[dict(active=len(frames) - 1, x=0.12, y=-0.08, len=0.88,
+                      currentvalue=dict(prefix="As of "),
+                      steps=[dict(label=f["name"], method="animate",
+                                  args=[[f["name"]], step_args]) for f in frames])],
+    )
+    return go.Figure(data=frames[-1]["data"], layout=layout, frames=frames, _validate=False)
+
+
+def _nice_step(span: float) -> float:
+    """1, 2 or 5 x 10^k closest above ``span`` / 20."""
+    raw = span / 20
+    magnitude = 10 ** np.floor(np.log10(raw))
+    for mult in (1, 2, 5, 10):
+        if mult * magnitude >= raw:
+            return float(mult * magnitude)
+
+
+def bucket_range(lo: float, hi: float) -> tuple[float, float]:
+    """Widen [lo, hi] to multiples of a step of about 5% of its span."""
+    step = _nice_step(hi - lo)
+    return (round(float(np.floor(lo / step) * step), 10),
+            round(float(np.ceil(hi / step) * step), 10))
+
+
+@lru_cache(maxsize=SKELETON_CACHE_SIZE)
+def skeleton_layout(x_lo: float, x_hi: float, y_lo: float, y_hi: float) -> dict:
+    """Layout with the quadrant shading, labels and centre lines for an axis range.
+
+    Built with the validating ``add_*`` helpers once per range bucket; the
+    returned dict is shared, so callers must not modify it.
+    """
+    fig = go.Figure()
+
+    # Quadrant shading
+    fig.add_shape(type="rect", x0=CENTER, x1=x_hi, y0=CENTER, y1=y_hi,
+                  fillcolor="green", opacity=0.06, line_width=0, layer="below")
+    fig.add_shape(type="rect", x0=x_lo, x1=CENTER, y0=CENTER, y1=y_hi,
+                  fillcolor="blue", opacity=0.06, line_width=0, layer="below")
+    fig.add_shape(type="rect", x0=x_lo, x1=CENTER, y0=y_lo, y1=CENTER,
+                  fillcolor="red", opacity=0.06, line_width=0, layer="below")
+    fig.add_shape(type="rect", x0=CENTER, x1=x_hi, y0=y_lo, y1=CENTER,
+                  fillcolor="orange", opacity=0.06, line_width=0, layer="below")
+
+    # Quadrant labels
+    fig.add_annotation(x=x_hi, y=y_hi, text="<b>LEADING</b>", showarrow=False,
+                       xanchor="right", yanchor="top", font=dict(size=14, color="green"), opacity=0.5)
+    fig.add_annotation(x=x_lo, y=y_hi, text="<b>IMPROVING</b>", showarrow=False,
+                       xanchor="left", yanchor="top", font=dict(size=14, color="blue"), opacity=0.5)
+    fig.add_annotation(x=x_lo, y=y_lo, text="<b>LAGGING</b>", showarrow=False,
+                       xanchor="left", yanchor="bottom", font=dict(size=14, color="red"), opacity=0.5)
+    fig.add_annotation(x=x_hi, y=y_lo, text="<b>WEAKENING</b>", showarrow=False,
+                       xanchor="right", yanchor="bottom", font=dict(size=14, color="orange"), opacity=0.5)
+
+    # Centre lines
+    fig.add_hline(y=CENTER, line_dash="dash", line_color="grey", line_width=0.8)
+    fig.add_vline(x=CENTER, line_dash="dash", line_color="grey", line_width=0.8)
+
+    fig.update_layout(
+        xaxis_title="RS-Ratio",
+        yaxis_title="RS-Momentum",
+        xaxis=dict(range=[x_lo, x_hi]),
+        yaxis=dict(range=[y_lo, y_hi]),
+        height=700,
+        margin=dict(t=60, b=60, l=60, r=30),
+        legend=dict(font=dict(size=10)),
+        hovermode="closest",
+    )
+
+    return fig.layout.to_plotly_json()
+
+
+def _sector_traces(traces, labels, tails, names, tail_length, color_map, interval):
+    """Two traces and a label per sector. Returns all plotted x and y values."""
+    date_fmt = "%Y-%m-%d %H:%M" if interval == "1h" else "%Y-%m-%d"
+
+    all_x, all_y = [], []
+
+    for name in names:
+        index, x, y = tails.tail(name, tail_length)
+        all_x.extend(x)
+        all_y.extend(y)
+        c = color_map[name]
+        dates = index.strftime(date_fmt).tolist()
+
+        # Tail line
+        traces.append(go.Scatter(
+            x=x, y=y, mode="lines",
+            line=dict(color=c, width=2),
+            name=name, legendgroup=name,
+            showlegend=False,
+            hoverinfo="skip",
+        ))
+
+        # Dots (sized by recency)
+        sizes = np.linspace(5, 12, len(x))
+        hover_text = [f"<b>{name}</b><br>Date: {d}<br>RS-Ratio: {xi:.2f}<br>RS-Mom: {yi:.2f}"
+                      for d, xi, yi in zip(dates, x, y)]
+        traces.append(go.Scatter(
+            x=x, y=y, mode="markers",
+            marker=dict(color=c, size=sizes, line=dict(color="white", width=0.5)),
+            name=name, legendgroup=name,
+            showlegend=True,
+            hovertemplate="%{text}<extra></extra>",
+            text=hover_text,
+        ))
+
+        # Label at latest point
+        labels.append(dict(
+            x=x[-1], y=y[-1], text=f"<b>{name}</b>",
+            showarrow=False, xshift=10, yshift=8,
+            font=dict(size=10, color=c),
+        ))
+
+    return all_x, all_y
+
+
+def _batched_traces(traces, tails, names, tail_length, color_map, interval):
+    """All sectors in ``BATCHED_TRACES`` traces (plain dicts, used as is by
+    ``build_animation`` frames). Returns all plotted x and y values."""
+    if not names:
+        return [], []
+    cols = [tails.symbols.index(name) for name in names]
+
+    # sectors x points, oldest first; padding (short histories) is masked out
+    x = tails.rs_ratio[-tail_length:, cols].T
+    y = tails.rs_momentum[-tail_length:, cols].T
+    dates = tails.dates[-tail_length:, cols].T
+    keep = ~np.isnat(dates)
+    counts = keep.sum(axis=1)
+
+    # Tail lines: one trace per colour, its sectors separated by a NaN point
+    sep = np.full((len(cols), 1), np.nan)
+    line_keep = np.column_stack([keep, np.ones((len(cols), 1), dtype=bool)])
+    line_x, line_y = np.column_stack([x, sep]), np.column_stack([y, sep])
+    color_of = np.array([COLORS.index(color_map[n]) for n in names])
+    for k, color in enumerate(COLORS):
+        mask = line_keep & (color_of == k)[:, None]
+        traces.append(dict(
+            type="scatter", x=line_x[mask], y=line_y[mask],
+            mode="lines", line=dict(color=color, width=2), opacity=BATCHED_LINE_OPACITY,
+            showlegend=False, hoverinfo="skip",
+        ))
+
+    # Dots (sized by recency within each sector), hover data per point
+    px, py = x[keep], y[keep]
+    rank = (np.cumsum(keep, axis=1) - 1)[keep]
+    steps = np.repeat(7 / np.maximum(counts - 1, 1), counts)
+    unit = "m" if interval == "1h" else "D"
+    date_text = np.char.replace(np.datetime_as_string(dates[keep], unit=unit), "T", " ")
+    traces.append(dict(
+        type="scatter", x=px, y=py, mode="markers",
+        marker=dict(color=np.repeat(color_of, counts),
+                    colorscale=COLOR_SCALE, cmin=0, cmax=len(COLORS) - 1,
+                    size=5 + rank * steps, line=dict(color="white", width=0.5)),
+        customdata=np.column_stack([np.repeat(names, counts), date_text]),
+        hovertemplate=HOVER_TEMPLATE,
+        showlegend=False,
+    ))
+
+    # Labels at latest point
+    last = np.cumsum(counts) - 1
+    traces.append(dict(
+        type="scatter", x=px[last], y=py[last], mode="text",
+        text=[f"<b>{name}</b>" for name in names], textposition="top right",
+        textfont=dict(size=10, color=[color_map[n] for n in names]),
+        showlegend=False, hoverinfo="skip",
+    ))
+
+    return px, py
@@ -0,0 +1,364 @@
+"""
+Precomputed RRG grid - RRG tails for every slider combination, per snapshot
+
+The app's sliders allow rs_period and mom_period of 5..50, i.e. 46 x 46
+combinations per interval. After a snapshot is published, ``build_grids``
+computes all of them once and stores the last MAX_TAIL points of every
+sector (the most the tail slider can show) next to the snapshot data:
+
+    data/store/snapshots/<id>/rrg_grid/<interval>/
+        grid.json          periods, symbols, source fingerprint
+        rs_ratio.npy       float32 [rs, mom, MAX_TAIL, symbols], NaN-padded
+        rs_momentum.npy    same shape
+        tail_dates.npy     int64 ns [MAX_TAIL, symbols]
+        n_bars.npy         int64 [symbols]
+        complete.npy       bool [rs, mom] - False: not stored, compute instead
+
+The values are those of ``compute_sector_tails`` stored as float32 (about
+1e-5 off at 100, well below the 4 decimals the API sends), so a grid takes
+46 x 46 x 50 tail points x 2 x 4 bytes = 0.85 MB per sector: ~24 MB per
+interval for the 28 sectors, ~71 MB for the three intervals of a snapshot.
+An interval whose data did not change is hard-linked from the previous
+snapshot's grid, so the KEEP_SNAPSHOTS retained snapshots mostly share them.
+The grid is computed from the interval's price panel, which publishing
+already wrote into the snapshot (``rrg_engine.write_panels``).
+``lookup_tails`` serves a slider combination from the memory-mapped grid
+and returns None when there is no grid for it, so the caller computes.
+
+Usage:
+    python rrg_grid.py build                    # grid for the current snapshot
+    python rrg_grid.py build --rs 5-30 --mom 5-30
+    python rrg_grid.py status
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from data_store import DATA_DIR, current_snapshot, link_tree, save_json, snapshots_dir
+from perf import cache_result, span
+from rrg_engine import (CENTER, MAX_TAIL, RRGTails, compute_sector_tails, data_version,
+                        ema_alpha_2d, load_price_panel, load_snapshot_panel, sector_filter,
+                        tail_rows, take_rows)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+GRID_DIRNAME = "rrg_grid"
+GRID_FILE = "grid.json"
+INTERVALS = ["weekly", "daily", "1h"]
+GRID_DTYPE = "float32"         # of rs_ratio / rs_momentum; lookups return float64
+RS_PERIODS = range(5, 51)     # same bounds as the app's sliders
+MOM_PERIODS = range(5, 51)
+
+
+def grid_dir(snapshot_dir: str, interval: str) -> str:
+    return os.path.join(snapshot_dir, GRID_DIRNAME, interval)
+
+
+def parse_periods(text: str) -> list[int]:
+    """'5-50' or '8,10,14' -> list of periods."""
+    periods = []
+    for part in text.split(","):
+        lo, _, hi = part.partition("-")
+        periods.extend(range(int(lo), int(hi or lo) + 1))
+    return sorted(set(periods))
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def _matches(meta: dict, fingerprint: str, rs_periods, mom_periods, max_tail: int) -> bool:
+    return (meta.get("fingerprint") == fingerprint and meta.get("max_tail") == max_tail
+            and meta.get("dtype") == GRID_DTYPE
+            and meta.get("rs_periods") == list(rs_periods)
+            and meta.get("mom_periods") == list(mom_periods))
+
+
+def _read_meta(path: str) -> dict | None:
+    try:
+        with open(os.path.join(path, GRID_FILE), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _find_reusable(data_dir: str, interval: str, fingerprint: str,
+                   rs_periods, mom_periods, max_tail: int) -> str | None:
+    """Grid of ``interval`` in another snapshot built from the same data, if any."""
+    root = snapshots_dir(data_dir)
+    for name in sorted(os.listdir(root), reverse=True):
+        if name.startswith("."):
+            continue
+        path = grid_dir(os.path.join(root, name), interval)
+        meta = _read_meta(path)
+        if meta and _matches(meta, fingerprint, rs_periods, mom_periods, max_tail):
+            return path
+    return None
+
+
+def build_grid(snapshot_dir: str, interval: str, rs_periods=RS_PERIODS,
+               mom_periods=MOM_PERIODS, max_tail: int = MAX_TAIL,
+               data_dir: str = DATA_DIR) -> dict:
+    """Build (or reuse) the grid of one interval. Returns a small report dict."""
+    rs_periods, mom_periods = list(rs_periods), list(mom_periods)
+    t0 = time.perf_counter()
+    panel, error = load_snapshot_panel(interval, snapshot_dir)
+    if panel is None:
+        raise RuntimeError(error)
+    fingerprint = panel.fingerprint[1]
+    out_dir = grid_dir(snapshot_dir, interval)
+
+    meta = _read_meta(out_dir)
+    if meta and _matches(meta, fingerprint, rs_periods, mom_periods, max_tail):
+        return {"interval": interval, "status": "exists", "seconds": 0.0,
+                "bytes": _dir_size(out_dir)}
+
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(os.path.dirname(out_dir), exist_ok=True)
+
+    source = _find_reusable(data_dir, interval, fingerprint, rs_periods, mom_periods, max_tail)
+    if source is not None:
+        link_tree(source, tmp_dir)
+        status = "reused"
+    else:
+        _compute_grid(panel, tmp_dir, fingerprint, rs_periods, mom_periods, max_tail)
+        status = "built"
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.rename(tmp_dir, out_dir)
+    return {"interval": interval, "status": status,
+            "seconds": time.perf_counter() - t0, "bytes": _dir_size(out_dir)}
+
+
+def _compute_grid(panel, out_dir: str, fingerprint: str, rs_periods: list[int],
+                  mom_periods: list[int], max_tail: int) -> None:
+    closes = panel.closes.to_numpy(dtype=np.float64)
+    benchmark = panel.benchmark.to_numpy(dtype=np.float64)
+    n_sym = closes.shape[1]
+
+    # Same arithmetic as rrg_engine.rrg_arrays; the RS smoothing is shared by every mom_period
+    rs = closes / benchmark[:, None]
+    valid = ~np.isnan(rs)
+    rows = tail_rows(valid, max_tail)
+    dates = panel.closes.index.asi8 if len(panel.closes.index) else np.empty(0, dtype=np.int64)
+    tail_dates = np.where(rows >= 0, dates[np.maximum(rows, 0)] if len(dates) else 0, 0)
+
+    os.makedirs(out_dir)
+    shape = (len(rs_periods), len(mom_periods), max_tail, n_sym)
+    ratio_out = np.lib.format.open_memmap(os.path.join(out_dir, "rs_ratio.npy"), "w+",
+                                          GRID_DTYPE, shape)
+    mom_out = np.lib.format.open_memmap(os.path.join(out_dir, "rs_momentum.npy"), "w+",
+                                        GRID_DTYPE, shape)
+    complete = np.zeros(shape[:2], dtype=bool)
+
+    for i, rs_period in enumerate(rs_periods):
+        rs_smooth = ema_alpha_2d(rs, rs_period)
+        rs_ratio = CENTER + ((rs - rs_smooth) / rs_smooth) * CENTER
+        ratio_tail = take_rows(rs_ratio, rows)
+        for j, mom_period in enumerate(mom_periods):
+            ratio_smooth = ema_alpha_2d(rs_ratio, mom_period)
+            rs_momentum = CENTER + ((rs_ratio - ratio_smooth) / ratio_smooth) * CENTER
+            # The stored tail rows assume the result is valid exactly where prices are
+            if not np.array_equal(valid, ~(np.isnan(rs_ratio) | np.isnan(rs_momentum))):
+                continue
+            ratio_out[i, j] = ratio_tail
+            mom_out[i, j] = take_rows(rs_momentum, rows)
+            complete[i, j] = True
+
+    ratio_out.flush()
+    mom_out.flush()
+    del ratio_out, mom_out
+    np.save(os.path.join(out_dir, "tail_dates.npy"), tail_dates.astype(np.int64))
+    np.save(os.path.join(out_dir, "n_bars.npy"), valid.sum(axis=0).astype(np.int64))
+    np.save(os.path.join(out_dir, "complete.npy"), complete)
+    save_json(os.path.join(out_dir, GRID_FILE), {
+        "fingerprint": fingerprint,
+        "symbols": [str(s) for s in panel.closes.columns],
+        "rs_periods": rs_periods,
+        "mom_periods": mom_periods,
+        "max_tail": max_tail,
+        "dtype": GRID_DTYPE,
+        "rows": len(dates),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, n)) for n in os.listdir(path))
+
+
+def build_grids(snapshot_id: str | None = None, intervals=INTERVALS, rs_periods=RS_PERIODS,
+                mom_periods=MOM_PERIODS, data_dir: str = DATA_DIR, logger=None) -> list[dict]:
+    """Build the grids of ``intervals`` for a snapshot (default: the current one)."""
+    snapshot_id = snapshot_id or current_snapshot(data_dir)
+    if snapshot_id is None:
+        raise RuntimeError("No snapshot published yet")
+    snapshot_dir = os.path.join(snapshots_dir(data_dir), snapshot_id)
+
+    reports = []
+    for interval in intervals:
+        try:
+            report = build_grid(snapshot_dir, interval, rs_periods, mom_periods, data_dir=data_dir)
+        except Exception as e:
+            report = {"interval": interval, "status": "failed", "error": str(e),
+                      "seconds": 0.0, "bytes": 0}
+        reports.append(report)
+        if logger:
+            logger(format_report(report))
+
+    # Only the current snapshot's grids are ever read; reused ones are hard-linked
+    if snapshot_id == current_snapshot(data_dir):
+        for name in os.listdir(snapshots_dir(data_dir)):
+            if name != snapshot_id and not name.startswith("."):
+                shutil.rmtree(os.path.join(snapshots_dir(data_dir), name, GRID_DIRNAME),
+                              ignore_errors=True)
+    return reports
+
+
+def format_report(report: dict) -> str:
+    if report["status"] == "failed":
+        return f"  [FAIL] RRG grid {report['interval']}: {report['error']}"
+    return (f"  [OK] RRG grid {report['interval']}: {report['status']} "
+            f"in {report['seconds']:.1f}s, {report['bytes'] / 1e6:.1f} MB")
+
+
+# ---------------------------------------------------------------------------
+# Lookup
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Grid:
+    meta: dict
+    rs_index: dict[int, int]
+    mom_index: dict[int, int]
+    rs_ratio: np.ndarray
+    rs_momentum: np.ndarray
+    tail_dates: np.ndarray
+    n_bars: np.ndarray
+    complete: np.ndarray
+
+
+_grids: dict[str, Grid] = {}
+_grids_lock = threading.Lock()
+
+
+def open_grid(path: str) -> Grid | None:
+    """Memory-map the grid at ``path`` (cached per path; published grids never change)."""
+    with _grids_lock:
+        grid = _grids.get(path)
+        if grid is not None:
+            return grid
+        meta = _read_meta(path)
+        if meta is None:
+            return None
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode="r")
+
+        grid = Grid(meta,
+                    {p: i for i, p in enumerate(meta["rs_periods"])},
+                    {p: i for i, p in enumerate(meta["mom_periods"])},
+                    load("rs_ratio.npy"), load("rs_momentum.npy"), load("tail_dates.npy"),
+                    load("n_bars.npy"), load("complete.npy"))
+        # Old snapshots get pruned; only keep the grids of this one
+        snapshot_dir = os.path.dirname(os.path.dirname(path))
+        for key in [k for k in _grids if os.path.dirname(os.path.dirname(k)) != snapshot_dir]:
+            del _grids[key]
+        _grids[path] = grid
+        return grid
+
+
+def lookup_tails(interval: str, rs_period: int, mom_period: int,
+                 data_dir: str = DATA_DIR) -> RRGTails | None:
+    """``compute_sector_tails`` result from the grid of the current snapshot.
+
+    Returns None when the current snapshot has no grid for this combination
+    or the grid was built from other data.
+    """
+    version = data_version(interval)
+    snapshot_id = current_snapshot(data_dir)
+    if version[0] != "store" or snapshot_id is None:
+        return None
+    grid = open_grid(grid_dir(os.path.join(snapshots_dir(data_dir), snapshot_id), interval))
+    if grid is None or grid.meta["fingerprint"] != version[1]:
+        return None
+    i, j = grid.rs_index.get(rs_period), grid.mom_index.get(mom_period)
+    if i is None or j is None or not grid.complete[i, j]:
+        return None
+
+    # Valid exactly where there are prices, so both counts are n_bars
+    cols = np.flatnonzero(sector_filter(grid.n_bars, grid.n_bars, rs_period, mom_period))
+    rs_ratio = grid.rs_ratio[i, j][:, cols].astype(np.float64)     # copies out of the mmap
+    dates = np.asarray(grid.tail_dates[:, cols]).view("datetime64[ns]")
+    return RRGTails([grid.meta["symbols"][c] for c in cols],
+                    np.where(np.isnan(rs_ratio), np.datetime64("NaT"), dates),
+                    rs_ratio, grid.rs_momentum[i, j][:, cols].astype(np.float64))
+
+
+def load_tails(interval: str, rs_period: int, mom_period: int):
+    """RRG tails of every sector. Returns (RRGTails|None, error_msg|None).
+
+    A grid lookup when the current snapshot has one for this setting,
+    otherwise computed from the price panel.
+    """
+    with span("grid_lookup"):
+        tails = lookup_tails(interval, rs_period, mom_period)
+    cache_result("rrg_grid", hit=tails is not None)
+    if tails is not None:
+        return tails, None
+    panel, error = load_price_panel(interval)
+    if panel is None:
+        return None, error
+    return compute_sector_tails(panel, rs_period, mom_period, interval)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute RRG results for every slider setting")
+    parser.add_argument("command", choices=["build", "status"])
+    parser.add_argument("--interval", choices=INTERVALS + ["all"], default="all",
+                        help="Interval (default: all)")
+    parser.add_argument("--rs", default="5-50", help="RS-Ratio periods, e.g. 5-50 or 8,10,14")
+    parser.add_argument("--mom", default="5-50", help="RS-Momentum periods, e.g. 5-50")
+    parser.add_argument("--snapshot", default=None, help="Snapshot id (default: current)")
+    args = parser.parse_args()
+
+    intervals = INTERVALS if args.interval == "all" else [args.interval]
+    if args.command == "build":
+        t0 = time.perf_counter()
+        reports = build_grids(args.snapshot, intervals, parse_periods(args.rs),
+                              parse_periods(args.mom), logger=print)
+        total = sum(r["bytes"] for r in reports)
+        print(f"[OK] Warm-up {time.perf_counter() - t0:.1f}s, cache size {total / 1e6:.1f} MB")
+        if any(r["status"] == "failed" for r in reports):
+            raise SystemExit(1)
+    else:
+        snapshot_id = args.snapshot or current_snapshot()
+        if snapshot_id is None:
+            print("No snapshot published yet")
+            return
+        print(f"Snapshot: {snapshot_id}")
+        for interval in intervals:
+            path = grid_dir(os.path.join(snapshots_dir(), snapshot_id), interval)
+            meta = _read_meta(path)
+            if meta is None:
+                print(f"  {interval}: no grid")
+                continue
+            print(f"  {interval}: {len(meta['rs_periods'])} x {len(meta['mom_periods'])} periods, "
+                  f"{len(meta['symbols'])} symbols, {_dir_size(path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
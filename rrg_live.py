@@ -0,0 +1,440 @@
+"""
+RRG Live - the 1h chart updated while the current bar is still forming
+
+A source yields bar updates (symbol, bar time, latest close) as they come:
+
+    ReplaySource        stand-in feed: the last stored bars replayed as
+                        forming bars (the close moves to the bar's final
+                        close over a few ticks), then again from the start
+    TradingViewSource   the last two bars of every symbol, polled through
+                        the fetch pipeline's rate limiter (TvDatafeed has
+                        no push API)
+
+``LiveFeed`` runs the source on a background thread and keeps the last
+LIVE_BARS bars of every symbol in a ring buffer. For each RS / Momentum
+setting in use, ``LiveRRG`` holds the Wilder smoothing state a few bars
+(PENDING_ROWS) behind the end: an update only recomputes those rows from
+that state, and a bar leaving the window is folded into it. No update reads
+or recomputes the history, and the tails equal ``compute_sector_tails`` on
+the stored panel with the live bars appended.
+
+The published snapshot stays the reference: when the fetcher publishes a
+new one, the feed reseeds from it.
+
+Usage:
+    RRG_LIVE_SOURCE=replay streamlit run app.py          # Live toggle on the 1 Hour view
+    RRG_LIVE_SOURCE=tradingview streamlit run app.py
+    python rrg_live.py --source replay --seconds 20 --sectors BANK,ICT
+"""
+
+import argparse
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from fetch_pipeline import DEFAULT_RATE, ConcurrentFetcher, FetchJob, RateLimiter
+from perf import span
+from rrg_engine import (BENCHMARK, MAX_TAIL, PricePanel, RRGState, RRGTails, _advance,
+                        data_version, load_price_panel, rrg_arrays_with_state, sector_filter,
+                        tail_rows)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+INTERVAL = "1h"
+PENDING_ROWS = 3        # last bars kept open to updates (the forming bar and late revisions)
+LIVE_BARS = 64          # bars kept per symbol for settings opened later
+LIVE_SETTINGS = 8       # RS / Momentum settings kept live at once
+RESEED_CHECK = 30       # seconds between checks for a newly published snapshot
+REPLAY_BARS = 20        # ReplaySource: stored bars replayed ...
+REPLAY_TICKS = 5        # ... each in this many updates
+POLL_SECONDS = 10       # TradingViewSource: shortest time between two sweeps
+TV_OFFSET = pd.Timedelta(hours=7)   # TradingView 1h bars are UTC (auto_fetch_data.fix_timezone)
+
+
+@dataclass
+class BarUpdate:
+    symbol: str
+    time: np.datetime64     # start of the bar, as in the stored data
+    close: float            # latest close of the bar (final once the bar is complete)
+
+
+# ---------------------------------------------------------------------------
+# Ring buffer
+# ---------------------------------------------------------------------------
+
+class RingBuffer:
+    """The last ``capacity`` rows of (time, values), in time order; O(1) append."""
+
+    def __init__(self, capacity: int, width: int):
+        self.times = np.full(capacity, np.datetime64("NaT"), dtype="datetime64[ns]")
+        self.values = np.full((capacity, width), np.nan)
+        self._end = 0               # slot of the next append
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, when, values) -> None:
+        self.times[self._end] = when
+        self.values[self._end] = values
+        self._end = (self._end + 1) % len(self.times)
+        self._size = min(self._size + 1, len(self.times))
+
+    def set(self, when, values) -> bool:
+        """Append a newer row or overwrite the row at ``when``. False if ``when`` is too old."""
+        when = np.datetime64(when, "ns")
+        if not self._size or when > self.times[self._end - 1]:
+            self.append(when, values)
+            return True
+        hit = np.flatnonzero(self.times == when)
+        if len(hit):
+            self.values[hit[0]] = values
+            return True
+        return False
+
+    def view(self) -> tuple[np.ndarray, np.ndarray]:
+        """(times, values) oldest first (copies)."""
+        order = (np.arange(self._size) + self._end - self._size) % len(self.times)
+        return self.times[order], self.values[order]
+
+
+# ---------------------------------------------------------------------------
+# Incremental RRG of the forming bars
+# ---------------------------------------------------------------------------
+
+class LiveRRG:
+    """RRG of ``panel`` plus live bars for one setting, updated in O(symbols) per batch.
+
+    The first rows are folded into ``state``; the last PENDING_ROWS rows
+    stay open and are recomputed from it on every update.
+    """
+
+    def __init__(self, panel: PricePanel, rs_period: int, mom_period: int,
+                 pending_rows: int = PENDING_ROWS):
+        self.rs_period, self.mom_period = rs_period, mom_period
+        self.pending_rows = pending_rows
+        self.symbols = list(panel.closes.columns)
+        self._cols = {name: col for col, name in enumerate(self.symbols)}
+        closes = panel.closes.to_numpy(dtype=np.float64)
+        benchmark = panel.benchmark.to_numpy(dtype=np.float64)
+        n_open = min(pending_rows, len(closes))
+        rs_ratio, rs_momentum, self.state = rrg_arrays_with_state(
+            closes, benchmark, rs_period, mom_period, behind=n_open)
+        n = self.state.n_rows
+
+        # Folded rows: counts for sector_filter and the last MAX_TAIL points per symbol
+        valid = ~(np.isnan(rs_ratio[:n]) | np.isnan(rs_momentum[:n]))
+        self.n_bars = np.count_nonzero(~np.isnan(closes[:n]), axis=0)
+        self.n_valid = np.count_nonzero(valid, axis=0)
+        dates = panel.closes.index.to_numpy()
+        rows = tail_rows(valid)
+        self.points = []
+        for col in range(len(self.symbols)):
+            ring = RingBuffer(MAX_TAIL, 2)
+            for row in rows[rows[:, col] >= 0, col]:
+                ring.append(dates[row], (rs_ratio[row, col], rs_momentum[row, col]))
+            self.points.append(ring)
+
+        # Open rows
+        self.folded_until = dates[n - 1] if n else np.datetime64("NaT")
+        self.dates = list(dates[n:])
+        self.closes = closes[n:].copy()
+        self.benchmark = benchmark[n:].copy()
+        self.version = 0
+        self.stale = 0              # updates for bars already folded (left to the next snapshot)
+        self._refresh()
+
+    def _refresh(self) -> None:
+        rs = self.closes / self.benchmark[:, None]
+        self.rs_ratio, self.rs_momentum, _, _ = _advance(
+            rs, self.rs_period, self.mom_period, self.state.rs_smooth, self.state.ratio_smooth)
+
+    def _fold_first(self) -> None:
+        """Fold the oldest open row into the state (dropped if the benchmark has no bar there)."""
+        when, closes, bench = self.dates.pop(0), self.closes[0], self.benchmark[0]
+        self.closes, self.benchmark = self.closes[1:], self.benchmark[1:]
+        self.folded_until = when
+        if np.isnan(bench):
+            return                  # not a row of the panel either
+        rs_ratio, rs_momentum, rs_state, ratio_state = _advance(
+            (closes / bench)[None], self.rs_period, self.mom_period,
+            self.state.rs_smooth, self.state.ratio_smooth)
+        self.state = RRGState(self.state.n_rows + 1, rs_state, ratio_state)
+        valid = ~(np.isnan(rs_ratio[0]) | np.isnan(rs_momentum[0]))
+        self.n_bars += ~np.isnan(closes)
+        self.n_valid += valid
+        for col in np.flatnonzero(valid):
+            self.points[col].append(when, (rs_ratio[0, col], rs_momentum[0, col]))
+
+    def _row(self, when: np.datetime64) -> int:
+        """Open row of bar ``when``, added if new; -1 when that bar is already folded."""
+        at = int(np.searchsorted(np.array(self.dates, dtype="datetime64[ns]"), when))
+        if at < len(self.dates) and self.dates[at] == when:
+            return at
+        if when <= self.folded_until:
+            return -1
+        self.dates.insert(at, when)
+        self.closes = np.insert(self.closes, at, np.nan, axis=0)
+        self.benchmark = np.insert(self.benchmark, at, np.nan)
+        while len(self.dates) > self.pending_rows:
+            self._fold_first()
+            at -= 1
+        return at
+
+    def apply(self, updates: list[BarUpdate]) -> bool:
+        """Apply a batch of updates. True if any was used."""
+        changed = False
+        for u in updates:
+            if u.symbol != BENCHMARK and u.symbol not in self._cols:
+                continue
+            row = self._row(np.datetime64(u.time, "ns"))
+            if row < 0:
+                self.stale += 1
+                continue
+            if u.symbol == BENCHMARK:
+                self.benchmark[row] = u.close
+            else:
+                self.closes[row, self._cols[u.symbol]] = u.close
+            changed = True
+        if changed:
+            self._refresh()
+            self.version += 1
+        return changed
+
+    def tails(self, max_tail: int = MAX_TAIL) -> RRGTails:
+        """Same as ``rrg_tails`` on the panel with the open rows appended."""
+        has_bench = ~np.isnan(self.benchmark)
+        open_valid = ~(np.isnan(self.rs_ratio) | np.isnan(self.rs_momentum))
+        n_bars = self.n_bars + np.count_nonzero(~np.isnan(self.closes) & has_bench[:, None], axis=0)
+        n_valid = self.n_valid + np.count_nonzero(open_valid, axis=0)
+        cols = np.flatnonzero(sector_filter(n_bars, n_valid, self.rs_period, self.mom_period))
+
+        dates = np.full((max_tail, len(cols)), np.datetime64("NaT"), dtype="datetime64[ns]")
+        rs_ratio = np.full((max_tail, len(cols)), np.nan)
+        rs_momentum = np.full((max_tail, len(cols)), np.nan)
+        open_dates = np.array(self.dates, dtype="datetime64[ns]")
+        for k, col in enumerate(cols):
+            times, values = self.points[col].view()
+            keep = open_valid[:, col]
+            times = np.concatenate([times, open_dates[keep]])[-max_tail:]
+            values = np.concatenate([values, np.column_stack(
+                [self.rs_ratio[keep, col], self.rs_momentum[keep, col]])])[-max_tail:]
+            dates[max_tail - len(times):, k] = times
+            rs_ratio[max_tail - len(times):, k] = values[:, 0]
+            rs_momentum[max_tail - len(times):, k] = values[:, 1]
+        return RRGTails([self.symbols[c] for c in cols], dates, rs_ratio, rs_momentum)
+
+
+# ---------------------------------------------------------------------------
+# Sources
+# ---------------------------------------------------------------------------
+
+class ReplaySource:
+    """Stand-in feed replaying the last ``bars`` stored bars as forming bars, in a loop."""
+
+    def __init__(self, bars: int = REPLAY_BARS, ticks: int = REPLAY_TICKS,
+                 tick_seconds: float = 1.0, interval: str = INTERVAL):
+        self.bars, self.ticks, self.tick_seconds = bars, ticks, tick_seconds
+        self.interval = interval
+        self._panel = None
+
+    def seed_panel(self) -> PricePanel:
+        """The stored panel without the bars to replay."""
+        panel, error = load_price_panel(self.interval)
+        if panel is None:
+            raise RuntimeError(error)
+        self._panel = panel
+        return PricePanel(panel.benchmark.iloc[:-self.bars], panel.closes.iloc[:-self.bars],
+                          panel.fingerprint + ("replay",), panel.errors)
+
+    def version(self):
+        return None                 # replays the snapshot it was seeded with until it ends
+
+    def stream(self):
+        closes = self._panel.closes.assign(**{BENCHMARK: self._panel.benchmark})
+        values = closes.to_numpy(dtype=np.float64)
+        symbols = list(closes.columns)
+        dates = closes.index.to_numpy()
+        for row in range(len(values) - self.bars, len(values)):
+            prev, final = values[row - 1], values[row]
+            start = np.where(np.isnan(prev), final, prev)
+            for tick in range(1, self.ticks + 1):
+                close = start + (final - start) * tick / self.ticks
+                yield [BarUpdate(symbol, dates[row], float(close[col]))
+                       for col, symbol in enumerate(symbols) if not np.isnan(final[col])]
+                time.sleep(self.tick_seconds)
+
+
+class TradingViewSource:
+    """The last two 1h bars of every symbol from TradingView, swept every ``poll_seconds``."""
+
+    def __init__(self, client_factory=None, concurrency: int = 2, rate: float = DEFAULT_RATE,
+                 poll_seconds: float = POLL_SECONDS, logger=None):
+        from tvDatafeed import Interval, TvDatafeed
+        self.fetcher = ConcurrentFetcher(client_factory or TvDatafeed, concurrency=concurrency,
+                                         limiter=RateLimiter(rate), max_retries=1, logger=logger)
+        self.tv_interval = Interval.in_1_hour
+        self.poll_seconds = poll_seconds
+        self.symbols = []
+
+    def seed_panel(self) -> PricePanel:
+        panel, error = load_price_panel(INTERVAL)
+        if panel is None:
+            raise RuntimeError(error)
+        self.symbols = [BENCHMARK] + list(panel.closes.columns)
+        return panel
+
+    def version(self):
+        return data_version(INTERVAL)
+
+    def stream(self):
+        jobs = [FetchJob(symbol, self.tv_interval, 2, tag=INTERVAL) for symbol in self.symbols]
+        while True:
+            t0 = time.monotonic()
+            for result in self.fetcher.fetch_all(jobs):
+                if result.data is None:
+                    continue
+                bars = result.data["close"]
+                yield [BarUpdate(result.job.symbol, np.datetime64(when + TV_OFFSET, "ns"), float(close))
+                       for when, close in bars.items()]
+            time.sleep(max(0.0, self.poll_seconds - (time.monotonic() - t0)))
+
+
+SOURCES = {"replay": ReplaySource, "tradingview": TradingViewSource}
+
+
+# ---------------------------------------------------------------------------
+# Feed
+# ---------------------------------------------------------------------------
+
+class LiveFeed:
+    """Runs a source on a background thread and serves live tails per setting."""
+
+    def __init__(self, source, max_settings: int = LIVE_SETTINGS, logger=None):
+        self.source = source
+        self.max_settings = max_settings
+        self._logger = logger
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._panel = None
+        self._bars: dict[str, RingBuffer] = {}
+        self._rrgs: OrderedDict = OrderedDict()     # (rs, mom) -> LiveRRG
+        self.updates = 0
+        self.last_update = None
+        self.error = None
+
+    def start(self) -> "LiveFeed":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rrg-live", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                panel = self.source.seed_panel()
+                version = self.source.version()
+                with self._lock:
+                    self._panel = panel
+                    self._rrgs.clear()      # reseeded on first use
+                    self.error = None
+                checked = time.monotonic()
+                for batch in self.source.stream():
+                    if self._stop.is_set():
+                        return
+                    self._apply(batch)
+                    if time.monotonic() - checked > RESEED_CHECK:
+                        checked = time.monotonic()
+                        if self.source.version() != version:
+                            break           # a new snapshot was published
+            except Exception as e:
+                self.error = str(e)
+                if self._logger:
+                    self._logger.warning(f"  [FAIL] Live feed: {e}")
+                self._stop.wait(RESEED_CHECK)
+
+    def _apply(self, batch: list[BarUpdate]) -> None:
+        with span("live_apply"), self._lock:
+            for u in batch:
+                ring = self._bars.get(u.symbol)
+                if ring is None:
+                    ring = self._bars[u.symbol] = RingBuffer(LIVE_BARS, 1)
+                ring.set(u.time, (u.close,))
+            for rrg in self._rrgs.values():
+                rrg.apply(batch)
+            self.updates += len(batch)
+            self.last_update = pd.Timestamp.now()
+
+    def _rrg(self, rs_period: int, mom_period: int) -> LiveRRG | None:
+        key = (rs_period, mom_period)
+        rrg = self._rrgs.get(key)
+        if rrg is None and self._panel is not None:
+            rrg = LiveRRG(self._panel, rs_period, mom_period)
+            # Catch up from the ring buffers (bars already in the panel are revisions or stale)
+            updates = [BarUpdate(symbol, when, close[0]) for symbol, ring in self._bars.items()
+                       for when, close in zip(*ring.view())]
+            rrg.apply(sorted(updates, key=lambda u: u.time))
+            self._rrgs[key] = rrg
+            while len(self._rrgs) > self.max_settings:
+                self._rrgs.popitem(last=False)
+        elif rrg is not None:
+            self._rrgs.move_to_end(key)
+        return rrg
+
+    def tails(self, rs_period: int, mom_period: int) -> tuple[RRGTails | None, tuple | None]:
+        """Live tails of a setting and a version that changes with every used update."""
+        with self._lock:
+            rrg = self._rrg(rs_period, mom_period)
+            if rrg is None:
+                return None, None
+            return rrg.tails(), (id(rrg), rrg.version)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream live RRG coordinates")
+    parser.add_argument("--source", choices=list(SOURCES), default="replay")
+    parser.add_argument("--rs", type=int, default=10, help="RS-Ratio period")
+    parser.add_argument("--mom", type=int, default=10, help="RS-Momentum period")
+    parser.add_argument("--sectors", default="BANK,ICT,ENERG", help="Comma-separated sectors shown")
+    parser.add_argument("--seconds", type=float, default=20, help="Run for this long")
+    parser.add_argument("--tick", type=float, default=0.5, help="Replay: seconds between updates")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    logger = logging.getLogger("rrg_live")
+    source = ReplaySource(tick_seconds=args.tick) if args.source == "replay" \
+        else SOURCES[args.source](logger=logger)
+    feed = LiveFeed(source, logger=logger).start()
+    sectors = [s.strip().upper() for s in args.sectors.split(",")]
+    shown = None
+    end = time.monotonic() + args.seconds
+    while time.monotonic() < end:
+        tails, version = feed.tails(args.rs, args.mom)
+        if tails is not None and version != shown:
+            shown = version
+            points = [f"{s} {tails.rs_ratio[-1, tails.symbols.index(s)]:7.2f}/"
+                      f"{tails.rs_momentum[-1, tails.symbols.index(s)]:7.2f}"
+                      for s in sectors if s in tails.symbols]
+            print(f"{tails.latest:%Y-%m-%d %H:%M}  {feed.updates:>6} updates  {'  '.join(points)}")
+        time.sleep(0.1)
+    feed.stop()
+    print(f"[OK] {feed.updates} updates in {args.seconds:g}s" if feed.error is None
+          else f"[FAIL] {feed.error}")
+
+
+if __name__ == "__main__":
+    main()
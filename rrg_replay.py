@@ -0,0 +1,66 @@
+"""
+RRG Replay - export the sector rotation as a Plotly animation
+
+Uses the same replay history as the app's Replay mode
+(rrg_engine.compute_rrg_history): the RRG of the whole history is computed
+once, then every frame is a slice of it. All frames are written in one
+batch to a standalone HTML file (plotly.js included, or loaded from a CDN).
+
+Usage:
+    python rrg_replay.py export -o replay.html                       # last 60 daily bars
+    python rrg_replay.py export --interval weekly --rs 8 --mom 8 --frames 260 --step 1
+    python rrg_replay.py export --end 2020-06-30 --frames 120 --step 5 --sectors BANK,ICT
+"""
+
+import argparse
+import time
+
+import plotly.io as pio
+
+from rrg_engine import load_history
+from rrg_figure import build_animation
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+DEFAULT_FRAMES = 60
+DEFAULT_TAIL = 10
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export an animated RRG")
+    parser.add_argument("command", choices=["export"])
+    parser.add_argument("--interval", default="daily", choices=["monthly", "weekly", "daily", "1h"])
+    parser.add_argument("--rs", type=int, default=10, help="RS-Ratio period")
+    parser.add_argument("--mom", type=int, default=10, help="RS-Momentum period")
+    parser.add_argument("--tail", type=int, default=DEFAULT_TAIL, help="Tail length in bars")
+    parser.add_argument("--end", help="Last end date (default: latest bar)")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES, help="Number of end dates")
+    parser.add_argument("--step", type=int, default=1, help="Bars between frames")
+    parser.add_argument("--sectors", help="Comma-separated sectors (default: all)")
+    parser.add_argument("--cdn", action="store_true", help="Load plotly.js from a CDN")
+    parser.add_argument("-o", "--output", default="replay.html")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    history, error = load_history(args.interval, args.rs, args.mom)
+    if history is None:
+        print(f"[FAIL] {error}")
+        raise SystemExit(1)
+    end_row = len(history) - 1 if args.end is None else history.index_at(args.end)
+    rows = history.frame_rows(end_row, args.frames, args.step)
+    if not len(rows):
+        print(f"[FAIL] No {args.interval} bars up to {args.end}")
+        raise SystemExit(1)
+    sectors = [s.strip().upper() for s in args.sectors.split(",")] if args.sectors \
+        else history.symbols
+
+    fig = build_animation(history, sectors, args.tail, rows, args.interval)
+    pio.write_html(fig, args.output, include_plotlyjs="cdn" if args.cdn else True,
+                   auto_play=False, validate=False)
+    print(f"[OK] {len(rows)} frames ({fig.frames[0].name} .. {fig.frames[-1].name}) -> "
+          f"{args.output} in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Scheduler - fetch runs on the SET trading calendar, one at a time
+
+The calendar and the jobs are declared below (MARKET_TZ, SESSIONS,
+HOLIDAYS, JOBS) instead of one ``schedule`` entry per day and time:
+
+    hourly   the 1h bars, at minute 20 of every hour a session is open
+             (none in the lunch break) and 20 minutes after each close
+    daily    the daily bars, at 18:00
+
+Jobs only run on trading days (Mon-Fri, not a SET holiday). The loop
+sleeps until the next due time, not in fixed 60 s steps, so a run starts
+on time. A run is one pipeline: the fetch and, once a snapshot is
+published, its derived bars, RRG grid and events (auto_fetch_data.fetch_data).
+Runs never overlap: if a run is still going when the next job is due, that
+job starts as soon as it ends, and every job missed meanwhile is folded
+into that one run.
+
+Usage:
+    python auto_fetch_data.py --schedule          # run the schedule
+    python scheduler.py next --count 20           # upcoming runs
+    python scheduler.py next --start 2026-04-10   # e.g. around Songkran
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
+from typing import Callable, Iterator
+from zoneinfo import ZoneInfo
+
+# ---------------------------------------------------------------------------
+# Market calendar
+# ---------------------------------------------------------------------------
+MARKET_TZ = ZoneInfo("Asia/Bangkok")
+TRADING_DAYS = {0, 1, 2, 3, 4}                  # Mon-Fri
+SESSIONS = [("10:00", "12:30"), ("14:30", "16:30")]     # lunch break in between
+# SET market holidays (set.or.th); add the next year's list when it is announced
+HOLIDAYS = {
+    2025: ["01-01", "02-12", "04-07", "04-14", "04-15", "05-01", "05-05", "05-12", "06-03",
+           "07-10", "07-28", "08-12", "10-13", "10-23", "12-05", "12-10", "12-31"],
+    2026: ["01-01", "03-03", "04-06", "04-13", "04-14", "04-15", "05-01", "05-04", "06-01",
+           "06-03", "07-28", "07-29", "08-12", "10-13", "10-23", "12-07", "12-10", "12-31"],
+}
+MAX_SLEEP = 300     # re-check the clock at least this often (seconds; suspend, clock changes)
+LOOKAHEAD_DAYS = 30
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    intervals: tuple            # what a run of this job fetches
+    at: tuple = ()              # fixed "HH:MM" times
+    minute: int | None = None   # every hour at this minute while a session is open
+    after_close: int | None = None  # minutes after each session close
+
+
+JOBS = [
+    Job("hourly", ("1h",), minute=20, after_close=20),
+    Job("daily", ("daily",), at=("18:00",)),
+]
+
+
+def _hhmm(text: str) -> dtime:
+    return dtime.fromisoformat(text)
+
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() in TRADING_DAYS and f"{day:%m-%d}" not in HOLIDAYS.get(day.year, ())
+
+
+def job_times(job: Job, day: date) -> list[datetime]:
+    """Times ``job`` runs on ``day`` (market time zone), sorted; none on non-trading days."""
+    if not is_trading_day(day):
+        return []
+    times = {_hhmm(t) for t in job.at}
+    for start, end in SESSIONS:
+        opens = datetime.combine(day, _hhmm(start))
+        closes = datetime.combine(day, _hhmm(end))
+        if job.minute is not None:
+            t = opens.replace(minute=job.minute)
+            t += timedelta(hours=1) if t <= opens else timedelta(0)
+            while t < closes:
+                times.add(t.time())
+                t += timedelta(hours=1)
+        if job.after_close is not None:
+            times.add((closes + timedelta(minutes=job.after_close)).time())
+    return [datetime.combine(day, t, MARKET_TZ) for t in sorted(times)]
+
+
+def upcoming(after: datetime, jobs=JOBS, days: int = LOOKAHEAD_DAYS) -> Iterator[tuple[datetime, Job]]:
+    """(time, job) strictly after ``after``, in order, over the next ``days`` days."""
+    after = after.astimezone(MARKET_TZ)
+    for offset in range(days + 1):
+        day = after.date() + timedelta(days=offset)
+        runs = sorted(((t, job) for job in jobs for t in job_times(job, day)),
+                      key=lambda run: run[0])
+        for t, job in runs:
+            if t > after:
+                yield t, job
+
+
+# ---------------------------------------------------------------------------
+# Run loop
+# ---------------------------------------------------------------------------
+
+class Scheduler:
+    """Call ``run(intervals)`` for every due job, sleeping in between; never two at once."""
+
+    def __init__(self, run: Callable[[tuple], object], jobs=JOBS, logger=None,
+                 now: Callable[[], datetime] = lambda: datetime.now(MARKET_TZ),
+                 sleep: Callable[[float], None] = time.sleep):
+        self.run = run
+        self.jobs = jobs
+        self._logger = logger
+        self._now = now
+        self._sleep = sleep
+        self._checked_year = None
+
+    def _log(self, level: str, message: str) -> None:
+        if self._logger:
+            getattr(self._logger, level)(message)
+
+    def sleep_until(self, when: datetime) -> None:
+        while True:
+            remaining = (when - self._now()).total_seconds()
+            if remaining <= 0:
+                return
+            self._sleep(min(remaining, MAX_SLEEP))
+
+    def run_due(self, last: datetime) -> datetime:
+        """Run every job due after ``last`` and up to now as one run. Returns the new ``last``."""
+        now = self._now()
+        due = []
+        for t, job in upcoming(last, self.jobs):
+            if t > now:
+                break
+            due.append((t, job))
+        if not due:
+            return last
+        names = sorted({job.name for _, job in due})
+        intervals = tuple(sorted({i for _, job in due for i in job.intervals}))
+        late = (now - due[0][0]).total_seconds()
+        if len(due) > 1 or late > 60:
+            folded = f", {len(due)} runs folded into one" if len(due) > 1 else ""
+            self._log("warning", f"  [LATE] {', '.join(names)} due {due[0][0]:%H:%M} started "
+                                 f"{late:.0f}s late{folded}")
+        self._log("info", f"Running {', '.join(names)} ({', '.join(intervals)})")
+        t0 = time.perf_counter()
+        try:
+            self.run(intervals)
+        except Exception as e:
+            self._log("error", f"  [FAIL] {', '.join(names)}: {e}")
+        self._log("info", f"Finished {', '.join(names)} in {time.perf_counter() - t0:.1f}s")
+        return due[-1][0]
+
+    def next_run(self, last: datetime) -> tuple[datetime, Job] | None:
+        return next(upcoming(last, self.jobs), None)
+
+    def run_forever(self) -> None:
+        last = self._now()
+        while True:
+            year = self._now().year
+            if year != self._checked_year and year not in HOLIDAYS:
+                self._log("warning", f"  [WARN] No SET holidays listed for {year} "
+                                     f"(scheduler.HOLIDAYS) - runs on every weekday")
+            self._checked_year = year
+            nxt = self.next_run(last)
+            if nxt is None:
+                self._log("warning", f"No run in the next {LOOKAHEAD_DAYS} days")
+                last = self._now()
+                self._sleep(MAX_SLEEP)
+                continue
+            self._log("info", f"Next: {nxt[1].name} at {nxt[0]:%a %Y-%m-%d %H:%M}")
+            self.sleep_until(nxt[0])
+            last = self.run_due(last)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch schedule on the SET calendar")
+    parser.add_argument("command", choices=["next"])
+    parser.add_argument("--start", help="List runs after this date/time (default: now)")
+    parser.add_argument("--count", type=int, default=20)
+    args = parser.parse_args()
+
+    start = datetime.fromisoformat(args.start).replace(tzinfo=MARKET_TZ) if args.start \
+        else datetime.now(MARKET_TZ)
+    for n, (t, job) in enumerate(upcoming(start, days=366)):
+        if n == args.count:
+            break
+        print(f"{t:%a %Y-%m-%d %H:%M}  {job.name:<7} {', '.join(job.intervals)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Universe import - a universe benchmarked against another symbol than SET
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_store import SnapshotWriter, current_snapshot, snapshots_dir
+from rrg_engine import PANEL_DIRNAME
+from universe import compute_universe_tails, import_universe, list_universes, universe_subdir
+
+
+def _frames(symbols: list[str], n_rows: int = 300, seed: int = 0) -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2020-01-01", periods=n_rows, name="datetime")
+    frames = {}
+    for symbol in symbols:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_rows)))
+        frames[symbol] = pd.DataFrame({"symbol": f"X:{symbol}", "open": close, "high": close,
+                                       "low": close, "close": close, "volume": 1.0}, index=dates)
+    return frames
+
+
+def test_import_universe_with_own_benchmark(tmp_path):
+    data_dir = str(tmp_path / "data")
+    writer = SnapshotWriter(data_dir)
+    writer.replace("daily", _frames(["SET", "BANK", "ICT"]))
+    writer.publish()
+
+    import_universe("us", "SPY", _frames(["SPY", "AAPL", "MSFT"], seed=1), data_dir=data_dir)
+
+    snapshot_dir = os.path.join(snapshots_dir(data_dir), current_snapshot(data_dir))
+    panels = sorted(os.listdir(os.path.join(snapshot_dir, PANEL_DIRNAME)))
+    assert panels == ["daily", "monthly", "weekly"]
+    assert os.path.isdir(os.path.join(snapshot_dir, universe_subdir("us", "daily")))
+
+    universe = list_universes(data_dir)["us"]
+    tails, error = compute_universe_tails(universe, "daily", 10, 10, data_dir=data_dir)
+    assert error is None
+    assert sorted(tails.symbols) == ["AAPL", "MSFT"]
@@ -0,0 +1,244 @@
+"""
+Universes - RRG of many single stocks against a chosen benchmark
+
+The sector pipeline reads the ``daily`` / ``1h`` folders of the snapshot.
+A universe is one more folder in the same snapshot, holding any number of
+symbols (e.g. index constituents) plus its benchmark, and carried over by
+every later snapshot like the sector data:
+
+    data/store/snapshots/<id>/universe-<name>-<daily|1h>/
+        dates.npy, open.npy ... volume.npy, meta.json    (see data_store.py)
+        universe.json                                   name, benchmark, title
+
+Thousands of symbols do not fit the sector path (a full-history panel
+and RRG per process), so ``compute_universe_tails`` reads the memory-mapped
+closes in chunks of columns and keeps only the last MAX_TAIL points of
+each chunk: memory is bounded by the chunk, not the universe. The values
+are the same as ``compute_rrg`` gives per symbol. ``filter_tails`` then
+picks the top N / given quadrants before anything is plotted.
+
+Usage:
+    python universe.py import us --benchmark SPY --csv-dir path/to/csv      # daily bars
+    python universe.py import us --benchmark SPY --csv-dir path/to/1h --interval 1h
+    python universe.py list
+    python universe.py top us --rs 10 --mom 10 --top 20 --quadrant leading
+"""
+
+import argparse
+import json
+import os
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from data_store import (DATA_DIR, UNIVERSE_PREFIX, SnapshotWriter, current_snapshot, has_store,
+                        read_csv_frames, read_store, save_json, snapshots_dir, store_fingerprint)
+from rrg_engine import (CENTER, MAX_TAIL, QUADRANTS, RRGPanel, RRGTails, master_calendar,
+                        quadrant_codes, resample_rule, rrg_arrays, rrg_tails, subdir_for)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+UNIVERSE_FILE = "universe.json"
+CHUNK_SIZE = 128               # symbols computed at a time (~40 MB of temporaries at 5000 bars)
+RANK_BY = ["distance", "rs_ratio", "rs_momentum"]
+
+
+@dataclass
+class Universe:
+    name: str
+    benchmark: str
+    title: str
+    subdirs: list[str]         # "daily" and/or "1h"
+
+    def intervals(self) -> list[str]:
+        return [i for i in ["monthly", "weekly", "daily", "1h"] if subdir_for(i) in self.subdirs]
+
+
+def universe_subdir(name: str, subdir: str) -> str:
+    return f"{UNIVERSE_PREFIX}{name}-{subdir}"
+
+
+def _snapshot_dir(data_dir: str) -> str | None:
+    snapshot_id = current_snapshot(data_dir)
+    return os.path.join(snapshots_dir(data_dir), snapshot_id) if snapshot_id else None
+
+
+def list_universes(data_dir: str = DATA_DIR) -> dict[str, Universe]:
+    """Universes of the current snapshot by name."""
+    snapshot_dir = _snapshot_dir(data_dir)
+    if snapshot_dir is None:
+        return {}
+    universes = {}
+    for folder in sorted(os.listdir(snapshot_dir)):
+        path = os.path.join(snapshot_dir, folder, UNIVERSE_FILE)
+        if not folder.startswith(UNIVERSE_PREFIX) or not os.path.isfile(path):
+            continue
+        with open(path, encoding="utf-8") as fh:
+            meta = json.load(fh)
+        universe = universes.setdefault(meta["name"], Universe(meta["name"], meta["benchmark"],
+                                                               meta.get("title") or meta["name"], []))
+        universe.subdirs.append(meta["subdir"])
+    return universes
+
+
+def universe_store_dir(universe: Universe, interval: str, data_dir: str = DATA_DIR) -> str | None:
+    snapshot_dir = _snapshot_dir(data_dir)
+    if snapshot_dir is None:
+        return None
+    store_dir = os.path.join(snapshot_dir, universe_subdir(universe.name, subdir_for(interval)))
+    return store_dir if has_store(store_dir) else None
+
+
+def universe_version(universe: Universe, interval: str, data_dir: str = DATA_DIR) -> tuple:
+    """Cache key of the universe's data for ``interval``; changes only when its content does."""
+    store_dir = universe_store_dir(universe, interval, data_dir)
+    return ("universe", universe.name, store_fingerprint(store_dir) if store_dir else None)
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+def import_universe(name: str, benchmark: str, frames: dict[str, pd.DataFrame],
+                    subdir: str = "daily", title: str | None = None,
+                    data_dir: str = DATA_DIR) -> str:
+    """Publish a snapshot with ``frames`` (fetcher format) as universe ``name``. Returns its id."""
+    if benchmark not in frames:
+        raise ValueError(f"Benchmark {benchmark} not among the {len(frames)} symbols")
+    folder = universe_subdir(name, subdir)
+    writer = SnapshotWriter(data_dir)
+    try:
+        writer.replace(folder, frames)
+        save_json(os.path.join(writer.staging_dir, folder, UNIVERSE_FILE),
+                  {"name": name, "benchmark": benchmark, "title": title or name, "subdir": subdir})
+        return writer.publish()
+    except BaseException:
+        writer.discard()
+        raise
+
+
+# ---------------------------------------------------------------------------
+# Chunked RRG
+# ---------------------------------------------------------------------------
+
+def compute_universe_tails(universe: Universe, interval: str, rs_period: int, mom_period: int,
+                           max_tail: int = MAX_TAIL, chunk_size: int = CHUNK_SIZE,
+                           data_dir: str = DATA_DIR):
+    """Tails of every symbol of ``universe``. Returns (RRGTails|None, error_msg|None).
+
+    Computed ``chunk_size`` symbols at a time from the memory-mapped closes;
+    only the tails of each chunk are kept.
+    """
+    store_dir = universe_store_dir(universe, interval, data_dir)
+    if store_dir is None:
+        return None, f"No {interval} data for universe {universe.name}"
+    data = read_store(store_dir)
+    if universe.benchmark not in data.symbols:
+        return None, f"Benchmark {universe.benchmark} not found in universe {universe.name}"
+    close = data.arrays["close"]
+    bench_col = data.symbols.index(universe.benchmark)
+    cal = master_calendar(("universe", universe.benchmark, store_fingerprint(store_dir)),
+                          resample_rule(interval), data.dates, close[:, bench_col])
+    bench = cal.align(close[:, bench_col:bench_col + 1])[:, 0]
+
+    cols = [c for c in range(len(data.symbols)) if c != bench_col]
+    parts = []
+    for start in range(0, len(cols), chunk_size):
+        chunk = cols[start:start + chunk_size]
+        lo, hi = chunk[0], chunk[-1] + 1
+        if hi - lo == len(chunk):
+            prices = close[:, lo:hi]          # contiguous columns: a view of the mapped file
+        else:
+            prices = close[:, chunk]
+        prices = cal.align(prices)
+        rs_ratio, rs_momentum = rrg_arrays(prices, bench, rs_period, mom_period)
+        result = RRGPanel(cal.dates, [data.symbols[c] for c in chunk], rs_ratio, rs_momentum)
+        n_bars = np.count_nonzero(~np.isnan(prices), axis=0)
+        parts.append(rrg_tails(result, n_bars, rs_period, mom_period, max_tail))
+
+    symbols = [s for p in parts for s in p.symbols]
+    if not symbols:
+        return None, f"No symbol of universe {universe.name} has enough {interval} history"
+    return RRGTails(symbols,
+                    np.concatenate([p.dates for p in parts], axis=1),
+                    np.concatenate([p.rs_ratio for p in parts], axis=1),
+                    np.concatenate([p.rs_momentum for p in parts], axis=1)), None
+
+
+def filter_tails(tails: RRGTails, top_n: int | None = None, quadrants=None,
+                 rank_by: str = "distance") -> RRGTails:
+    """Symbols whose latest point is in ``quadrants``, best ``top_n`` first.
+
+    ``rank_by``: "distance" from the centre (strength of the rotation),
+    "rs_ratio" or "rs_momentum" (highest first).
+    """
+    x, y = tails.rs_ratio[-1], tails.rs_momentum[-1]
+    mask = np.ones(len(tails), dtype=bool)
+    if quadrants:
+        mask &= np.isin(quadrant_codes(x, y), [QUADRANTS.index(q) for q in quadrants])
+    score = {"distance": np.hypot(x - CENTER, y - CENTER), "rs_ratio": x, "rs_momentum": y}[rank_by]
+    order = [c for c in np.argsort(-score, kind="stable") if mask[c]]
+    if top_n is not None:
+        order = order[:top_n]
+    return tails.take([tails.symbols[c] for c in order])
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="RRG for large single-stock universes")
+    parser.add_argument("command", choices=["import", "list", "top"])
+    parser.add_argument("name", nargs="?", help="Universe name")
+    parser.add_argument("--benchmark", help="Benchmark symbol (import)")
+    parser.add_argument("--csv-dir", help="Folder of <SYMBOL>.csv files (import)")
+    parser.add_argument("--title", help="Display name (import)")
+    parser.add_argument("--interval", default="daily", choices=["monthly", "weekly", "daily", "1h"])
+    parser.add_argument("--rs", type=int, default=10, help="RS-Ratio period (top)")
+    parser.add_argument("--mom", type=int, default=10, help="RS-Momentum period (top)")
+    parser.add_argument("--top", type=int, default=20, help="Number of symbols (top)")
+    parser.add_argument("--quadrant", action="append", choices=QUADRANTS,
+                        help="Only these quadrants (top, repeatable)")
+    parser.add_argument("--rank-by", choices=RANK_BY, default="distance")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        if not (args.name and args.benchmark and args.csv_dir):
+            parser.error("import needs a name, --benchmark and --csv-dir")
+        frames = read_csv_frames(args.csv_dir)
+        snapshot_id = import_universe(args.name, args.benchmark, frames,
+                                      subdir_for(args.interval), args.title)
+        print(f"[OK] Universe {args.name}: {len(frames)} symbols -> snapshot {snapshot_id}")
+        return
+
+    universes = list_universes()
+    if args.command == "list":
+        if not universes:
+            print("No universes in the current snapshot")
+        for universe in universes.values():
+            print(f"  {universe.name}: {universe.title}, benchmark {universe.benchmark}, "
+                  f"intervals {', '.join(universe.intervals())}")
+        return
+
+    if args.name not in universes:
+        print(f"[FAIL] Unknown universe: {args.name}")
+        raise SystemExit(1)
+    t0 = time.perf_counter()
+    tails, error = compute_universe_tails(universes[args.name], args.interval, args.rs, args.mom)
+    if tails is None:
+        print(f"[FAIL] {error}")
+        raise SystemExit(1)
+    shown = filter_tails(tails, args.top, args.quadrant, args.rank_by)
+    print(f"{args.name} {args.interval}: {len(tails)} symbols in "
+          f"{time.perf_counter() - t0:.2f}s, as of {tails.latest}")
+    codes = quadrant_codes(shown.rs_ratio[-1], shown.rs_momentum[-1])
+    for name, x, y, code in zip(shown.symbols, shown.rs_ratio[-1], shown.rs_momentum[-1], codes):
+        print(f"  {name:<10} {QUADRANTS[code]:<10} RS-Ratio {x:7.2f}  RS-Mom {y:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,4 +10,10 @@ echo %date% %time%: Updating data from GitHub...
 git fetch origin master
 git checkout origin/master -- data/
 
+REM Publish a store snapshot - the app reads only the current snapshot
+python data_store.py migrate || echo %date% %time%: WARNING - snapshot not published, app keeps its current data
+
+REM Precompute RRG for every slider setting (the app computes on demand until done)
+python rrg_grid.py build || echo %date% %time%: WARNING - RRG grid not built, app computes on demand
+
 echo %date% %time%: Data updated successfully!
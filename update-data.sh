@@ -22,6 +22,12 @@ echo "$(date): Updating data from GitHub..."
 git fetch origin master
 git checkout origin/master -- data/
 
+# Publish a store snapshot - the app reads only the current snapshot
+python3 data_store.py migrate || echo "$(date): WARNING - snapshot not published, app keeps its current data"
+
+# Precompute RRG for every slider setting (the app computes on demand until done)
+python3 rrg_grid.py build || echo "$(date): WARNING - RRG grid not built, app computes on demand"
+
 echo "$(date): Data updated successfully!"
 
 # Optionally restart the container to clear cache